@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Warm backtest worker: a long-lived process that keeps Freqtrade imported and runs jobs through its
+Python API (download-data + Backtesting), then parses the in-memory result with parse_backtest.py.
+No bash, no per-job interpreter start-up and no raw-file round trip.
+
+Jobs are JSON lines, answered with one JSON line each:
+  python3 backtest_worker.py                        # stdin/stdout
+  python3 backtest_worker.py --socket /tmp/klineo-backtest.sock
+
+  {"id": "1", "strategy": "KlineoEmaRsiTrend", "timeframe": "15m", "pairs": "BTC/USDT", "timerange": "20240101-20251231"}
+  -> {"id": "1", "status": "ok", "normalized_path": ".../output/normalized/KlineoEmaRsiTrend_15m_20240101-20251231.json", ...}
+
+Optional job keys: out, download (default true), cache (default true), keep_raw (also write
+output/raw/<name>.json), max_points, candle_sidecars, format, compress, portfolio,
+excursions, monte_carlo (number of simulations), catalog (default true: upsert into catalog.py's SQLite catalog).
+{"cmd": "preview", "strategy": ..., "pairs": ..., "timerange": ...} answers with an approximate
+preview_backtest.py result (output/preview/) in well under a second, e.g. before the full job.
+Control messages: {"cmd": "ping"}, {"cmd": "stats"}, {"cmd": "shutdown"}.
+Jobs run one at a time; Freqtrade logs go to stderr so stdout only carries responses.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+import catalog
+import instrumentation
+import parse_backtest
+import preview_backtest
+import resample
+import result_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FREQTRADE_DIR = os.path.join(SCRIPT_DIR, "freqtrade")
+USER_DATA = os.path.join(FREQTRADE_DIR, "user_data")
+CONFIG = os.path.join(USER_DATA, "config.json")
+DATA_DIR = os.path.join(USER_DATA, "data")
+OUTPUT_RAW = os.path.join(SCRIPT_DIR, "output", "raw")
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+CANDLE_CACHE = os.environ.get("KLINEO_CANDLE_CACHE_DIR", os.path.join(SCRIPT_DIR, "output", "cache", "candles"))
+
+
+class JobError(Exception):
+    """Invalid job or a Freqtrade failure; reported as status "failed"."""
+
+
+def _job_pairs(job: Dict[str, Any]) -> List[str]:
+    return job["pairs"] if isinstance(job["pairs"], list) else [p.strip() for p in job["pairs"].split(",") if p.strip()]
+
+
+class BacktestWorker:
+    def __init__(self):
+        self.started = time.time()
+        self.jobs = {"ok": 0, "failed": 0, "cached": 0}
+        self.exchange = None
+        self.freqtrade_version: Optional[str] = None
+
+    def warm(self) -> None:
+        """Import Freqtrade (and its pandas/TA-Lib stack) once, up front."""
+        import freqtrade
+        from freqtrade.optimize import backtesting  # noqa: F401
+
+        self.freqtrade_version = getattr(freqtrade, "__version__", None)
+
+    # --- Freqtrade API ---
+
+    def download(self, timeframe: str, pairs: List[str], timerange: str) -> None:
+        from freqtrade.commands.data_commands import start_download_data
+
+        start_download_data({
+            "config": [CONFIG],
+            "user_data_dir": FREQTRADE_DIR,
+            "exchange": "binance",
+            "timeframes": [timeframe],
+            "pairs": pairs,
+            "timerange": timerange,
+            "dataformat_ohlcv": "json",
+        })
+
+    def backtest(self, strategy: str, timeframe: str, pairs: List[str], timerange: str) -> Dict[str, Any]:
+        """Run Freqtrade's Backtesting in-process; returns the strategy's result dict (with "trades")."""
+        from freqtrade.configuration import Configuration
+        from freqtrade.enums import RunMode
+        from freqtrade.optimize.backtesting import Backtesting
+
+        config = Configuration({
+            "config": [CONFIG],
+            "user_data_dir": FREQTRADE_DIR,
+            "strategy": strategy,
+            "timeframe": timeframe,
+            "timerange": timerange,
+            "pairs": pairs,
+            "export": "none",
+            "enable_protections": True,
+        }, RunMode.BACKTEST).get_config()
+        # Reuse the exchange (markets) between jobs where this Freqtrade version allows it
+        try:
+            bt = Backtesting(config, exchange=self.exchange) if self.exchange is not None else Backtesting(config)
+        except TypeError:
+            bt = Backtesting(config)
+        self.exchange = bt.exchange
+        bt.start()
+        results = (bt.results or {}).get("strategy", {})
+        if strategy not in results:
+            raise JobError(f"Freqtrade returned no result for {strategy}")
+        return results[strategy]
+
+    # --- Jobs ---
+
+    def run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        missing = [k for k in ("strategy", "timeframe", "pairs", "timerange") if not job.get(k)]
+        if missing:
+            raise JobError(f"missing job keys: {', '.join(missing)}")
+        strategy, timeframe, timerange = job["strategy"], job["timeframe"], job["timerange"]
+        pairs = _job_pairs(job)
+        fmt = job.get("format", "json")
+        compress = job.get("compress", "none")
+        name = f"{strategy}_{timeframe}_{timerange.replace('/', '_')}"
+        out = job.get("out") or os.path.join(OUTPUT_NORM, name + (".kcol" if fmt == "columnar" else ".json"))
+        response: Dict[str, Any] = {"normalized_path": out, "cached": False}
+
+        def cache_inputs() -> Dict[str, Any]:
+            # Fingerprints the candle data on disk now, so it is taken again after the download
+            return result_cache.cache_inputs(
+                strategy, timeframe, pairs, timerange, out,
+                bool(job.get("candle_sidecars")), job.get("max_points"), DATA_DIR,
+                output_format=fmt, compress=compress, portfolio=bool(job.get("portfolio")),
+                monte_carlo=int(job.get("monte_carlo") or 0), excursions=bool(job.get("excursions")),
+            )
+
+        cache = None
+        if job.get("cache", True) and result_cache.is_cacheable(timerange):
+            cache = result_cache.ResultCache()
+            if result_cache.lookup(cache, cache_inputs(), out):
+                response["cached"] = True
+                if job.get("catalog", True):
+                    catalog.record(out)
+                return response
+
+        recorder = instrumentation.StageRecorder()
+        if job.get("download", True):
+            with recorder.stage("download"):
+                self.download(timeframe, pairs, timerange)
+        informative = resample.informative_timeframes(strategy, timeframe)
+        if informative:
+            with recorder.stage("resample"):
+                resample.prepare(pairs, timeframe, informative, DATA_DIR, CANDLE_CACHE)
+        with recorder.stage("backtest") as st:
+            result = self.backtest(strategy, timeframe, pairs, timerange)
+            st["output_rows"] = len(result.get("trades") or [])
+        raw = {
+            "trades": result.get("trades") or [],
+            "backtest_stats": {k: result.get(k) for k in ("profit_total", "starting_balance", "final_balance")},
+        }
+        if job.get("keep_raw"):
+            os.makedirs(OUTPUT_RAW, exist_ok=True)
+            with open(os.path.join(OUTPUT_RAW, name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(raw, f, default=str)
+
+        argv = [
+            "--raw", "(in-memory)",
+            "--strategy", strategy,
+            "--timeframe", timeframe,
+            "--pairs", ",".join(pairs),
+            "--timerange", timerange,
+            "--out", out,
+            "--data-dir", DATA_DIR,
+            "--candle-cache", CANDLE_CACHE,
+            "--format", fmt,
+            "--compress", compress,
+        ]
+        if job.get("max_points"):
+            argv += ["--max-points", str(job["max_points"])]
+        if job.get("candle_sidecars"):
+            argv.append("--candle-sidecars")
+        if job.get("portfolio"):
+            argv.append("--portfolio")
+        if job.get("excursions"):
+            argv.append("--excursions")
+        if job.get("monte_carlo"):
+            argv += ["--monte-carlo", str(job["monte_carlo"])]
+        if job.get("catalog", True):
+            argv += catalog.parser_args()
+        parse_backtest.run(parse_backtest.parse_args(argv), raw=raw, recorder=recorder)
+        if cache is not None:
+            result_cache.store(cache, cache_inputs(), out)
+
+        response["trades"] = len(raw["trades"])
+        response["timings"] = {s["stage"]: s["wall_seconds"] for s in recorder.stages}
+        return response
+
+    def run_preview(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Approximate NumPy backtest (preview_backtest.py); no Freqtrade involved."""
+        missing = [k for k in ("strategy", "pairs", "timerange") if not job.get(k)]
+        if missing:
+            raise JobError(f"missing job keys: {', '.join(missing)}")
+        try:
+            out = preview_backtest.run_preview(
+                job["strategy"], _job_pairs(job), job["timerange"], job.get("out"), DATA_DIR,
+                job.get("max_points"), job.get("format", "json"),
+            )
+        except ValueError as e:
+            raise JobError(str(e)) from e
+        return {"normalized_path": out, "approximate": True}
+
+    def handle(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """One request -> one response (never raises)."""
+        cmd = msg.get("cmd", "backtest")
+        response: Dict[str, Any] = {"id": msg.get("id"), "status": "ok"}
+        if cmd == "ping":
+            return response
+        if cmd == "stats":
+            response.update({
+                "pid": os.getpid(),
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "freqtrade_version": self.freqtrade_version,
+                "jobs": dict(self.jobs),
+            })
+            return response
+        if cmd == "shutdown":
+            return response
+        if cmd not in ("backtest", "preview"):
+            return {**response, "status": "failed", "error": f"unknown cmd: {cmd}"}
+
+        started = time.perf_counter()
+        try:
+            # Freqtrade and the parser print progress; keep stdout for responses
+            with contextlib.redirect_stdout(sys.stderr):
+                response.update(self.run_job(msg) if cmd == "backtest" else self.run_preview(msg))
+        except JobError as e:
+            response.update({"status": "failed", "error": str(e)})
+        except (Exception, SystemExit) as e:
+            traceback.print_exc(file=sys.stderr)
+            response.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+        response["seconds"] = round(time.perf_counter() - started, 3)
+        self.jobs["cached" if response.get("cached") else response["status"]] += 1
+        return response
+
+
+def _decode(line: str) -> Optional[Dict[str, Any]]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        msg = json.loads(line)
+    except ValueError as e:
+        return {"cmd": "invalid", "error": str(e)}
+    return msg if isinstance(msg, dict) else {"cmd": "invalid", "error": "expected a JSON object"}
+
+
+def serve_stdio(worker: BacktestWorker) -> None:
+    for line in sys.stdin:
+        msg = _decode(line)
+        if msg is None:
+            continue
+        response = worker.handle(msg) if msg.get("cmd") != "invalid" else {"status": "failed", "error": msg["error"]}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+        if msg.get("cmd") == "shutdown":
+            return
+
+
+def serve_socket(worker: BacktestWorker, path: str) -> None:
+    """Unix socket server; connections are handled one at a time, so jobs never overlap."""
+    if os.path.exists(path):
+        os.unlink(path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                msg = _decode(raw_line.decode("utf-8"))
+                if msg is None:
+                    continue
+                if msg.get("cmd") == "invalid":
+                    response = {"status": "failed", "error": msg["error"]}
+                else:
+                    response = worker.handle(msg)
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if msg.get("cmd") == "shutdown":
+                    # shutdown() blocks until serve_forever returns, so ask from another thread
+                    import threading
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        print(f"[Klineo Worker] Listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Warm Klineo backtest worker (JSON-lines protocol)")
+    p.add_argument("--socket", default=None, help="Unix socket path (default: stdin/stdout)")
+    args = p.parse_args()
+
+    worker = BacktestWorker()
+    try:
+        worker.warm()
+    except ImportError as e:
+        print(f"Error: Freqtrade is not importable: {e}", file=sys.stderr)
+        sys.exit(1)
+    ready = {"status": "ready", "pid": os.getpid(), "freqtrade_version": worker.freqtrade_version}
+    if args.socket:
+        print(json.dumps(ready), file=sys.stderr)
+        serve_socket(worker, args.socket)
+    else:
+        sys.stdout.write(json.dumps(ready) + "\n")
+        sys.stdout.flush()
+        serve_stdio(worker)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Batch/sweep runner: backtest many strategies x pairs x timeranges in parallel.
+Downloads data once per (timeframe, pairs) up front and resamples the strategies' informative
+timeframes from it (resample.py), then runs jobs on a process pool and writes a
+manifest with per-job status, timings and output paths.
+
+Usage:
+  python3 batch_backtest.py --matrix sweep.json
+  python3 batch_backtest.py --strategies 'Klineo*' --pairs BTC/USDT --pairs ETH/USDT --timeranges 20240101-20251231
+
+Matrix file:
+  {
+    "strategies": ["Klineo*"],                 # names or globs over freqtrade/user_data/strategies
+    "timeframes": [null],                      # null = each strategy's own timeframe
+    "pairs": ["BTC/USDT", "ETH/USDT,SOL/USDT"],  # pair groups; one backtest per group
+    "timeranges": ["20240101-20251231"],
+    "jobs": [{"strategy": "...", "timeframe": "15m", "pairs": "BTC/USDT", "timerange": "..."}]
+  }
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import catalog
+import instrumentation
+import parse_backtest
+import resample
+import result_cache
+from downsample import timeframe_seconds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FREQTRADE_DIR = os.path.join(SCRIPT_DIR, "freqtrade")
+USER_DATA = os.path.join(FREQTRADE_DIR, "user_data")
+STRATEGIES_DIR = os.path.join(USER_DATA, "strategies")
+CONFIG = os.path.join(USER_DATA, "config.json")
+OUTPUT_RAW = os.path.join(SCRIPT_DIR, "output", "raw")
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+OUTPUT_BATCH = os.path.join(SCRIPT_DIR, "output", "batch")
+CANDLE_CACHE = os.environ.get("KLINEO_CANDLE_CACHE_DIR", os.path.join(SCRIPT_DIR, "output", "cache", "candles"))
+
+_TIMEFRAME_RE = re.compile(r"^\s+timeframe\s*=\s*[\"']([0-9]+[mhdw])[\"']", re.MULTILINE)
+_STARTUP_RE = re.compile(r"^\s+startup_candle_count\s*=\s*(\d+)", re.MULTILINE)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run a matrix of Klineo backtests in parallel")
+    p.add_argument("--matrix", default=None, help="Job matrix JSON file")
+    p.add_argument("--strategies", action="append", default=[], help="Strategy name or glob (repeatable)")
+    p.add_argument("--timeframes", action="append", default=[], help="Timeframe override (repeatable)")
+    p.add_argument("--pairs", action="append", default=[], help="Comma-separated pair group (repeatable)")
+    p.add_argument("--timeranges", action="append", default=[], help="Timerange (repeatable)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size (default: CPU count)")
+    p.add_argument("--skip-download", action="store_true", help="Assume data is already downloaded")
+    p.add_argument("--manifest", default=None, help="Manifest path (default: output/batch/manifest-<ts>.json)")
+    p.add_argument("--no-cache", action="store_true", help="Always backtest, ignoring the result cache")
+    p.add_argument("--dry-run", action="store_true", help="Print the expanded jobs and exit")
+    return p.parse_args()
+
+
+# --- Job matrix ---
+
+def strategy_timeframes() -> Dict[str, str]:
+    """Map strategy class/file name -> its declared timeframe."""
+    out = {}
+    for path in sorted(Path(STRATEGIES_DIR).glob("*.py")):
+        text = path.read_text(encoding="utf-8")
+        if "IStrategy)" not in text:
+            # Helper modules next to the strategies (klineo_indicators.py)
+            continue
+        m = _TIMEFRAME_RE.search(text)
+        out[path.stem] = m.group(1) if m else "15m"
+    return out
+
+
+def strategy_startup_candles(strategy: str) -> int:
+    """Declared startup_candle_count of a strategy file (0 if not found)."""
+    path = Path(STRATEGIES_DIR) / f"{strategy}.py"
+    if not path.is_file():
+        return 0
+    m = _STARTUP_RE.search(path.read_text(encoding="utf-8"))
+    return int(m.group(1)) if m else 0
+
+
+def safe_name(value: str) -> str:
+    return value.replace("/", "_")
+
+
+def expand_jobs(matrix: Dict[str, Any]) -> List[Dict[str, Any]]:
+    known = strategy_timeframes()
+    strategies: List[str] = []
+    for pattern in matrix.get("strategies") or []:
+        matches = [s for s in known if fnmatch.fnmatchcase(s, pattern)] or [pattern]
+        strategies.extend(s for s in matches if s not in strategies)
+
+    pair_groups = []
+    for group in matrix.get("pairs") or []:
+        pairs = group if isinstance(group, list) else str(group).split(",")
+        pair_groups.append(",".join(p.strip() for p in pairs if p.strip()))
+
+    jobs = []
+    for strategy in strategies:
+        for timeframe in matrix.get("timeframes") or [None]:
+            for pairs in pair_groups:
+                for timerange in matrix.get("timeranges") or []:
+                    jobs.append({
+                        "strategy": strategy,
+                        "timeframe": timeframe or known.get(strategy, "15m"),
+                        "pairs": pairs,
+                        "timerange": timerange,
+                    })
+    for job in matrix.get("jobs") or []:
+        pairs = job["pairs"] if isinstance(job["pairs"], str) else ",".join(job["pairs"])
+        jobs.append({
+            "strategy": job["strategy"],
+            "timeframe": job.get("timeframe") or known.get(job["strategy"], "15m"),
+            "pairs": pairs,
+            "timerange": job["timerange"],
+        })
+
+    # Same file names as run_backtest.sh; add the pairs only when they are needed to tell jobs apart
+    groups: Dict[tuple, set] = {}
+    for job in jobs:
+        groups.setdefault((job["strategy"], job["timeframe"], job["timerange"]), set()).add(job["pairs"])
+    for i, job in enumerate(jobs):
+        name = f"{job['strategy']}_{job['timeframe']}_{safe_name(job['timerange'])}"
+        if len(groups[(job["strategy"], job["timeframe"], job["timerange"])]) > 1:
+            name += "_" + safe_name(job["pairs"].replace(",", "-"))
+        job["id"] = f"{i:04d}_{name}"
+        job["raw_path"] = os.path.join(OUTPUT_RAW, name + ".json")
+        job["normalized_path"] = os.path.join(OUTPUT_NORM, name + ".json")
+    return jobs
+
+
+def union_timerange(timeranges: List[str]) -> str:
+    """Smallest YYYYMMDD-YYYYMMDD range covering all given ranges (open ends stay open)."""
+    starts, ends = [], []
+    for tr in timeranges:
+        start, _, end = tr.partition("-")
+        starts.append(start)
+        ends.append(end)
+    start = "" if "" in starts else min(starts)
+    end = "" if "" in ends else max(ends)
+    return f"{start}-{end}"
+
+
+def download_plan(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One download-data call per timeframe, covering every (pair, timeframe) used by any job, with the
+    informative timeframes of its jobs' strategies to resample from the downloaded base data.
+    """
+    by_tf: Dict[str, Dict[str, Any]] = {}
+    for job in jobs:
+        entry = by_tf.setdefault(job["timeframe"], {"pairs": [], "timeranges": [], "informative": set()})
+        for pair in job["pairs"].split(","):
+            if pair not in entry["pairs"]:
+                entry["pairs"].append(pair)
+        entry["timeranges"].append(job["timerange"])
+        entry["informative"].update(resample.informative_timeframes(job["strategy"], job["timeframe"]))
+    return [
+        {
+            "timeframe": tf,
+            "pairs": e["pairs"],
+            "timerange": union_timerange(e["timeranges"]),
+            "informative": sorted(e["informative"], key=timeframe_seconds),
+        }
+        for tf, e in by_tf.items()
+    ]
+
+
+# --- Execution ---
+
+def run_download(step: Dict[str, Any]) -> Dict[str, Any]:
+    cmd = [
+        "freqtrade", "download-data",
+        "--config", CONFIG,
+        "--userdir", FREQTRADE_DIR,
+        "--exchange", "binance",
+        "--timeframes", step["timeframe"],
+        "--pairs", *step["pairs"],
+        "--timerange", step["timerange"],
+        "--data-format-ohlcv", "json",
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    return {
+        **step,
+        "status": "ok" if proc.returncode == 0 else "failed",
+        "seconds": round(time.perf_counter() - start, 3),
+        "error": None if proc.returncode == 0 else proc.stderr[-2000:],
+    }
+
+
+def run_resample(step: Dict[str, Any]) -> Dict[str, Any]:
+    """Informative timeframes of a download step, resampled from its base data (see resample.py)."""
+    start = time.perf_counter()
+    error = None
+    try:
+        resample.prepare(step["pairs"], step["timeframe"], step["informative"], os.path.join(USER_DATA, "data"), CANDLE_CACHE)
+    except (OSError, ValueError) as e:
+        error = str(e)
+    return {
+        "timeframe": step["timeframe"],
+        "informative": step["informative"],
+        "pairs": step["pairs"],
+        "status": "ok" if error is None else "failed",
+        "seconds": round(time.perf_counter() - start, 3),
+        "error": error,
+    }
+
+
+def backtest_command(strategy: str, timeframe: str, timerange: str, pairs: List[str], export_path: str) -> List[str]:
+    """freqtrade backtesting argv, same flags as run_backtest.sh."""
+    return [
+        "freqtrade", "backtesting",
+        "--config", CONFIG,
+        "--userdir", FREQTRADE_DIR,
+        "--strategy", strategy,
+        "--timeframe", timeframe,
+        "--timerange", timerange,
+        "--pairs", *pairs,
+        "--export", "trades",
+        "--export-filename", export_path,
+        "--enable-protections",
+    ]
+
+
+def find_export(export_path: str) -> Optional[str]:
+    """The requested export file, or the newest backtest-result-*.json next to it."""
+    if os.path.isfile(export_path):
+        return export_path
+    latest = sorted(Path(os.path.dirname(export_path)).glob("backtest-result-*.json"), key=os.path.getmtime)
+    return str(latest[-1]) if latest else None
+
+
+def run_job(job: Dict[str, Any], use_cache: bool = True, catalogue: bool = True) -> Dict[str, Any]:
+    """
+    Backtest + parse one job (runs in a pool worker). Never raises; failures land in the result.
+    catalogue=False keeps the output out of the results catalog (e.g. walk-forward windows).
+    """
+    result = {**job, "status": "failed", "error": None, "cached": False, "timings": {}}
+    started = time.perf_counter()
+    export_dir = os.path.join(USER_DATA, "backtest_results", "batch", job["id"])
+    os.makedirs(export_dir, exist_ok=True)
+    os.makedirs(OUTPUT_RAW, exist_ok=True)
+    os.makedirs(OUTPUT_NORM, exist_ok=True)
+    export_path = os.path.join(export_dir, "klineo_backtest_export.json")
+    pairs = job["pairs"].split(",")
+    cache = inputs = None
+    try:
+        # 0) Result cache; data files are fingerprinted by the candles the job reads, so the up-front
+        #    download rewriting them (or appending newer candles) does not invalidate the entry
+        if use_cache and result_cache.is_cacheable(job["timerange"]):
+            cache = result_cache.ResultCache()
+            inputs = result_cache.cache_inputs(
+                job["strategy"], job["timeframe"], pairs, job["timerange"], job["normalized_path"],
+                data_dir=os.path.join(USER_DATA, "data"),
+            )
+            if result_cache.lookup(cache, inputs, job["normalized_path"]):
+                result["status"] = "ok"
+                result["cached"] = True
+                if catalogue:
+                    catalog.record(job["normalized_path"])
+                return result
+
+        # 1) Backtest into a per-job export dir so parallel jobs never pick up each other's results
+        cmd = backtest_command(job["strategy"], job["timeframe"], job["timerange"], pairs, export_path)
+        stage, proc = instrumentation.run_stage("backtest", cmd, export_path, capture_output=True, text=True)
+        result["timings"]["backtest"] = round(stage["wall_seconds"], 3)
+        if proc.returncode != 0:
+            result["error"] = proc.stderr[-2000:] or f"freqtrade exited with code {proc.returncode}"
+            return result
+        export_path = find_export(export_path)
+        if not export_path:
+            result["error"] = "Raw result file not found."
+            return result
+        os.replace(export_path, job["raw_path"])
+        instrumentation.append_stages(instrumentation.stages_path_for(job["normalized_path"]), [stage])
+
+        # 2) Parse in-process (no extra interpreter start-up)
+        t = time.perf_counter()
+        parse_backtest.main([
+            "--raw", job["raw_path"],
+            "--strategy", job["strategy"],
+            "--timeframe", job["timeframe"],
+            "--pairs", job["pairs"],
+            "--timerange", job["timerange"],
+            "--out", job["normalized_path"],
+            "--data-dir", os.path.join(USER_DATA, "data"),
+            "--candle-cache", CANDLE_CACHE,
+            *(catalog.parser_args() if catalogue else ()),
+        ])
+        result["timings"]["parse"] = round(time.perf_counter() - t, 3)
+        result["status"] = "ok"
+        if cache is not None:
+            result_cache.store(cache, inputs, job["normalized_path"])
+    except (Exception, SystemExit) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["timings"]["total"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def write_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    args = parse_args()
+    matrix: Dict[str, Any] = {}
+    if args.matrix:
+        with open(args.matrix, "r", encoding="utf-8") as f:
+            matrix = json.load(f)
+    for key in ("strategies", "timeframes", "pairs", "timeranges"):
+        if getattr(args, key):
+            matrix[key] = getattr(args, key)
+
+    jobs = expand_jobs(matrix)
+    if not jobs:
+        print("Error: job matrix is empty (need strategies, pairs and timeranges, or jobs)", file=sys.stderr)
+        sys.exit(1)
+    if args.dry_run:
+        for job in jobs:
+            print(f"{job['id']}: {job['strategy']} {job['timeframe']} {job['pairs']} {job['timerange']}")
+        return
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    manifest_path = args.manifest or os.path.join(OUTPUT_BATCH, f"manifest-{stamp}.json")
+    manifest: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "workers": args.workers,
+        "downloads": [],
+        "resamples": [],
+        "jobs": [],
+    }
+
+    print(f"[Klineo Batch] {len(jobs)} jobs, {args.workers} workers")
+    plan = download_plan(jobs)
+    if not args.skip_download:
+        for step in plan:
+            print(f"[Klineo Batch] Downloading {step['timeframe']} {','.join(step['pairs'])} {step['timerange']}...")
+            manifest["downloads"].append(run_download(step))
+            write_manifest(manifest_path, manifest)
+    failed_tfs = {d["timeframe"]: "download-data failed" for d in manifest["downloads"] if d["status"] != "ok"}
+    # Informative timeframes come from the base data, like in run_backtest.sh (serially: jobs share files)
+    for step in plan:
+        if step["informative"] and step["timeframe"] not in failed_tfs:
+            print(f"[Klineo Batch] Resampling {','.join(step['informative'])} from {step['timeframe']}...")
+            res = run_resample(step)
+            manifest["resamples"].append(res)
+            write_manifest(manifest_path, manifest)
+            if res["status"] != "ok":
+                failed_tfs[step["timeframe"]] = "resample failed"
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {}
+        for job in jobs:
+            if job["timeframe"] in failed_tfs:
+                results[job["id"]] = {**job, "status": "skipped", "error": failed_tfs[job["timeframe"]], "timings": {}}
+                continue
+            futures[pool.submit(run_job, job, not args.no_cache)] = job
+        for fut in as_completed(futures):
+            res = fut.result()
+            results[res["id"]] = res
+            status = "cached" if res.get("cached") else res["status"]
+            print(f"[Klineo Batch] {status:>7} {res['id']} ({res['timings'].get('total', 0)}s)")
+            manifest["jobs"] = [results[j["id"]] for j in jobs if j["id"] in results]
+            write_manifest(manifest_path, manifest)
+
+    manifest["jobs"] = [results[j["id"]] for j in jobs]
+    manifest["finished_at"] = datetime.now(timezone.utc).isoformat()
+    write_manifest(manifest_path, manifest)
+    n_ok = sum(1 for r in manifest["jobs"] if r["status"] == "ok")
+    print(f"[Klineo Batch] Done: {n_ok}/{len(jobs)} ok. Manifest: {manifest_path}")
+    if n_ok != len(jobs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-row OHLCV decode (load_ohlcv_rows) vs the columnar NumPy engine (ohlcv_columns).
+Writes a synthetic Freqtrade data file (default: one year of 5m candles) to a temp dir and times both.
+
+Usage (from services/backtesting):
+  python3 benchmarks/bench_ohlcv.py --rows 105120 --repeat 3
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ohlcv_columns  # noqa: E402
+import parse_backtest  # noqa: E402
+
+
+def write_candles(path: str, rows: int, layout: str) -> None:
+    rng = random.Random(42)
+    t0 = 1704067200000
+    price = 42000.0
+    data = []
+    for i in range(rows):
+        o = price
+        c = o * (1 + rng.gauss(0, 0.002))
+        h = max(o, c) * (1 + abs(rng.gauss(0, 0.001)))
+        lo = min(o, c) * (1 - abs(rng.gauss(0, 0.001)))
+        v = abs(rng.gauss(50, 20))
+        ts = t0 + i * 300_000
+        if layout == "list":
+            data.append([ts, round(o, 2), round(h, 2), round(lo, 2), round(c, 2), round(v, 4)])
+        else:
+            data.append({"date": ts, "open": o, "high": h, "low": lo, "close": c, "volume": v})
+        price = c
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def per_row(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return parse_backtest.load_ohlcv_rows(json.load(f))
+
+
+def columnar(path: str):
+    return ohlcv_columns.load_ohlcv_file(path)
+
+
+def best_of(fn, path: str, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark per-row vs columnar OHLCV loading")
+    p.add_argument("--rows", type=int, default=105_120, help="Candles per file (default: 1 year of 5m)")
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'file':<24}{'per-row s':>12}{'columnar s':>12}{'+to_tv s':>12}{'speedup':>10}")
+        for layout in ("list", "dict"):
+            for ext in (".json", ".json.gz"):
+                path = os.path.join(tmp, f"BTC_USDT-5m-{layout}{ext}")
+                write_candles(path, args.rows, layout)
+                t_rows, rows = best_of(per_row, path, args.repeat)
+                t_cols, cols = best_of(columnar, path, args.repeat)
+                start = time.perf_counter()
+                tv = cols.to_tv()
+                t_tv = time.perf_counter() - start
+                if len(tv) != len(rows) or tv[-1] != rows[-1]:
+                    print(f"MISMATCH for {path}", file=sys.stderr)
+                    sys.exit(1)
+                print(f"{layout + ext:<24}{t_rows:>12.3f}{t_cols:>12.3f}{t_cols + t_tv:>12.3f}{t_rows / t_cols:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark suite with stored baselines and regression thresholds.
+Each scenario is a synthetic dataset (benchmarks/generate_data.py: trades, candles, ISO or epoch
+timestamps, list or dict candle rows, plain or gzip files) parsed by parse_backtest.py in a fresh
+process. The parser's own <out>.stages.json gives wall time, CPU time and peak RSS per stage
+(load_json, ohlcv, trades, metrics, dump); each scenario is run --repeat times and the best run per
+stage is kept. Runs entirely offline; datasets are generated once into --work-dir and reused.
+
+  python3 benchmarks/bench_parse.py                       # standard suite vs benchmarks/baselines/parse.json
+  python3 benchmarks/bench_parse.py --save-baseline       # record this machine's baseline
+  python3 benchmarks/bench_parse.py --suite full --scenario 1m-iso-list
+  python3 benchmarks/bench_parse.py --list
+
+A stage regresses when it is slower than the baseline by more than --threshold (default 25%) and by
+at least --min-seconds, or its peak RSS grew by more than --rss-threshold (default 20%) and at least
+--min-rss-mb. Any regression exits with status 1. Peak RSS is the process high-water mark at the
+end of the stage, so it includes what earlier stages still hold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import generate_data  # noqa: E402
+import instrumentation  # noqa: E402
+
+PARSER = os.path.join(os.path.dirname(BENCH_DIR), "parse_backtest.py")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "parse.json")
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "klineo-bench")
+PAIRS = ("BTC/USDT", "ETH/USDT")
+SUITES = ("quick", "standard", "full")
+
+# name -> dataset (generate_data.generate arguments), parser options and the smallest suite it is in
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "1k-iso-list": {"trades": 1_000, "candles": 10_000, "timestamps": "iso", "layout": "list", "compress": "none", "suite": "quick"},
+    "1k-epoch-dict-gz": {"trades": 1_000, "candles": 10_000, "timestamps": "epoch", "layout": "dict", "compress": "gzip", "suite": "quick"},
+    "10k-iso-list-gz": {"trades": 10_000, "candles": 100_000, "timestamps": "iso", "layout": "list", "compress": "gzip", "suite": "quick"},
+    "10k-epoch-dict": {"trades": 10_000, "candles": 100_000, "timestamps": "epoch", "layout": "dict", "compress": "none", "suite": "quick"},
+    "100k-iso-list": {"trades": 100_000, "candles": 250_000, "timestamps": "iso", "layout": "list", "compress": "none", "suite": "standard"},
+    "100k-epoch-dict-gz": {"trades": 100_000, "candles": 250_000, "timestamps": "epoch", "layout": "dict", "compress": "gzip", "suite": "standard"},
+    "100k-iso-list-stream": {"trades": 100_000, "candles": 250_000, "timestamps": "iso", "layout": "list", "compress": "none", "stream": True, "suite": "standard"},
+    "1m-iso-list": {"trades": 1_000_000, "candles": 1_000_000, "timestamps": "iso", "layout": "list", "compress": "none", "suite": "full"},
+    "1m-epoch-list-gz-stream": {"trades": 1_000_000, "candles": 1_000_000, "timestamps": "epoch", "layout": "list", "compress": "gzip", "stream": True, "suite": "full"},
+}
+DATASET_KEYS = ("trades", "candles", "timestamps", "layout", "compress")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description="parse_backtest.py benchmark suite with baselines")
+    p.add_argument("--suite", choices=SUITES, default="standard", help="quick: <=10k trades, standard: <=100k, full: up to 1M")
+    p.add_argument("--scenario", action="append", default=None, help="Run only these scenarios (repeatable)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the best run per stage is kept")
+    p.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="Generated datasets and parser outputs")
+    p.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against / save to")
+    p.add_argument("--save-baseline", action="store_true", help="Store this run's results as the baseline (merged per scenario)")
+    p.add_argument("--threshold", type=float, default=0.25, help="Allowed wall-time slowdown per stage (fraction)")
+    p.add_argument("--min-seconds", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    p.add_argument("--rss-threshold", type=float, default=0.20, help="Allowed peak-RSS growth per stage (fraction)")
+    p.add_argument("--min-rss-mb", type=float, default=16.0, help="Ignore RSS growth smaller than this")
+    p.add_argument("--profile", action="store_true", help="Also write the parser's cProfile/tracemalloc dumps per scenario")
+    p.add_argument("--out", default=None, help="Write the results as JSON")
+    p.add_argument("--list", action="store_true", help="List the scenarios and exit")
+    return p.parse_args(argv)
+
+
+def selected(args) -> List[str]:
+    if args.scenario:
+        unknown = [s for s in args.scenario if s not in SCENARIOS]
+        if unknown:
+            raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)} (see --list)")
+        return list(args.scenario)
+    limit = SUITES.index(args.suite)
+    return [name for name, spec in SCENARIOS.items() if SUITES.index(spec["suite"]) <= limit]
+
+
+def dataset(work_dir: str, spec: Dict[str, Any]) -> Dict[str, str]:
+    """Generate the scenario's dataset once; later runs reuse it (the generator is deterministic)."""
+    name = "{trades}t-{candles}c-{timestamps}-{layout}-{compress}".format(**spec)
+    out = os.path.join(work_dir, "data", name)
+    marker = os.path.join(out, "dataset.json")
+    if os.path.isfile(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            return json.load(f)
+    print(f"  generating {name} ...", flush=True)
+    start = time.perf_counter()
+    paths = generate_data.generate(out, *(spec[k] for k in DATASET_KEYS), pairs=PAIRS)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(paths, f)
+    print(f"  generated in {time.perf_counter() - start:.1f}s", flush=True)
+    return paths
+
+
+def run_once(name: str, spec: Dict[str, Any], paths: Dict[str, str], work_dir: str, profile: bool) -> Dict[str, Dict[str, Any]]:
+    """One parser process; returns {stage: record} including a "total" for the whole process."""
+    out = os.path.join(work_dir, "out", f"{name}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    stages_path = instrumentation.stages_path_for(out)
+    if os.path.exists(stages_path):
+        os.remove(stages_path)
+    cmd = [
+        sys.executable, PARSER,
+        "--raw", paths["raw"],
+        "--strategy", "KlineoBench",
+        "--timeframe", "5m",
+        "--pairs", ",".join(PAIRS),
+        "--timerange", paths["timerange"],
+        "--out", out,
+        "--data-dir", paths["data_dir"],
+    ]
+    if spec.get("stream"):
+        cmd.append("--stream")
+    if profile:
+        cmd.append("--profile")
+    total, proc = instrumentation.run_stage("total", cmd, output_file=out, stdout=subprocess.DEVNULL)
+    if proc.returncode != 0:
+        raise SystemExit(f"{name}: parse_backtest.py exited with {proc.returncode}")
+    result = {s["stage"]: s for s in instrumentation.load_stages(stages_path)["stages"]}
+    # RUSAGE_CHILDREN keeps the largest child so far, so the parser's own high-water mark is used
+    peaks = [s["peak_rss_bytes"] for s in result.values() if s.get("peak_rss_bytes")]
+    total["peak_rss_bytes"] = max(peaks) if peaks else None
+    result["total"] = total
+    return result
+
+
+def best_of(runs: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Per stage: the minimum wall/CPU time and peak RSS over the runs (least noisy estimate)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for stage in runs[0]:
+        recs = [r[stage] for r in runs if stage in r]
+        rss = [r["peak_rss_bytes"] for r in recs if r.get("peak_rss_bytes")]
+        out[stage] = {
+            "wall_seconds": min(r["wall_seconds"] for r in recs),
+            "cpu_seconds": min(r.get("cpu_seconds", 0.0) for r in recs),
+            "peak_rss_bytes": min(rss) if rss else None,
+        }
+    return out
+
+
+def machine() -> Dict[str, Any]:
+    info = {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count()}
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        info["numpy"] = None
+    return info
+
+
+def compare(name: str, current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], args) -> List[str]:
+    """Regression messages for one scenario."""
+    problems = []
+    for stage, base in baseline.items():
+        cur = current.get(stage)
+        if cur is None:
+            continue
+        slower = cur["wall_seconds"] - base["wall_seconds"]
+        if slower > args.min_seconds and cur["wall_seconds"] > base["wall_seconds"] * (1.0 + args.threshold):
+            problems.append(f"{name}/{stage}: {cur['wall_seconds']:.3f}s vs baseline {base['wall_seconds']:.3f}s (+{slower / base['wall_seconds'] * 100:.0f}%)")
+        if cur.get("peak_rss_bytes") and base.get("peak_rss_bytes"):
+            grown = (cur["peak_rss_bytes"] - base["peak_rss_bytes"]) / 1024 ** 2
+            if grown > args.min_rss_mb and cur["peak_rss_bytes"] > base["peak_rss_bytes"] * (1.0 + args.rss_threshold):
+                problems.append(f"{name}/{stage}: peak RSS {cur['peak_rss_bytes'] / 1024 ** 2:.0f} MiB vs baseline {base['peak_rss_bytes'] / 1024 ** 2:.0f} MiB (+{grown:.0f} MiB)")
+    return problems
+
+
+def print_table(name: str, current: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    print(f"{name}")
+    print(f"  {'stage':<14}{'wall s':>10}{'cpu s':>10}{'peak MiB':>10}{'base s':>10}{'delta':>9}")
+    for stage, rec in current.items():
+        rss = f"{rec['peak_rss_bytes'] / 1024 ** 2:.0f}" if rec.get("peak_rss_bytes") else "-"
+        base = (baseline or {}).get(stage)
+        if base and base["wall_seconds"]:
+            delta = f"{(rec['wall_seconds'] / base['wall_seconds'] - 1.0) * 100:+.0f}%"
+            base_s = f"{base['wall_seconds']:.3f}"
+        else:
+            delta = base_s = "-"
+        print(f"  {stage:<14}{rec['wall_seconds']:>10.3f}{rec['cpu_seconds']:>10.3f}{rss:>10}{base_s:>10}{delta:>9}")
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"scenarios": {}}
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.list:
+        for name, spec in SCENARIOS.items():
+            opts = " stream" if spec.get("stream") else ""
+            print(f"{name:<26}{spec['suite']:<10}{spec['trades']:>9} trades {spec['candles']:>9} candles  "
+                  f"{spec['timestamps']} {spec['layout']} {spec['compress']}{opts}")
+        return
+
+    names = selected(args)
+    baseline = load_baseline(args.baseline)
+    if baseline.get("machine") and baseline["machine"] != machine() and not args.save_baseline:
+        print(f"Warning: baseline was recorded on {baseline['machine']}; timings may not be comparable", file=sys.stderr)
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    problems: List[str] = []
+    for name in names:
+        spec = SCENARIOS[name]
+        paths = dataset(args.work_dir, spec)
+        runs = [run_once(name, spec, paths, args.work_dir, args.profile) for _ in range(max(1, args.repeat))]
+        results[name] = best_of(runs)
+        base = baseline["scenarios"].get(name)
+        print_table(name, results[name], base)
+        if base and not args.save_baseline:
+            problems += compare(name, results[name], base, args)
+
+    report = {"machine": machine(), "repeat": args.repeat, "scenarios": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        baseline["scenarios"].update(results)
+        baseline["machine"] = report["machine"]
+        baseline["recorded_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Saved baseline for {len(results)} scenarios to {args.baseline}")
+        return
+    missing = [n for n in names if n not in baseline["scenarios"]]
+    if missing:
+        print(f"No baseline for: {', '.join(missing)} (run with --save-baseline)")
+    if problems:
+        print("\nRegressions:", file=sys.stderr)
+        for msg in problems:
+            print(f"  {msg}", file=sys.stderr)
+        sys.exit(1)
+    print("No regressions" if len(missing) < len(names) else "Nothing compared")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: trade normalization + metrics + equity + monthly breakdown.
+Compares the previous per-use timestamp parsing (kept below as legacy_*) with the TradeRecord path,
+where each trade's timestamps are parsed exactly once.
+
+Usage (from services/backtesting):
+  python3 benchmarks/bench_trades.py --trades 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_backtest  # noqa: E402
+
+
+def make_trades(n: int) -> List[Dict[str, Any]]:
+    """Freqtrade-like trades with ISO open/close dates on 5m candle boundaries."""
+    rng = random.Random(7)
+    base = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    trades = []
+    for _ in range(n):
+        o = base + timedelta(minutes=5 * rng.randint(0, 200_000))
+        c = o + timedelta(minutes=5 * rng.randint(1, 600))
+        profit = rng.gauss(0.4, 15)
+        trades.append({
+            "pair": rng.choice(("BTC/USDT", "ETH/USDT", "SOL/USDT")),
+            "open_date": o.isoformat(),
+            "close_date": c.isoformat(),
+            "open_rate": 100.0,
+            "close_rate": 100.0 + profit / 10,
+            "profit_abs": profit,
+            "profit_ratio": profit / 1000,
+            "exit_reason": "roi",
+        })
+    return trades
+
+
+# --- Previous implementation (each helper re-parses timestamps) ---
+
+def _legacy_ts(t: dict, keys: tuple) -> int:
+    for key in keys:
+        if key in t and t[key]:
+            v = t[key]
+            if isinstance(v, str):
+                try:
+                    return int(datetime.fromisoformat(v.replace("Z", "+00:00")).timestamp())
+                except Exception:
+                    pass
+    return 0
+
+
+def legacy_open(t):
+    return _legacy_ts(t, ("open_date_utc", "open_timestamp", "open_date"))
+
+
+def legacy_close(t):
+    return _legacy_ts(t, ("close_date_utc", "close_timestamp", "close_date"))
+
+
+def legacy_duration(t):
+    o, c = legacy_open(t), legacy_close(t)
+    return (c - o) / 60.0 if o and c else 0.0
+
+
+def legacy_pipeline(trades_raw, pair):
+    trades = []
+    for t in trades_raw:
+        profit_abs = float(t.get("profit_abs") or 0)
+        trades.append({
+            "pair": str(t.get("pair") or pair),
+            "open_time": legacy_open(t),
+            "close_time": legacy_close(t),
+            "open_rate": float(t.get("open_rate") or 0),
+            "close_rate": float(t.get("close_rate") or 0),
+            "profit_abs": round(profit_abs, 4),
+            "profit_ratio": round(float(t.get("profit_ratio") or 0), 6),
+            "duration_minutes": round(legacy_duration(t), 1),
+            "is_win": profit_abs > 0,
+        })
+    wins = sum(1 for x in trades if x["is_win"])
+    gross_profit = sum(x["profit_abs"] for x in trades if x["profit_abs"] > 0)
+    sorted_trades = sorted([t for t in trades_raw if legacy_close(t)], key=legacy_close)
+    equity = [{"time": legacy_open(sorted_trades[0]) or legacy_close(sorted_trades[0]), "value": 10000.0}]
+    cumulative = 0.0
+    for t in sorted_trades:
+        cumulative += float(t.get("profit_abs") or 0)
+        equity.append({"time": legacy_close(t), "value": round(10000.0 + cumulative, 2)})
+    monthly: Dict[str, Any] = {}
+    for tr in trades:
+        dt = datetime.utcfromtimestamp(tr["close_time"])
+        key = f"{dt.year}-{dt.month:02d}"
+        m = monthly.setdefault(key, {"year": dt.year, "month": dt.month, "profit_abs": 0.0, "trade_count": 0})
+        m["profit_abs"] += tr["profit_abs"]
+        m["trade_count"] += 1
+    return trades, equity, (wins, gross_profit), sorted(monthly.values(), key=lambda x: (x["year"], x["month"]))
+
+
+def record_pipeline(trades_raw, pair):
+    parse_backtest.iso_to_unix_seconds.cache_clear()
+    records = [parse_backtest.TradeRecord(t, pair) for t in trades_raw]
+    stats = parse_backtest.TradeStats()
+    for rec in records:
+        stats.add(rec)
+    equity = parse_backtest.build_equity_curve(records)
+    trades = [rec.to_dict() for rec in records]
+    return trades, equity, (stats.wins, stats.gross_profit), stats.monthly_breakdown()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark legacy vs TradeRecord trade normalization")
+    p.add_argument("--trades", type=int, default=100_000)
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    trades_raw = make_trades(args.trades)
+    timings = {}
+    results = {}
+    for name, fn in (("legacy", legacy_pipeline), ("records", record_pipeline)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = fn(trades_raw, "BTC/USDT")
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+
+    a, b = results["legacy"], results["records"]
+    if a[0] != b[0] or a[1] != b[1] or a[2][0] != b[2][0] or a[3] != b[3]:
+        print("MISMATCH between legacy and record pipelines", file=sys.stderr)
+        sys.exit(1)
+    print(f"trades={args.trades}")
+    print(f"legacy  {timings['legacy']:.3f}s")
+    print(f"records {timings['records']:.3f}s  ({timings['legacy'] / timings['records']:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic inputs for the parser benchmarks: a Freqtrade trades export plus the pairs'
+OHLCV data files, entirely offline. The same arguments always produce byte-identical files.
+
+  <out>/raw.json                               {"trades": [...], "backtest_stats": {...}}
+  <out>/data/binance/<PAIR>-<tf>.json[.gz]     list rows [[ms, o, h, l, c, v], ...] or dict rows
+
+Trades look like Freqtrade's: pair, stake/amount, fees, rates, profit, exit_reason, two orders, and
+either ISO dates ("2024-01-01 00:15:00+00:00", --timestamps iso) or millisecond epochs
+(open_timestamp/close_timestamp, --timestamps epoch). Opens and closes are on candle boundaries of
+a random walk, so profits match the candles. Trades are written one at a time, so 1M trades need
+no more memory than the candle arrays.
+
+Usage (from services/backtesting):
+  python3 benchmarks/generate_data.py --out /tmp/klineo-bench/100k --trades 100000 --candles 250000 \\
+      --timestamps epoch --layout dict --compress gzip
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+START_MS = 1672531200000  # 2023-01-01 00:00 UTC
+TIMEFRAME_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000}
+DEFAULT_PAIRS = ("BTC/USDT", "ETH/USDT")
+WALLET = 10000.0
+STAKE = 100.0
+FEE = 0.001
+
+
+def candles(rows: int, seed: int, start_price: float) -> Dict[str, np.ndarray]:
+    """Random-walk OHLCV columns (prices rounded like exchange data)."""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, 0.002, rows)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    wick = np.abs(rng.normal(0.0, 0.001, (2, rows)))
+    return {
+        "open": np.round(open_, 2),
+        "high": np.round(np.maximum(open_, close) * (1.0 + wick[0]), 2),
+        "low": np.round(np.minimum(open_, close) * (1.0 - wick[1]), 2),
+        "close": np.round(close, 2),
+        "volume": np.round(np.abs(rng.normal(50.0, 20.0, rows)), 4),
+    }
+
+
+def write_candles(path: str, times_ms: np.ndarray, cols: Dict[str, np.ndarray], layout: str) -> None:
+    keys = ("open", "high", "low", "close", "volume")
+    if path.endswith(".gz"):
+        # mtime=0: the gzip header does not depend on when the file was written
+        f = io.TextIOWrapper(gzip.GzipFile(path, "wb", mtime=0), encoding="utf-8")
+    else:
+        f = open(path, "w", encoding="utf-8")
+    with f:
+        f.write("[")
+        lists = [times_ms.tolist()] + [cols[k].tolist() for k in keys]
+        for i, row in enumerate(zip(*lists)):
+            if i:
+                f.write(",")
+            if layout == "list":
+                f.write(json.dumps(list(row), separators=(",", ":")))
+            else:
+                f.write(json.dumps({"date": row[0], **dict(zip(keys, row[1:]))}, separators=(",", ":")))
+        f.write("]")
+
+
+def _iso(ms: np.ndarray) -> List[str]:
+    text = np.datetime_as_string(ms.astype("datetime64[ms]"), unit="s")
+    return [s.replace("T", " ") + "+00:00" for s in text.tolist()]
+
+
+def write_trades(
+    path: str,
+    n: int,
+    pairs: Sequence[str],
+    times_ms: np.ndarray,
+    closes: Dict[str, np.ndarray],
+    timestamps: str,
+    seed: int,
+) -> None:
+    """n trades spread over pairs, one JSON object at a time."""
+    rng = np.random.default_rng(seed + 1)
+    rows = times_ms.size
+    step = int(times_ms[1] - times_ms[0]) if rows > 1 else 300_000
+    pair_idx = rng.integers(0, len(pairs), n)
+    entry = rng.integers(0, max(1, rows - 600), n)
+    entry.sort()
+    exit_ = np.minimum(entry + rng.integers(1, 600, n), rows - 1)
+    exit_reasons = np.array(["roi", "exit_signal", "stop_loss", "trailing_stop_loss"])[rng.integers(0, 4, n)]
+    open_ms, close_ms = times_ms[entry], times_ms[exit_]
+    open_iso = _iso(open_ms) if timestamps == "iso" else None
+    close_iso = _iso(close_ms) if timestamps == "iso" else None
+    total_profit = 0.0
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"trades": [')
+        for i in range(n):
+            pair = pairs[pair_idx[i]]
+            open_rate = float(closes[pair][entry[i]])
+            close_rate = float(closes[pair][exit_[i]])
+            amount = round(STAKE / open_rate, 8)
+            profit_abs = round(amount * close_rate * (1 - FEE) - amount * open_rate * (1 + FEE), 8)
+            total_profit += profit_abs
+            trade = {
+                "pair": pair,
+                "stake_amount": STAKE,
+                "max_stake_amount": STAKE,
+                "amount": amount,
+                "open_rate": open_rate,
+                "close_rate": close_rate,
+                "fee_open": FEE,
+                "fee_close": FEE,
+                "trade_duration": int((close_ms[i] - open_ms[i]) // 60_000),
+                "profit_ratio": round(profit_abs / (STAKE * (1 + FEE)), 8),
+                "profit_abs": profit_abs,
+                "exit_reason": str(exit_reasons[i]),
+                "initial_stop_loss_abs": round(open_rate * 0.92, 8),
+                "initial_stop_loss_ratio": -0.08,
+                "min_rate": round(min(open_rate, close_rate) * 0.995, 8),
+                "max_rate": round(max(open_rate, close_rate) * 1.005, 8),
+                "is_open": False,
+                "enter_tag": "",
+                "leverage": 1.0,
+                "is_short": False,
+            }
+            if timestamps == "iso":
+                trade["open_date"] = open_iso[i]
+                trade["close_date"] = close_iso[i]
+            else:
+                trade["open_timestamp"] = int(open_ms[i])
+                trade["close_timestamp"] = int(close_ms[i])
+            trade["orders"] = [
+                {"amount": amount, "safe_price": open_rate, "ft_order_side": "buy", "order_filled_timestamp": int(open_ms[i] + step // 10), "ft_is_entry": True},
+                {"amount": amount, "safe_price": close_rate, "ft_order_side": "sell", "order_filled_timestamp": int(close_ms[i] + step // 10), "ft_is_entry": False},
+            ]
+            if i:
+                f.write(",")
+            f.write(json.dumps(trade, separators=(",", ":")))
+        stats = {
+            "profit_total": round(total_profit / WALLET, 6),
+            "starting_balance": WALLET,
+            "final_balance": round(WALLET + total_profit, 4),
+        }
+        f.write(f'], "backtest_stats": {json.dumps(stats)}}}')
+
+
+def generate(
+    out: str,
+    trades: int,
+    candle_rows: int,
+    timestamps: str = "iso",
+    layout: str = "list",
+    compress: str = "none",
+    pairs: Sequence[str] = DEFAULT_PAIRS,
+    timeframe: str = "5m",
+    seed: int = 7,
+) -> Dict[str, str]:
+    """Write the dataset to out; returns raw path, data dir and the matching timerange."""
+    step = TIMEFRAME_MS[timeframe]
+    times_ms = START_MS + np.arange(candle_rows, dtype=np.int64) * step
+    data_dir = os.path.join(out, "data")
+    os.makedirs(os.path.join(data_dir, "binance"), exist_ok=True)
+    closes = {}
+    for k, pair in enumerate(pairs):
+        cols = candles(candle_rows, seed + 100 + k, 100.0 * 10 ** (len(pairs) - k))
+        closes[pair] = cols["close"]
+        ext = ".json.gz" if compress == "gzip" else ".json"
+        write_candles(os.path.join(data_dir, "binance", f"{pair.replace('/', '_')}-{timeframe}{ext}"), times_ms, cols, layout)
+    raw = os.path.join(out, "raw.json")
+    write_trades(raw, trades, list(pairs), times_ms, closes, timestamps, seed)
+    first, last = np.datetime_as_string(times_ms[[0, -1]].astype("datetime64[ms]"), unit="D").tolist()
+    return {"raw": raw, "data_dir": data_dir, "timerange": f"{first.replace('-', '')}-{last.replace('-', '')}"}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Generate a synthetic Freqtrade export + OHLCV data for parser benchmarks")
+    p.add_argument("--out", required=True, help="Output directory")
+    p.add_argument("--trades", type=int, default=10_000)
+    p.add_argument("--candles", type=int, default=100_000, help="Candles per pair")
+    p.add_argument("--timestamps", choices=("iso", "epoch"), default="iso")
+    p.add_argument("--layout", choices=("list", "dict"), default="list", help="Candle row layout")
+    p.add_argument("--compress", choices=("none", "gzip"), default="none", help="Candle file compression")
+    p.add_argument("--pairs", default=",".join(DEFAULT_PAIRS))
+    p.add_argument("--timeframe", choices=sorted(TIMEFRAME_MS), default="5m")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+    paths = generate(args.out, args.trades, args.candles, args.timestamps, args.layout, args.compress, pairs, args.timeframe, args.seed)
+    print(json.dumps(paths))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Persistent decoded-candle cache for Freqtrade OHLCV files.
+Entries are keyed by (exchange, pair, timeframe, source path, source mtime, source size) and stored as flat
+binary columns that are memory-mapped on read (zero-copy). Size is bounded with LRU eviction.
+
+Usage (inspect / clear):
+  python3 candle_cache.py --cache-dir output/cache/candles --stats
+  python3 candle_cache.py --cache-dir output/cache/candles --clear
+"""
+
+import argparse
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+import ohlcv_columns
+from ohlcv_columns import OhlcvColumns, mmap_columns, save_columns
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+ENTRY_SUFFIX = ohlcv_columns.COLUMNS_SUFFIX
+
+
+def default_cache_dir() -> str:
+    return os.environ.get(
+        "KLINEO_CANDLE_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "cache", "candles"),
+    )
+
+
+class CandleCache:
+    """On-disk cache of decoded candles; one file per (exchange, pair, timeframe, source version)."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("KLINEO_CANDLE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # --- keys ---
+
+    @staticmethod
+    def _prefix(source_path: str, exchange: str, pair: str, timeframe: str) -> str:
+        # The source path is part of the prefix: other data dirs with the same pair/timeframe keep their entries
+        source = hashlib.sha1(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:8]
+        return f"{exchange}_{pair.replace('/', '_')}-{timeframe}.{source}."
+
+    def entry_path(self, source_path: str, exchange: str, pair: str, timeframe: str) -> str:
+        st = os.stat(source_path)
+        version = f"{os.path.abspath(source_path)}|{st.st_mtime_ns}|{st.st_size}"
+        digest = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, self._prefix(source_path, exchange, pair, timeframe) + digest + ENTRY_SUFFIX)
+
+    # --- read / write ---
+
+    def get(self, source_path: str, exchange: str, pair: str, timeframe: str) -> Optional[OhlcvColumns]:
+        path = self.entry_path(source_path, exchange, pair, timeframe)
+        if not os.path.isfile(path):
+            return None
+        try:
+            cols = mmap_columns(path)
+        except (OSError, ValueError):
+            return None
+        # Access time for LRU; mtime is used because atime is often disabled (noatime)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cols
+
+    def put(self, source_path: str, exchange: str, pair: str, timeframe: str, cols: OhlcvColumns) -> str:
+        path = self.entry_path(source_path, exchange, pair, timeframe)
+        # Older versions of the same source are never read again
+        prefix = self._prefix(source_path, exchange, pair, timeframe)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(ENTRY_SUFFIX) and os.path.join(self.cache_dir, name) != path:
+                _unlink_quiet(os.path.join(self.cache_dir, name))
+        save_columns(path, cols)
+        self.evict()
+        return path
+
+    def load(self, data_dir: str, pair: str, timeframe: str, exchange: str = "binance") -> Optional[OhlcvColumns]:
+        """Cached equivalent of ohlcv_columns.load_ohlcv_columns."""
+        source = ohlcv_columns.ohlcv_path(data_dir, pair, timeframe, exchange)
+        if not source:
+            return None
+        cols = self.get(source, exchange, pair, timeframe)
+        if cols is not None:
+            self.hits += 1
+            return cols
+        self.misses += 1
+        cols = ohlcv_columns.load_ohlcv_file(source)
+        if cols is None:
+            return None
+        try:
+            path = self.put(source, exchange, pair, timeframe, cols)
+            return mmap_columns(path)
+        except OSError:
+            return cols
+
+    # --- eviction ---
+
+    def entries(self) -> List[Dict[str, float]]:
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append({"path": path, "size": st.st_size, "used": st.st_mtime})
+        return out
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in max_bytes. Returns entries removed."""
+        entries = sorted(self.entries(), key=lambda e: e["used"])
+        total = sum(e["size"] for e in entries)
+        removed = 0
+        for e in entries:
+            if total <= self.max_bytes:
+                break
+            if _unlink_quiet(e["path"]):
+                total -= e["size"]
+                removed += 1
+        return removed
+
+    def clear(self) -> int:
+        removed = 0
+        for e in self.entries():
+            removed += 1 if _unlink_quiet(e["path"]) else 0
+        return removed
+
+
+def load_columns(data_dir: str, pair: str, timeframe: str, cache_dir: Optional[str] = None) -> Optional[OhlcvColumns]:
+    """Decoded candles for pair/timeframe, through the cache when cache_dir is given."""
+    if cache_dir:
+        return CandleCache(cache_dir).load(data_dir, pair, timeframe)
+    return ohlcv_columns.load_ohlcv_columns(data_dir, pair, timeframe)
+
+
+def _unlink_quiet(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+def main():
+    p = argparse.ArgumentParser(description="Inspect or clear the Klineo decoded-candle cache")
+    p.add_argument("--cache-dir", default=None, help="Cache directory (default: output/cache/candles)")
+    p.add_argument("--stats", action="store_true", help="Print entry count and total size")
+    p.add_argument("--clear", action="store_true", help="Remove all entries")
+    args = p.parse_args()
+
+    cache = CandleCache(args.cache_dir)
+    if args.clear:
+        print(f"Removed {cache.clear()} entries from {cache.cache_dir}")
+    if args.stats or not args.clear:
+        entries = cache.entries()
+        total = sum(e["size"] for e in entries)
+        print(f"{cache.cache_dir}: {len(entries)} entries, {total / 1024 ** 2:.1f} MiB (max {cache.max_bytes / 1024 ** 2:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
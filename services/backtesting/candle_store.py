@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-pair candle sidecars for normalized backtest results.
+Instead of inlining one pair's full history as tv_ohlc, every backtested pair is written to
+<normalized>.candles/<PAIR>.ohlcv (binary columns, sorted by time) plus an index.json, and any
+time window can be read back with a binary search without loading the whole range.
+
+Usage (serve a chart viewport; prints tv_ohlc-shaped JSON):
+  python3 candle_store.py output/normalized/KlineoEmaRsiTrend_15m_20240101-20251231.candles \\
+    --pair ETH/USDT --start 1717200000 --end 1719791999
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import candle_cache
+from ohlcv_columns import COLUMNS_SUFFIX, OhlcvColumns, mmap_columns, save_columns
+
+SIDECAR_FORMAT = "klineo-ohlcv-v1"
+INDEX_FILE = "index.json"
+
+
+def sidecar_dir_for(out_path: str) -> str:
+    """output/normalized/X.json -> output/normalized/X.candles"""
+    base, _ = os.path.splitext(out_path)
+    return base + ".candles"
+
+
+def pair_file(pair: str) -> str:
+    return pair.replace("/", "_") + COLUMNS_SUFFIX
+
+
+def write_sidecars(
+    sidecar_dir: str,
+    data_dir: str,
+    pairs: List[str],
+    timeframe: str,
+    cache_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Write one column file per pair and index.json; returns the index (also embedded in the payload)."""
+    os.makedirs(sidecar_dir, exist_ok=True)
+    index: Dict[str, Any] = {"format": SIDECAR_FORMAT, "timeframe": timeframe, "pairs": {}}
+    for pair in pairs:
+        cols = candle_cache.load_columns(data_dir, pair, timeframe, cache_dir)
+        if cols is None or not len(cols):
+            continue
+        name = pair_file(pair)
+        save_columns(os.path.join(sidecar_dir, name), cols)
+        index["pairs"][pair] = {
+            "file": name,
+            "rows": len(cols),
+            "first_time": int(cols.time[0]),
+            "last_time": int(cols.time[-1]),
+        }
+    with open(os.path.join(sidecar_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def open_pair(sidecar_dir: str, pair: str) -> Optional[OhlcvColumns]:
+    path = os.path.join(sidecar_dir, pair_file(pair))
+    if not os.path.isfile(path):
+        return None
+    return mmap_columns(path)
+
+
+def read_window(
+    sidecar_dir: str,
+    pair: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """tv_ohlc rows for pair with start <= time <= end; only the rows in the window are materialized."""
+    cols = open_pair(sidecar_dir, pair)
+    if cols is None:
+        return []
+    return cols.window(start, end).to_tv()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Read a time window of candles from a Klineo candle sidecar dir")
+    p.add_argument("sidecar_dir", help="<normalized>.candles directory")
+    p.add_argument("--pair", required=True, help="Pair (e.g. BTC/USDT)")
+    p.add_argument("--start", type=int, default=None, help="Window start (Unix seconds, inclusive)")
+    p.add_argument("--end", type=int, default=None, help="Window end (Unix seconds, inclusive)")
+    args = p.parse_args()
+
+    if not os.path.isdir(args.sidecar_dir):
+        print(f"Error: sidecar dir not found: {args.sidecar_dir}", file=sys.stderr)
+        sys.exit(1)
+    json.dump(read_window(args.sidecar_dir, args.pair, args.start, args.end), sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite catalog of normalized results for marketplace queries.
+Every result is one JSON file in output/normalized/; ranking strategies across them would mean
+opening and parsing every file. The parser upserts each result's metrics, monthly breakdown, pairs
+and trades into output/catalog.sqlite (KLINEO_CATALOG_DB), so leaderboards and per-month aggregates
+are indexed SQL queries instead.
+
+- One row per result file (results), keyed by its path; metrics are real columns, plus the full
+  metrics object as JSON. monthly, result_pairs and trades hang off the result id.
+- WAL mode: readers (the API) never block the writer (a backtest finishing) and vice versa.
+- An upsert is one transaction that replaces the result's rows; monthly and trades are inserted
+  with executemany from generators, so a stream-mode parse never holds all trades in memory.
+- ingest_file() skips files that are unchanged since their last ingest (size + mtime, then a
+  content digest), so re-ingesting output/normalized/ or a result-cache hit is cheap.
+
+Usage:
+  python3 catalog.py ingest output/normalized/             # backfill existing results
+  python3 catalog.py top --timeframe 15m --max-drawdown 10 --sort profit_factor --limit 20
+  python3 catalog.py monthly --strategy KlineoEmaRsiTrend --year 2025
+  python3 catalog.py pairs output/normalized/KlineoEmaRsiTrend_15m_20240101-20251231.json
+  python3 catalog.py stats
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from result_cache import timerange_bounds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+
+# Metric columns of the results table (null when a result does not have the metric)
+METRIC_COLUMNS = (
+    "total_trades",
+    "win_rate",
+    "profit_percent",
+    "max_drawdown_percent",
+    "profit_factor",
+    "sharpe_ratio",
+    "sortino_ratio",
+    "calmar_ratio",
+    "cagr_percent",
+    "volatility_percent",
+    "max_drawdown_duration_days",
+    "avg_trade_duration_minutes",
+    "avg_profit_per_trade",
+    "total_profit_abs",
+    "max_drawdown_percent_mtm",
+    "max_drawdown_percent_p95",
+    "risk_of_ruin_percent",
+)
+SORTABLE = METRIC_COLUMNS + ("updated_at",)
+TRADE_COLUMNS = (
+    "pair", "open_time", "close_time", "open_rate", "close_rate",
+    "profit_abs", "profit_ratio", "duration_minutes", "is_win",
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    strategy TEXT NOT NULL,
+    timeframe TEXT,
+    exchange TEXT,
+    pairs TEXT,
+    timerange TEXT,
+    start_time INTEGER,
+    end_time INTEGER,
+    approximate INTEGER NOT NULL DEFAULT 0,
+    {", ".join(f"{c} {'INTEGER' if c == 'total_trades' else 'REAL'}" for c in METRIC_COLUMNS)},
+    metrics_json TEXT,
+    file_size INTEGER,
+    file_mtime_ns INTEGER,
+    file_digest TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS results_tf_profit_factor ON results (timeframe, profit_factor);
+CREATE INDEX IF NOT EXISTS results_tf_profit ON results (timeframe, profit_percent);
+CREATE INDEX IF NOT EXISTS results_tf_sharpe ON results (timeframe, sharpe_ratio);
+CREATE INDEX IF NOT EXISTS results_drawdown ON results (max_drawdown_percent);
+CREATE INDEX IF NOT EXISTS results_strategy ON results (strategy, timeframe);
+CREATE TABLE IF NOT EXISTS result_pairs (
+    pair TEXT NOT NULL,
+    result_id INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+    PRIMARY KEY (pair, result_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly (
+    result_id INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    profit_abs REAL,
+    trade_count INTEGER,
+    PRIMARY KEY (result_id, year, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS monthly_year_month ON monthly (year, month);
+CREATE TABLE IF NOT EXISTS trades (
+    result_id INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    pair TEXT,
+    open_time INTEGER,
+    close_time INTEGER,
+    open_rate REAL,
+    close_rate REAL,
+    profit_abs REAL,
+    profit_ratio REAL,
+    duration_minutes REAL,
+    is_win INTEGER,
+    PRIMARY KEY (result_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+def default_db_path() -> str:
+    return os.environ.get("KLINEO_CATALOG_DB", os.path.join(SCRIPT_DIR, "output", "catalog.sqlite"))
+
+
+def enabled() -> bool:
+    """KLINEO_CATALOG=0 turns the pipeline's catalog upserts off."""
+    return os.environ.get("KLINEO_CATALOG", "1") != "0"
+
+
+def parser_args() -> List[str]:
+    """parse_backtest.py arguments that catalog its result (none with KLINEO_CATALOG=0)."""
+    return ["--catalog", default_db_path()] if enabled() else []
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """Open (and create) the catalog in WAL mode."""
+    path = path or default_db_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _number(v: Any) -> Optional[float]:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+
+def upsert(
+    conn: sqlite3.Connection,
+    path: str,
+    payload: Dict[str, Any],
+    trades: Optional[Iterable[Dict[str, Any]]] = None,
+    file_digest: Optional[str] = None,
+) -> int:
+    """
+    Insert or replace the result at path. payload is the normalized result (trades may be left out
+    of it and passed as an iterable instead). Returns the result id.
+    """
+    path = os.path.abspath(path)
+    metrics = payload.get("metrics") or {}
+    pairs = [str(p) for p in payload.get("pairs") or []]
+    try:
+        start, end = timerange_bounds(payload.get("timerange") or "")
+    except ValueError:
+        start = end = None
+    try:
+        st = os.stat(path)
+        size, mtime = st.st_size, st.st_mtime_ns
+    except OSError:
+        size = mtime = None
+    row = {
+        "path": path,
+        "strategy": payload.get("strategy") or "",
+        "timeframe": payload.get("timeframe"),
+        "exchange": payload.get("exchange_data_source"),
+        "pairs": ",".join(pairs),
+        "timerange": payload.get("timerange"),
+        "start_time": start,
+        "end_time": end,
+        "approximate": int(bool(payload.get("approximate"))),
+        **{c: _number(metrics.get(c)) for c in METRIC_COLUMNS},
+        "metrics_json": json.dumps(metrics),
+        "file_size": size,
+        "file_mtime_ns": mtime,
+        "file_digest": file_digest,
+        "updated_at": time.time(),
+    }
+    if trades is None:
+        trades = payload.get("trades") or []
+    columns = ", ".join(row)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != "path")
+    with transaction(conn):
+        conn.execute(
+            f"INSERT INTO results ({columns}) VALUES ({', '.join('?' * len(row))}) "
+            f"ON CONFLICT (path) DO UPDATE SET {updates}",
+            tuple(row.values()),
+        )
+        result_id = conn.execute("SELECT id FROM results WHERE path = ?", (path,)).fetchone()[0]
+        for table in ("result_pairs", "monthly", "trades"):
+            conn.execute(f"DELETE FROM {table} WHERE result_id = ?", (result_id,))
+        conn.executemany("INSERT OR IGNORE INTO result_pairs (pair, result_id) VALUES (?, ?)", ((p, result_id) for p in pairs))
+        conn.executemany(
+            "INSERT OR REPLACE INTO monthly (result_id, year, month, profit_abs, trade_count) VALUES (?, ?, ?, ?, ?)",
+            (
+                (result_id, m.get("year"), m.get("month"), m.get("profit_abs"), m.get("trade_count"))
+                for m in payload.get("monthly_pnl_breakdown") or []
+            ),
+        )
+        conn.executemany(
+            f"INSERT INTO trades (result_id, seq, {', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * (len(TRADE_COLUMNS) + 2))})",
+            (
+                (result_id, seq, *(int(bool(t.get(c))) if c == "is_win" else t.get(c) for c in TRADE_COLUMNS))
+                for seq, t in enumerate(trades)
+            ),
+        )
+    return result_id
+
+
+def _digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ingest_file(conn: sqlite3.Connection, path: str, force: bool = False) -> bool:
+    """Upsert a normalized result file (.json / .kcol, any compression); False when it was unchanged."""
+    import columnar_output
+
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    known = conn.execute("SELECT file_size, file_mtime_ns, file_digest FROM results WHERE path = ?", (path,)).fetchone()
+    if known and not force and known["file_size"] == st.st_size:
+        if known["file_mtime_ns"] == st.st_mtime_ns:
+            return False
+        # Rewritten with the same bytes (e.g. restored from the result cache): only note the new mtime
+        digest = _digest(path)
+        if known["file_digest"] == digest:
+            conn.execute("UPDATE results SET file_mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, path))
+            return False
+    else:
+        digest = _digest(path)
+    upsert(conn, path, columnar_output.load(path), file_digest=digest)
+    return True
+
+
+def record(path: str, db: Optional[str] = None) -> None:
+    """ingest_file on its own connection, for pipeline steps that skip the parser (result-cache hits); failures only warn."""
+    if not enabled():
+        return
+    try:
+        conn = connect(db)
+        try:
+            ingest_file(conn, path)
+        finally:
+            conn.close()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Warning: catalog ingest of {path} failed: {e}", file=sys.stderr)
+
+
+def result_files(paths: Iterable[str]) -> List[str]:
+    """Normalized result files among paths (directories are listed, stage sidecars skipped)."""
+    out = []
+    for path in paths:
+        if os.path.isdir(path):
+            out += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith((".json", ".kcol")) and not name.endswith(".stages.json")
+            )
+        else:
+            out.append(path)
+    return out
+
+
+def remove(conn: sqlite3.Connection, path: str) -> bool:
+    with transaction(conn):
+        return conn.execute("DELETE FROM results WHERE path = ?", (os.path.abspath(path),)).rowcount > 0
+
+
+# --- Queries ---
+
+def _where(
+    timeframe: Optional[str] = None,
+    strategy: Optional[str] = None,
+    pair: Optional[str] = None,
+    max_drawdown: Optional[float] = None,
+    min_trades: Optional[int] = None,
+    min_profit_factor: Optional[float] = None,
+    include_approximate: bool = False,
+):
+    clauses, params = [], []
+    if timeframe:
+        clauses.append("r.timeframe = ?")
+        params.append(timeframe)
+    if strategy:
+        clauses.append("r.strategy = ?")
+        params.append(strategy)
+    if pair:
+        clauses.append("r.id IN (SELECT result_id FROM result_pairs WHERE pair = ?)")
+        params.append(pair)
+    if max_drawdown is not None:
+        clauses.append("r.max_drawdown_percent < ?")
+        params.append(max_drawdown)
+    if min_trades is not None:
+        clauses.append("r.total_trades >= ?")
+        params.append(min_trades)
+    if min_profit_factor is not None:
+        clauses.append("r.profit_factor >= ?")
+        params.append(min_profit_factor)
+    if not include_approximate:
+        clauses.append("r.approximate = 0")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def leaderboard(
+    conn: sqlite3.Connection,
+    sort: str = "profit_factor",
+    descending: bool = True,
+    limit: int = 20,
+    offset: int = 0,
+    **filters: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Results ranked by a metric column (results without it are left out), e.g. the top strategies by
+    profit factor with drawdown < 10% on 15m: leaderboard(conn, "profit_factor", timeframe="15m", max_drawdown=10).
+    Filters: timeframe, strategy, pair, max_drawdown, min_trades, min_profit_factor, include_approximate.
+    """
+    if sort not in SORTABLE:
+        raise ValueError(f"cannot sort by {sort!r} (one of {', '.join(SORTABLE)})")
+    where, params = _where(**filters)
+    where += (" AND " if where else " WHERE ") + f"r.{sort} IS NOT NULL"
+    cols = ", ".join(f"r.{c}" for c in ("path", "strategy", "timeframe", "pairs", "timerange", "approximate") + METRIC_COLUMNS)
+    order = "DESC" if descending else "ASC"
+    rows = conn.execute(
+        f"SELECT {cols} FROM results r{where} "
+        # Ties in id order of the same direction, so (timeframe, metric) indexes give the order without a sort
+        f"ORDER BY r.{sort} {order}, r.id {order} LIMIT ? OFFSET ?",
+        params + [limit, offset],
+    )
+    return [dict(row) for row in rows]
+
+
+def monthly(conn: sqlite3.Connection, year: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+    """Per (year, month) over the matching results: result count, trades, total/mean profit, profitable share."""
+    where, params = _where(**filters)
+    if year is not None:
+        where += (" AND " if where else " WHERE ") + "m.year = ?"
+        params.append(year)
+    rows = conn.execute(
+        "SELECT m.year, m.month, COUNT(*) AS results, SUM(m.trade_count) AS trades, "
+        "ROUND(SUM(m.profit_abs), 4) AS profit_abs, ROUND(AVG(m.profit_abs), 4) AS avg_profit_abs, "
+        "ROUND(100.0 * SUM(m.profit_abs > 0) / COUNT(*), 2) AS profitable_percent "
+        f"FROM monthly m JOIN results r ON r.id = m.result_id{where} "
+        "GROUP BY m.year, m.month ORDER BY m.year, m.month",
+        params,
+    )
+    return [dict(row) for row in rows]
+
+
+def pair_stats(conn: sqlite3.Connection, path: str) -> List[Dict[str, Any]]:
+    """Per-pair trade count, win rate and profit of one result, from its trades."""
+    rows = conn.execute(
+        "SELECT t.pair, COUNT(*) AS trades, ROUND(100.0 * SUM(t.is_win) / COUNT(*), 2) AS win_rate, "
+        "ROUND(SUM(t.profit_abs), 4) AS profit_abs, ROUND(AVG(t.duration_minutes), 1) AS avg_duration_minutes "
+        "FROM trades t JOIN results r ON r.id = t.result_id WHERE r.path = ? "
+        "GROUP BY t.pair ORDER BY profit_abs DESC",
+        (os.path.abspath(path),),
+    )
+    return [dict(row) for row in rows]
+
+
+def stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    return {
+        key: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for key, table in (("results", "results"), ("monthly_rows", "monthly"), ("trades", "trades"))
+    }
+
+
+LEADERBOARD_COLUMNS = (
+    "strategy", "timeframe", "timerange", "pairs", "total_trades",
+    "profit_percent", "max_drawdown_percent", "profit_factor", "sharpe_ratio",
+)
+
+
+def _print_rows(rows: List[Dict[str, Any]], columns: Iterable[str]) -> None:
+    columns = list(columns)
+    table = [[("" if row.get(c) is None else str(row[c])) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in table]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip())
+    for r in table:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+
+
+def main():
+    p = argparse.ArgumentParser(description="SQLite catalog of Klineo normalized results")
+    p.add_argument("--db", default=None, help="Catalog path (default: KLINEO_CATALOG_DB or output/catalog.sqlite)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    ing = sub.add_parser("ingest", help="Upsert result files or directories")
+    ing.add_argument("paths", nargs="*", default=[OUTPUT_NORM])
+    ing.add_argument("--force", action="store_true", help="Re-ingest unchanged files too")
+
+    def filters(sp):
+        sp.add_argument("--timeframe")
+        sp.add_argument("--strategy")
+        sp.add_argument("--pair")
+        sp.add_argument("--max-drawdown", type=float, default=None, help="max_drawdown_percent below this")
+        sp.add_argument("--min-trades", type=int, default=None)
+        sp.add_argument("--min-profit-factor", type=float, default=None)
+        sp.add_argument("--include-approximate", action="store_true", help="Include preview results")
+        sp.add_argument("--json", action="store_true")
+
+    top = sub.add_parser("top", help="Leaderboard sorted by a metric")
+    top.add_argument("--sort", choices=SORTABLE, default="profit_factor")
+    top.add_argument("--asc", action="store_true", help="Ascending (e.g. --sort max_drawdown_percent --asc)")
+    top.add_argument("--limit", type=int, default=20)
+    top.add_argument("--offset", type=int, default=0)
+    filters(top)
+    mon = sub.add_parser("monthly", help="Per-month aggregates over the matching results")
+    mon.add_argument("--year", type=int, default=None)
+    filters(mon)
+    prs = sub.add_parser("pairs", help="Per-pair stats of one result")
+    prs.add_argument("path")
+    rm = sub.add_parser("remove", help="Drop a result")
+    rm.add_argument("path")
+    sub.add_parser("stats", help="Row counts")
+    args = p.parse_args()
+
+    conn = connect(args.db)
+    filter_args = {}
+    if args.command in ("top", "monthly"):
+        filter_args = {
+            k: getattr(args, k)
+            for k in ("timeframe", "strategy", "pair", "max_drawdown", "min_trades", "min_profit_factor", "include_approximate")
+        }
+    if args.command == "ingest":
+        files = result_files(args.paths)
+        changed = 0
+        for path in files:
+            try:
+                changed += ingest_file(conn, path, args.force)
+            except (OSError, ValueError) as e:
+                print(f"Warning: {path}: {e}", file=sys.stderr)
+        print(f"[Klineo Catalog] {changed} of {len(files)} results upserted into {args.db or default_db_path()}")
+    elif args.command == "top":
+        rows = leaderboard(conn, args.sort, not args.asc, args.limit, args.offset, **filter_args)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            _print_rows(rows, LEADERBOARD_COLUMNS + (() if args.sort in LEADERBOARD_COLUMNS else (args.sort,)))
+    elif args.command == "monthly":
+        rows = monthly(conn, args.year, **filter_args)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            _print_rows(rows, ("year", "month", "results", "trades", "profit_abs", "avg_profit_abs", "profitable_percent"))
+    elif args.command == "pairs":
+        _print_rows(pair_stats(conn, args.path), ("pair", "trades", "win_rate", "profit_abs", "avg_duration_minutes"))
+    elif args.command == "remove":
+        print("Removed" if remove(conn, args.path) else "Not in the catalog")
+    else:
+        print(json.dumps(stats(conn)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Compact columnar encoding of normalized backtest results.
+tv_ohlc, tv_equity, trades (and tv_ohlc_levels) are stored as column arrays instead of one dict per
+row: timestamps are delta-encoded, strings (pairs) dictionary-encoded and booleans stored as 0/1.
+Everything else in the payload is kept as is. The file is compact JSON, optionally gzip or zstd
+compressed; load() detects the compression and rebuilds the regular normalized JSON shape.
+dump_stream() writes the same document from row iterators with flat memory: each table is spooled
+to one temp file per column, then every column is encoded from its file.
+
+Usage:
+  python3 columnar_output.py expand output/normalized/X.kcol --out X.json     # columnar -> JSON
+  python3 columnar_output.py compact output/normalized/X.json --out X.kcol --compress gzip
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+from itertools import accumulate, islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+# Optional: zstd compression (pip install zstandard)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COLUMNAR_FORMAT = "klineo-columnar-v1"
+COLUMNAR_SUFFIX = ".kcol"
+TABLE_KEYS = ("tv_ohlc", "tv_equity", "trades")
+LEVELS_KEY = "tv_ohlc_levels"
+# Integer timestamp columns that are delta-encoded
+TIME_COLUMNS = ("time", "open_time", "close_time")
+COMPRESSIONS = ("none", "gzip", "zstd")
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# String columns with more distinct values than this are stored as plain lists
+DICT_MAX_WORDS = 65536
+_COMPACT = (",", ":")
+# Values joined per write by the streamed encoder
+WRITE_CHUNK = 4096
+_encode = json.JSONEncoder(separators=_COMPACT).encode
+_encode_str = json.encoder.encode_basestring_ascii
+
+
+# --- Columns ---
+
+def _is_int(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def encode_column(name: str, values: List[Any]) -> Any:
+    """Plain list, or {"delta": [...]}, {"dict": [...], "index": [...]}, {"bool": [...]}."""
+    if values and name in TIME_COLUMNS and all(_is_int(v) for v in values):
+        return {"delta": [values[0]] + [b - a for a, b in zip(values, values[1:])]}
+    if values and all(isinstance(v, bool) for v in values):
+        return {"bool": [int(v) for v in values]}
+    if values and all(isinstance(v, str) for v in values) and len(set(values)) <= DICT_MAX_WORDS:
+        lookup: Dict[str, int] = {}
+        index = [lookup.setdefault(v, len(lookup)) for v in values]
+        return {"dict": list(lookup), "index": index}
+    return values
+
+
+def decode_column(col: Any) -> List[Any]:
+    if isinstance(col, list):
+        return col
+    if "delta" in col:
+        return list(accumulate(col["delta"]))
+    if "bool" in col:
+        return [bool(v) for v in col["bool"]]
+    if "dict" in col:
+        words = col["dict"]
+        return [words[i] for i in col["index"]]
+    raise ValueError(f"Unknown column encoding: {sorted(col)}")
+
+
+def encode_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """List (or iterator) of same-shaped dicts -> {"length": n, "columns": {name: encoded column}}."""
+    columns: Dict[str, List[Any]] = {}
+    n = 0
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                # Key first seen mid-table: earlier rows did not have it
+                columns[key] = [None] * n
+        for key, values in columns.items():
+            values.append(row.get(key))
+        n += 1
+    return {"length": n, "columns": {name: encode_column(name, values) for name, values in columns.items()}}
+
+
+class _ColumnSpool:
+    """One column of a streamed table: values as JSON lines in a temp file, plus what encode_column needs."""
+
+    def __init__(self, name: str, leading_nulls: int):
+        self.name = name
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.all_int = name in TIME_COLUMNS
+        self.all_bool = True
+        self.all_str = True
+        # Distinct strings by their JSON text, in first-seen order (dropped past DICT_MAX_WORDS)
+        self.words: Dict[str, int] = {}
+        self.pending: List[str] = []
+        for _ in range(leading_nulls):
+            self.add(None)
+
+    def add(self, value: Any) -> None:
+        kind = type(value)
+        if kind is str:
+            text = _encode_str(value)
+            if self.all_str and (text in self.words or len(self.words) < DICT_MAX_WORDS):
+                self.words.setdefault(text, len(self.words))
+            elif self.all_str:
+                self.all_str = False
+                self.words = {}
+        else:
+            text = "true" if value is True else "false" if value is False else _encode(value)
+            if self.all_str:
+                self.all_str = False
+                self.words = {}
+        self.all_int = self.all_int and kind is int
+        self.all_bool = self.all_bool and kind is bool
+        self.pending.append(text)
+        if len(self.pending) >= WRITE_CHUNK:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.pending:
+            self.file.write("\n".join(self.pending))
+            self.file.write("\n")
+            self.pending = []
+
+    def _lines(self) -> Iterator[str]:
+        self._flush()
+        self.file.seek(0)
+        return (line[:-1] for line in self.file)
+
+    def _deltas(self) -> Iterator[str]:
+        prev = 0
+        for line in self._lines():
+            v = int(line)
+            yield str(v - prev)
+            prev = v
+
+    @staticmethod
+    def _write_list(f: IO[str], items: Iterable[str]) -> None:
+        f.write("[")
+        items = iter(items)
+        chunk = ",".join(islice(items, WRITE_CHUNK))
+        while chunk:
+            f.write(chunk)
+            chunk = ",".join(islice(items, WRITE_CHUNK))
+            if chunk:
+                f.write(",")
+        f.write("]")
+
+    def write(self, f: IO[str], n: int) -> None:
+        """Same text as encode_column(name, values) dumped with the dump() separators."""
+        if n and self.all_int:
+            f.write('{"delta":')
+            self._write_list(f, self._deltas())
+            f.write("}")
+        elif n and self.all_bool:
+            f.write('{"bool":')
+            self._write_list(f, ("1" if line == "true" else "0" for line in self._lines()))
+            f.write("}")
+        elif n and self.all_str:
+            f.write('{"dict":')
+            self._write_list(f, self.words)
+            f.write(',"index":')
+            words = self.words
+            self._write_list(f, (str(words[line]) for line in self._lines()))
+            f.write("}")
+        else:
+            self._write_list(f, self._lines())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def write_rows(f: IO[str], rows: Iterable[Dict[str, Any]]) -> int:
+    """Streamed encode_rows: writes the table to f as compact JSON, one column at a time; returns its length."""
+    spools: Dict[str, _ColumnSpool] = {}
+    n = 0
+    try:
+        for row in rows:
+            for key in row:
+                if key not in spools:
+                    # Key first seen mid-table: earlier rows did not have it
+                    spools[key] = _ColumnSpool(key, n)
+            for key, spool in spools.items():
+                spool.add(row.get(key))
+            n += 1
+        f.write(f'{{"length":{n},"columns":{{')
+        for i, (name, spool) in enumerate(spools.items()):
+            f.write(("," if i else "") + json.dumps(name) + ":")
+            spool.write(f, n)
+        f.write("}}")
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return n
+
+
+def decode_rows(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    names = list(table["columns"])
+    cols = [decode_column(table["columns"][name]) for name in names]
+    return [dict(zip(names, values)) for values in zip(*cols)] if names else [{} for _ in range(table["length"])]
+
+
+# --- Payload ---
+
+def encode_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized payload -> columnar document (same key order; table values may be iterators)."""
+    doc: Dict[str, Any] = {"format": COLUMNAR_FORMAT}
+    for key, value in payload.items():
+        if key in TABLE_KEYS:
+            doc[key] = encode_rows(value)
+        elif key == LEVELS_KEY and isinstance(value, dict):
+            doc[key] = {tf: encode_rows(rows) for tf, rows in value.items()}
+        else:
+            doc[key] = value
+    return doc
+
+
+def decode_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Columnar document -> normalized payload; documents that are not columnar are returned as is."""
+    if doc.get("format") != COLUMNAR_FORMAT:
+        return doc
+    payload: Dict[str, Any] = {}
+    for key, value in doc.items():
+        if key == "format":
+            continue
+        if key in TABLE_KEYS:
+            payload[key] = decode_rows(value)
+        elif key == LEVELS_KEY and isinstance(value, dict):
+            payload[key] = {tf: decode_rows(table) for tf, table in value.items()}
+        else:
+            payload[key] = value
+    return payload
+
+
+# --- Files ---
+
+def open_output(path: str, compress: Optional[str] = None) -> IO[str]:
+    """Text handle for writing path, gzip/zstd compressed when asked (zstd falls back to gzip if missing)."""
+    if compress == "zstd" and zstandard is None:
+        print("Warning: zstd needs the zstandard package; using gzip", file=sys.stderr)
+        compress = "gzip"
+    if compress == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if compress == "zstd":
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(raw), encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def open_input(path: str) -> IO[str]:
+    """Text handle for reading path; gzip/zstd detected from the file's magic bytes."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic[:2] == _GZIP_MAGIC:
+        return gzip.open(path, "rt", encoding="utf-8")
+    if magic == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read it")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def dump(payload: Dict[str, Any], path: str, compress: Optional[str] = None) -> Dict[str, Any]:
+    """Write payload as a columnar document; returns the document (table lengths under "length")."""
+    doc = encode_payload(payload)
+    with open_output(path, compress) as f:
+        json.dump(doc, f, separators=(",", ":"))
+    return doc
+
+
+def dump_stream(payload: Dict[str, Any], path: str, compress: Optional[str] = None) -> Dict[str, int]:
+    """
+    dump() for payloads whose tables are iterators (parse_backtest --stream): the same bytes, with
+    tables encoded through write_rows. Returns the table lengths by key.
+    """
+    lengths: Dict[str, int] = {}
+    with open_output(path, compress) as f:
+        f.write('{"format":' + json.dumps(COLUMNAR_FORMAT))
+        for key, value in payload.items():
+            f.write("," + json.dumps(key) + ":")
+            if key in TABLE_KEYS:
+                lengths[key] = write_rows(f, value)
+            elif key == LEVELS_KEY and isinstance(value, dict):
+                f.write("{")
+                for i, (tf, rows) in enumerate(value.items()):
+                    f.write(("," if i else "") + json.dumps(tf) + ":")
+                    write_rows(f, rows)
+                f.write("}")
+            else:
+                json.dump(value, f, separators=_COMPACT)
+        f.write("}")
+    return lengths
+
+
+def load(path: str) -> Dict[str, Any]:
+    """Normalized payload from a columnar or plain JSON file (compressed or not)."""
+    with open_input(path) as f:
+        return decode_payload(json.load(f))
+
+
+def main():
+    p = argparse.ArgumentParser(description="Convert Klineo normalized results between JSON and columnar")
+    p.add_argument("command", choices=("expand", "compact"))
+    p.add_argument("path", help="Input file")
+    p.add_argument("--out", default=None, help="Output file (default: stdout for expand)")
+    p.add_argument("--compress", choices=COMPRESSIONS, default="none", help="Compression for compact")
+    args = p.parse_args()
+
+    if not os.path.isfile(args.path):
+        print(f"Error: file not found: {args.path}", file=sys.stderr)
+        sys.exit(1)
+    payload = load(args.path)
+    if args.command == "expand":
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2)
+        else:
+            json.dump(payload, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        return
+    out = args.out or os.path.splitext(args.path)[0] + COLUMNAR_SUFFIX
+    dump(payload, out, None if args.compress == "none" else args.compress)
+    print(f"{args.path}: {os.path.getsize(args.path)} bytes -> {out}: {os.path.getsize(out)} bytes")
+
+
+if __name__ == "__main__":
+    main()
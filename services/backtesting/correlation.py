@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Cross-result return correlation and co-drawdown, for picking strategies that are not the same bet.
+Each normalized result (or, with --per-pair, each of its pairs) becomes one daily equity series:
+the starting wallet plus the closed trades' profit_abs summed per UTC close day (np.bincount), over
+the result's timerange. tv_equity is not used since --max-points may have LTTB-reduced it.
+
+All series are aligned on one daily grid (NaN outside each series' timerange) and every pairwise
+statistic is computed over the days both series cover, as a handful of (days x n)^T (days x n)
+matrix products, with no loop over pairs:
+
+  correlation[i, j] = Pearson correlation of daily returns on the common days
+  co_drawdown[i, j] = share of the common days where i or j is under --drawdown-threshold %% of its
+                      peak on which both are (1 = their drawdowns always coincide)
+  overlap_days[i, j] = number of common return days (correlations need --min-overlap of them)
+
+--pick K greedily builds a low-correlation set: it starts from the best Sharpe ratio, then adds the
+series with the lowest mean |correlation| to those already picked (Sharpe breaks ties), never one
+correlated above --max-corr with any of them. The equal-weight mix of the pick is summarized too.
+
+Usage:
+  python3 correlation.py output/normalized/ --pick 5 --max-corr 0.5
+  python3 correlation.py --top 200 --sort sharpe_ratio --timeframe 15m --per-pair --out /tmp/corr.json
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import catalog
+import columnar_output
+from result_cache import timerange_bounds
+from risk_metrics import ANNUALIZATION_DAYS, DAY
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+OUTPUT_ANALYSIS = os.path.join(SCRIPT_DIR, "output", "analysis")
+
+
+def start_balance(payload: Dict[str, Any]) -> float:
+    """The wallet recorded by --monte-carlo / --portfolio, else tv_equity's base."""
+    recorded = [payload[key].get("start_balance") for key in ("monte_carlo", "portfolio") if isinstance(payload.get(key), dict)]
+    equity = payload.get("tv_equity") or []
+    return next((float(b) for b in recorded if b), float(equity[0]["value"]) if equity else 10000.0)
+
+
+def daily_series(path: str, per_pair: bool = False) -> List[Dict[str, Any]]:
+    """
+    One {"label", "path", "strategy", "timeframe", "pair", "first_day", "pnl", "start_balance"} per
+    result (per pair with per_pair); pnl is the profit closed on each day from first_day on.
+    """
+    payload = columnar_output.load(path)
+    trades = [t for t in payload.get("trades") or [] if t.get("close_time")]
+    pair = np.array([str(t.get("pair")) for t in trades], dtype=object)
+    close = np.fromiter((int(t["close_time"]) for t in trades), dtype=np.int64, count=len(trades))
+    profit = np.fromiter((float(t.get("profit_abs") or 0.0) for t in trades), dtype=np.float64, count=len(trades))
+    opened = [int(t["open_time"]) for t in trades if t.get("open_time")]
+    try:
+        start, end = timerange_bounds(str(payload.get("timerange") or ""))
+    except ValueError:
+        start = end = None
+    # The backtested days: days without a closed trade are flat, not missing
+    first = start if start is not None else (min(opened) if opened else (int(close.min()) if close.size else None))
+    if first is None:
+        return []
+    first_day = first // DAY * DAY
+    last_day = max((end - 1) // DAY * DAY if end else first_day, int(close.max()) // DAY * DAY if close.size else first_day)
+    days = (last_day - first_day) // DAY + 1
+    day_idx = np.clip((close - first_day) // DAY, 0, days - 1)
+
+    name = os.path.basename(path).split(".")[0]
+    base = {
+        "path": os.path.abspath(path),
+        "strategy": payload.get("strategy"),
+        "timeframe": payload.get("timeframe"),
+        "first_day": first_day,
+        "start_balance": start_balance(payload),
+    }
+    if not per_pair:
+        return [{**base, "label": name, "pair": None, "pnl": np.bincount(day_idx, profit, minlength=days)}]
+    pairs = payload.get("pairs") or sorted(set(pair.tolist()))
+    return [
+        {**base, "label": f"{name}|{p}", "pair": p, "pnl": np.bincount(day_idx[pair == p], profit[pair == p], minlength=days)}
+        for p in pairs
+    ]
+
+
+def align(series: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(day_start_ts, equity[days, n]) on the union of the series' days; NaN outside a series' range."""
+    first = min(s["first_day"] for s in series)
+    last = max(s["first_day"] + (s["pnl"].size - 1) * DAY for s in series)
+    days = np.arange(first, last + DAY, DAY, dtype=np.int64)
+    equity = np.full((days.size, len(series)), np.nan)
+    for j, s in enumerate(series):
+        i = (s["first_day"] - first) // DAY
+        equity[i : i + s["pnl"].size, j] = s["start_balance"] + np.cumsum(s["pnl"])
+    return days, equity
+
+
+def daily_returns(equity: np.ndarray) -> np.ndarray:
+    """Day-over-day returns; NaN where either day is outside the series or the base is not positive."""
+    prev = equity[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(prev > 0, equity[1:] / prev - 1.0, np.nan)
+
+
+def pairwise_correlation(returns: np.ndarray, min_overlap: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """(correlation, overlap_days) over each pair's common days (pairwise-complete Pearson)."""
+    valid = np.isfinite(returns)
+    mask = valid.astype(np.float64)
+    x = np.where(valid, returns, 0.0)
+    n = mask.T @ mask                 # common days
+    sx = x.T @ mask                   # [i, j] = sum of x_i over the days j is valid too
+    sxx = (x * x).T @ mask
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n       # var of i over the common days, [i, j]
+        corr = cov / np.sqrt(var * var.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[(n < min_overlap) | ~np.isfinite(corr)] = np.nan
+    return corr, n.astype(np.int64)
+
+
+def underwater(equity: np.ndarray, threshold: float) -> np.ndarray:
+    """Days each series is more than threshold % below its running peak (False outside its range)."""
+    peak = np.fmax.accumulate(equity, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = (1.0 - equity / peak) * 100.0
+    return np.isfinite(dd) & (dd > threshold)
+
+
+def co_drawdown(equity: np.ndarray, threshold: float = 5.0) -> np.ndarray:
+    """Jaccard overlap of the series' underwater days, on the days both series cover."""
+    valid = np.isfinite(equity).astype(np.float64)
+    under = underwater(equity, threshold).astype(np.float64)
+    both = under.T @ under
+    alone = under.T @ valid           # [i, j] = days i is under water while j is covered
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = both / (alone + alone.T - both)
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def sharpe(returns: np.ndarray) -> np.ndarray:
+    """Annualized Sharpe ratio of each column's daily returns (risk-free 0, as in risk_metrics)."""
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # Series without (or with one) return day: NaN, not a warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        out = np.nanmean(returns, axis=0) / np.nanstd(returns, axis=0, ddof=1) * math.sqrt(ANNUALIZATION_DAYS)
+    return np.where(np.isfinite(out), out, np.nan)
+
+
+def _round(v: float, decimals: int) -> Optional[float]:
+    return round(float(v), decimals) if np.isfinite(v) else None
+
+
+def greedy_pick(corr: np.ndarray, score: np.ndarray, k: int, max_corr: float = 0.5) -> List[int]:
+    """
+    Up to k columns: the best score first, then the lowest mean |correlation| to the picked ones
+    (higher score on ties), skipping any column above max_corr with one of them. Pairs without enough
+    common days count as correlated.
+    """
+    n = score.size
+    score = np.where(np.isfinite(score), score, -np.inf)
+    if not n or k < 1 or not np.isfinite(score).any():
+        return []
+    absolute = np.where(np.isfinite(corr), np.abs(corr), np.inf)
+    picked = [int(np.argmax(score))]
+    worst = absolute[picked[0]].copy()
+    total = absolute[picked[0]].copy()
+    available = np.isfinite(score)
+    available[picked[0]] = False
+    while len(picked) < k:
+        candidates = np.flatnonzero(available & (worst <= max_corr))
+        if not candidates.size:
+            break
+        best = candidates[np.lexsort((-score[candidates], total[candidates]))[0]]
+        picked.append(int(best))
+        available[best] = False
+        np.maximum(worst, absolute[best], out=worst)
+        total += absolute[best]
+    return picked
+
+
+def mix_summary(equity: np.ndarray, returns: np.ndarray, picked: Sequence[int]) -> Dict[str, Any]:
+    """Equal-weight mix of the picked series (daily-rebalanced mean return over the series live that day)."""
+    r = returns[:, picked]
+    live = np.isfinite(r).any(axis=1)
+    if not live.any():
+        return {"days": 0}
+    mixed = np.nanmean(r[live], axis=1)
+    curve = np.cumprod(1.0 + mixed)
+    peak = np.maximum.accumulate(curve)
+    members = sharpe(r)
+    return {
+        "days": int(mixed.size),
+        "return_percent": round(float((curve[-1] - 1.0) * 100.0), 2),
+        "max_drawdown_percent": round(float(((peak - curve) / peak).max() * 100.0), 2),
+        "sharpe_ratio": _round(sharpe(mixed[:, None])[0], 3),
+        "avg_member_sharpe_ratio": _round(np.nanmean(members), 3) if np.isfinite(members).any() else None,
+    }
+
+
+def _matrix(m: np.ndarray, decimals: int = 4) -> List[List[Optional[float]]]:
+    rounded = np.round(m, decimals).astype(object)
+    rounded[~np.isfinite(m)] = None
+    return rounded.tolist()
+
+
+def analyze(
+    series: Sequence[Dict[str, Any]],
+    min_overlap: int = 30,
+    drawdown_threshold: float = 5.0,
+    pick: int = 0,
+    max_corr: float = 0.5,
+) -> Dict[str, Any]:
+    """Correlation / co-drawdown report over daily_series() output."""
+    days, equity = align(series)
+    returns = daily_returns(equity)
+    corr, overlap = pairwise_correlation(returns, min_overlap)
+    codd = co_drawdown(equity, drawdown_threshold)
+    score = sharpe(returns)
+    report: Dict[str, Any] = {
+        "series": [
+            {
+                "label": s["label"], "path": s["path"], "strategy": s["strategy"], "timeframe": s["timeframe"],
+                "pair": s["pair"], "days": int(s["pnl"].size),
+                "sharpe_ratio": _round(v, 3),
+            }
+            for s, v in zip(series, score)
+        ],
+        "first_day": int(days[0]),
+        "last_day": int(days[-1]),
+        "min_overlap_days": min_overlap,
+        "drawdown_threshold_percent": drawdown_threshold,
+        "correlation": _matrix(corr),
+        "co_drawdown": _matrix(codd),
+        "overlap_days": overlap.tolist(),
+    }
+    if pick:
+        picked = greedy_pick(corr, score, pick, max_corr)
+        report["pick"] = {
+            "max_corr": max_corr,
+            "labels": [series[i]["label"] for i in picked],
+            "indices": picked,
+            "mix": mix_summary(equity, returns, picked) if picked else None,
+        }
+    return report
+
+
+def most_correlated(report: Dict[str, Any], limit: int = 10) -> List[Tuple[str, str, float, Optional[float]]]:
+    """(label, label, correlation, co_drawdown) of the most correlated distinct pairs."""
+    corr = np.array(report["correlation"], dtype=np.float64)
+    codd = np.array(report["co_drawdown"], dtype=np.float64)
+    i, j = np.triu_indices(corr.shape[0], k=1)
+    values = corr[i, j]
+    order = np.argsort(np.where(np.isfinite(values), -values, np.inf), kind="stable")[:limit]
+    order = order[np.isfinite(values[order])]
+    labels = [s["label"] for s in report["series"]]
+    return [
+        (labels[i[o]], labels[j[o]], round(float(values[o]), 3), _round(codd[i[o], j[o]], 3))
+        for o in order
+    ]
+
+
+def load_series(paths: Sequence[str], per_pair: bool = False, workers: int = 1) -> List[Dict[str, Any]]:
+    """daily_series of every path (process pool for many files); unreadable files only warn."""
+    def collect(results):
+        out = []
+        for path, result in zip(paths, results):
+            if isinstance(result, Exception):
+                print(f"Warning: {path}: {result}", file=sys.stderr)
+            else:
+                out += result
+        return out
+
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            return collect(pool.map(_safe_series, paths, [per_pair] * len(paths)))
+    return collect(_safe_series(p, per_pair) for p in paths)
+
+
+def _safe_series(path: str, per_pair: bool):
+    try:
+        return daily_series(path, per_pair)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return e
+
+
+def main():
+    p = argparse.ArgumentParser(description="Return-correlation and co-drawdown matrices across normalized results")
+    p.add_argument("paths", nargs="*", help=f"Result files or directories (default: {OUTPUT_NORM}, or --top from the catalog)")
+    p.add_argument("--top", type=int, default=None, help="Take the top N results of the SQLite catalog (catalog.py) instead of paths")
+    p.add_argument("--sort", default="sharpe_ratio", help="Catalog metric for --top (default sharpe_ratio)")
+    p.add_argument("--timeframe", default=None, help="Catalog filter for --top")
+    p.add_argument("--db", default=None, help="Catalog path for --top (default: KLINEO_CATALOG_DB or output/catalog.sqlite)")
+    p.add_argument("--per-pair", action="store_true", help="One series per result and pair instead of per result")
+    p.add_argument("--min-overlap", type=int, default=30, help="Common return days needed for a correlation (default 30)")
+    p.add_argument("--drawdown-threshold", type=float, default=5.0, help="Drawdown %% counted as under water for co-drawdown (default 5)")
+    p.add_argument("--pick", type=int, default=0, metavar="K", help="Greedily pick up to K low-correlation series")
+    p.add_argument("--max-corr", type=float, default=0.5, help="Largest correlation allowed within the pick (default 0.5)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes loading result files (default: CPU count)")
+    p.add_argument("--out", default=os.path.join(OUTPUT_ANALYSIS, "correlation.json"), help="Report path")
+    p.add_argument("--show", type=int, default=10, help="Most correlated pairs to print (default 10)")
+    args = p.parse_args()
+
+    if args.top:
+        conn = catalog.connect(args.db)
+        try:
+            rows = catalog.leaderboard(conn, args.sort, True, args.top, timeframe=args.timeframe)
+        finally:
+            conn.close()
+        paths = [row["path"] for row in rows if os.path.isfile(row["path"])]
+    else:
+        paths = catalog.result_files(args.paths or [OUTPUT_NORM])
+    series = load_series(paths, args.per_pair, args.workers)
+    if len(series) < 2:
+        print("Error: need at least two result series", file=sys.stderr)
+        sys.exit(1)
+
+    report = analyze(series, args.min_overlap, args.drawdown_threshold, args.pick, args.max_corr)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    print(f"[Klineo Correlation] {len(series)} series from {len(paths)} results over {(report['last_day'] - report['first_day']) // DAY + 1} days -> {args.out}")
+    for a, b, c, d in most_correlated(report, args.show):
+        print(f"  corr={c:+.3f}  co_drawdown={d if d is not None else 'n/a'}  {a}  ~  {b}")
+    if "pick" in report:
+        pick = report["pick"]
+        print(f"Pick (max corr {pick['max_corr']}): {', '.join(pick['labels']) or 'none'}")
+        if pick["mix"]:
+            print("  equal-weight mix: " + "  ".join(f"{k}={v}" for k, v in pick["mix"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Multi-resolution chart output for normalized backtest results.
+OHLC candles are aggregated to coarser timeframes (e.g. 15m -> 1h -> 4h -> 1d -> 1w) and the equity
+curve is reduced with LTTB (Largest-Triangle-Three-Buckets), which keeps its visual shape.
+Levels are picked from a point budget so payload size does not grow with the timerange.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ohlcv_columns import OhlcvColumns
+
+TIMEFRAME_LADDER = ("1m", "5m", "15m", "30m", "1h", "2h", "4h", "12h", "1d", "1w")
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+# Weekly candles start on Monday (epoch 0 is a Thursday)
+_WEEK_ORIGIN = 4 * 86400
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """'15m' -> 900, '4h' -> 14400, '1w' -> 604800."""
+    return int(timeframe[:-1]) * _UNIT_SECONDS[timeframe[-1]]
+
+
+def aggregate_ohlc(cols: OhlcvColumns, bucket_seconds: int) -> OhlcvColumns:
+    """Resample time-sorted candles to bucket_seconds bars (first open, max high, min low, last close, summed volume)."""
+    if not len(cols):
+        return cols
+    origin = _WEEK_ORIGIN if bucket_seconds % 604800 == 0 else 0
+    bucket = (cols.time - origin) // bucket_seconds * bucket_seconds + origin
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(cols)] - 1
+    return OhlcvColumns(
+        bucket[starts],
+        cols.open[starts],
+        np.maximum.reduceat(cols.high, starts),
+        np.minimum.reduceat(cols.low, starts),
+        cols.close[ends],
+        np.add.reduceat(cols.volume, starts),
+    )
+
+
+def ohlc_levels(cols: OhlcvColumns, base_timeframe: str, max_points: int) -> List[Tuple[str, OhlcvColumns]]:
+    """
+    (timeframe, candles) levels from the finest one that fits max_points bars up to the coarsest ladder
+    timeframe. Only timeframes that are whole multiples of the base timeframe are used.
+    """
+    base = timeframe_seconds(base_timeframe)
+    ladder = [tf for tf in TIMEFRAME_LADDER if timeframe_seconds(tf) >= base and timeframe_seconds(tf) % base == 0]
+    if base_timeframe not in ladder:
+        ladder.insert(0, base_timeframe)
+    levels: List[Tuple[str, OhlcvColumns]] = []
+    for tf in ladder:
+        level = cols if tf == base_timeframe else aggregate_ohlc(cols, timeframe_seconds(tf))
+        if levels or len(level) <= max_points:
+            levels.append((tf, level))
+    if not levels:
+        # Even the coarsest timeframe is over budget: keep it anyway (bounded by the timerange in weeks)
+        tf = ladder[-1]
+        levels.append((tf, aggregate_ohlc(cols, timeframe_seconds(tf))))
+    return levels
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the LTTB-selected points (always keeps the first and last point)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    # Bucket i covers [edges[i], edges[i + 1]); bucket means are precomputed in one pass
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(np.r_[edges, n])
+    mean_x = np.add.reduceat(x, edges) / counts
+    mean_y = np.add.reduceat(y, edges) / counts
+
+    out = np.empty(threshold, dtype=np.int64)
+    out[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Triangle area between the previous pick, each candidate and the next bucket's mean
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    out[-1] = n - 1
+    return out
+
+
+def downsample_equity(tv_equity: List[Dict[str, Any]], max_points: int) -> List[Dict[str, Any]]:
+    if len(tv_equity) <= max_points:
+        return tv_equity
+    x = np.fromiter((pt["time"] for pt in tv_equity), dtype=np.float64, count=len(tv_equity))
+    y = np.fromiter((pt["value"] for pt in tv_equity), dtype=np.float64, count=len(tv_equity))
+    return [tv_equity[i] for i in lttb_indices(x, y, max_points).tolist()]
+
+
+def build_resolution(
+    cols: Optional[OhlcvColumns],
+    base_timeframe: str,
+    n_equity: int,
+    max_points: int,
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    (tv_ohlc, tv_ohlc_levels, resolution) for the payload: tv_ohlc is the finest level within budget,
+    tv_ohlc_levels holds the coarser ones keyed by timeframe.
+    """
+    resolution: Dict[str, Any] = {
+        "max_points": max_points,
+        "tv_ohlc_timeframe": base_timeframe,
+        "tv_ohlc_source_bars": 0,
+        "tv_equity_source_points": n_equity,
+    }
+    if cols is None or not len(cols):
+        return [], {}, resolution
+    levels = ohlc_levels(cols, base_timeframe, max_points)
+    resolution["tv_ohlc_timeframe"] = levels[0][0]
+    resolution["tv_ohlc_source_bars"] = len(cols)
+    return levels[0][1].to_tv(), {tf: level.to_tv() for tf, level in levels[1:]}, resolution
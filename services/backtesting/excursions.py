@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Trade-to-candle index and per-trade excursions (MAE/MFE) over the pairs' candle arrays.
+Every trade is mapped to the candles it was opened and closed on (np.searchsorted over the pair's
+candle times), and over that inclusive range the highest high and lowest low give:
+
+  mae_percent = how far price went against the position, % of open_rate (>= 0)
+  mfe_percent = how far price went in its favour, % of open_rate (>= 0)
+  bars_held   = exit_index - entry_index
+
+Shorts are mirrored (the high is adverse, the low favourable). Excursions are price moves, not
+leveraged returns. entry_index/exit_index index the pair's full-resolution candles: tv_ohlc for the
+charted pair (without --max-points) or the pair's --candle-sidecars rows.
+
+Range max/min use a block decomposition instead of a per-trade slice: in-block prefix/suffix
+extrema plus a sparse table over whole-block extrema answer any range that crosses a block in O(1),
+and ranges inside one block (< BLOCK candles) go through one ufunc.reduceat. Building is O(candles),
+so 100k trades over 1M candles cost a few array passes, however long the trades are held.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from ohlcv_columns import OhlcvColumns
+
+# Candles per block of the range-extremum index
+BLOCK = 256
+
+FIELDS = ("entry_index", "exit_index", "bars_held", "mae_percent", "mfe_percent")
+
+
+def trade_columns(records: Sequence[Any], trades_raw: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """Per-trade arrays from parse_backtest.TradeRecord objects and their raw trades (for is_short)."""
+    n = len(records)
+    return {
+        "pair": np.array([r.pair for r in records], dtype=object),
+        "open_time": np.fromiter((r.open_time for r in records), dtype=np.int64, count=n),
+        "close_time": np.fromiter((r.close_time or 0 for r in records), dtype=np.int64, count=n),
+        "open_rate": np.fromiter((r.open_rate for r in records), dtype=np.float64, count=n),
+        "is_short": np.fromiter((bool(t.get("is_short")) for t in trades_raw), dtype=bool, count=n),
+    }
+
+
+def candle_index(times: np.ndarray, ts: np.ndarray, bar_seconds: int) -> np.ndarray:
+    """Index of the candle each timestamp falls in (open <= ts < open + bar_seconds); -1 outside the data."""
+    if not times.size:
+        return np.full(ts.shape, -1, dtype=np.int64)
+    idx = np.searchsorted(times, ts, side="right") - 1
+    inside = (idx >= 0) & (ts < times[np.maximum(idx, 0)] + bar_seconds)
+    return np.where(inside, idx, -1)
+
+
+def range_reduce(ufunc: np.ufunc, values: np.ndarray, first: np.ndarray, last: np.ndarray, block: int = BLOCK) -> np.ndarray:
+    """ufunc.reduce(values[first[i]:last[i] + 1]) for every i (np.maximum or np.minimum; first <= last)."""
+    out = np.empty(first.size, dtype=values.dtype)
+    if not first.size:
+        return out
+    n_blocks = -(-values.size // block)
+    # Edge padding only ever lands in the last block's suffix, which no range crossing a block uses
+    grid = np.pad(values, (0, n_blocks * block - values.size), mode="edge").reshape(n_blocks, block)
+    prefix = ufunc.accumulate(grid, axis=1).ravel()
+    suffix = ufunc.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    # table[k, b] = extremum of blocks b .. b + 2**k - 1
+    levels = max(1, int(n_blocks).bit_length())
+    table = np.empty((levels, n_blocks), dtype=values.dtype)
+    table[0] = ufunc.reduce(grid, axis=1)
+    for k in range(1, levels):
+        width = 1 << (k - 1)
+        table[k] = table[k - 1]
+        table[k, : n_blocks - width] = ufunc(table[k - 1, : n_blocks - width], table[k - 1, width:])
+    del grid
+
+    first_block, last_block = first // block, last // block
+    cross = first_block < last_block
+    if cross.any():
+        f, l = first[cross], last[cross]
+        res = ufunc(suffix[f], prefix[l])
+        lo, hi = first_block[cross] + 1, last_block[cross] - 1
+        inner = hi >= lo
+        if inner.any():
+            lo, hi = lo[inner], hi[inner]
+            k = np.log2(hi - lo + 1).astype(np.int64)
+            res[inner] = ufunc(res[inner], ufunc(table[k, lo], table[k, hi - (1 << k) + 1]))
+        out[cross] = res
+    same = ~cross
+    if same.any():
+        # [first, last + 1) bounds interleaved in start order: the even reduceat slots are the ranges,
+        # the odd ones the gaps between them (together at most len(values) elements)
+        f, l = first[same], last[same]
+        order = np.argsort(f, kind="stable")
+        bounds = np.empty(2 * f.size, dtype=np.int64)
+        bounds[0::2] = f[order]
+        bounds[1::2] = l[order] + 1
+        padded = np.concatenate((values, values[-1:]))
+        res = np.empty(f.size, dtype=values.dtype)
+        res[order] = ufunc.reduceat(padded, bounds)[0::2]
+        out[same] = res
+    return out
+
+
+def pair_excursions(
+    cols: OhlcvColumns,
+    open_time: np.ndarray,
+    close_time: np.ndarray,
+    open_rate: np.ndarray,
+    is_short: np.ndarray,
+    bar_seconds: int,
+) -> Dict[str, np.ndarray]:
+    """FIELDS for one pair's trades; trades outside its candles get index -1 and NaN excursions."""
+    n = len(cols)
+    entry = candle_index(cols.time, open_time, bar_seconds)
+    # Still-open trades run to the last candle
+    exit_ = np.where(close_time > 0, candle_index(cols.time, close_time, bar_seconds), n - 1)
+    covered = (entry >= 0) & (exit_ >= entry)
+    high = np.full(entry.size, np.nan)
+    low = np.full(entry.size, np.nan)
+    high[covered] = range_reduce(np.maximum, cols.high, entry[covered], exit_[covered])
+    low[covered] = range_reduce(np.minimum, cols.low, entry[covered], exit_[covered])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(open_rate > 0, open_rate, np.nan)
+        up = (high - rate) / rate * 100.0
+        down = (rate - low) / rate * 100.0
+    return {
+        "entry_index": np.where(covered, entry, -1),
+        "exit_index": np.where(covered, exit_, -1),
+        "bars_held": np.where(covered, exit_ - entry, -1),
+        "mae_percent": np.maximum(np.where(is_short, up, down), 0.0),
+        "mfe_percent": np.maximum(np.where(is_short, down, up), 0.0),
+    }
+
+
+def index_trades(
+    candles: Dict[str, OhlcvColumns],
+    trades: Dict[str, np.ndarray],
+    bar_seconds: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    FIELDS for every trade (trade_columns order), pair by pair; pairs without candles stay -1 / NaN.
+    bar_seconds defaults to each pair's smallest candle spacing.
+    """
+    n = trades["open_time"].size
+    out = {
+        "entry_index": np.full(n, -1, dtype=np.int64),
+        "exit_index": np.full(n, -1, dtype=np.int64),
+        "bars_held": np.full(n, -1, dtype=np.int64),
+        "mae_percent": np.full(n, np.nan),
+        "mfe_percent": np.full(n, np.nan),
+    }
+    for pair, cols in candles.items():
+        mask = trades["pair"] == pair
+        if not mask.any() or not len(cols):
+            continue
+        bar = bar_seconds or (int(np.diff(cols.time).min()) if len(cols) > 1 else 1)
+        ex = pair_excursions(
+            cols, trades["open_time"][mask], trades["close_time"][mask], trades["open_rate"][mask],
+            trades["is_short"][mask], bar,
+        )
+        for key in FIELDS:
+            out[key][mask] = ex[key]
+    return out
+
+
+def summary(ex: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Headline metrics over the indexed trades."""
+    covered = ex["entry_index"] >= 0
+    if not covered.any():
+        return {"excursion_trades": 0}
+    mae, mfe = ex["mae_percent"][covered], ex["mfe_percent"][covered]
+    return {
+        "excursion_trades": int(covered.sum()),
+        "avg_mae_percent": round(float(np.nanmean(mae)), 2) if np.isfinite(mae).any() else None,
+        "max_mae_percent": round(float(np.nanmax(mae)), 2) if np.isfinite(mae).any() else None,
+        "avg_mfe_percent": round(float(np.nanmean(mfe)), 2) if np.isfinite(mfe).any() else None,
+        "avg_bars_held": round(float(ex["bars_held"][covered].mean()), 1),
+    }
+
+
+def trade_fields(ex: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    """Per-trade fields to merge into the normalized trades (None where a trade has no candles)."""
+    entry, exit_, bars = (ex[k].tolist() for k in ("entry_index", "exit_index", "bars_held"))
+    mae, mfe = (np.round(ex[k], 4).tolist() for k in ("mae_percent", "mfe_percent"))
+    for e, x, b, a, f in zip(entry, exit_, bars, mae, mfe):
+        if e < 0:
+            yield {"entry_index": None, "exit_index": None, "bars_held": None, "mae_percent": None, "mfe_percent": None}
+        else:
+            yield {
+                "entry_index": e,
+                "exit_index": x,
+                "bars_held": b,
+                "mae_percent": a if a == a else None,
+                "mfe_percent": f if f == f else None,
+            }
+
+
+def tv_markers(tv_times: np.ndarray, trades: Dict[str, np.ndarray], pair: str) -> List[Dict[str, Any]]:
+    """
+    TradingView series markers for pair's trades on the charted bars (tv_times, any resolution):
+    entry and exit snap to the bar they fall in, same shapes as the frontend's own trade markers.
+    """
+    mask = trades["pair"] == pair
+    if not tv_times.size or not mask.any():
+        return []
+    short = trades["is_short"][mask]
+    # kind: 0 long entry, 1 short entry, 2 long exit, 3 short exit (still-open trades have no exit)
+    ts = np.concatenate((trades["open_time"][mask], trades["close_time"][mask]))
+    kinds = np.concatenate((np.where(short, 1, 0), np.where(short, 3, 2)))
+    keep = ts >= tv_times[0]
+    times = tv_times[np.searchsorted(tv_times, ts[keep], side="right") - 1]
+    kinds = kinds[keep]
+    order = np.argsort(times, kind="stable")
+    shapes = (
+        {"position": "belowBar", "shape": "arrowUp", "text": "Long"},
+        {"position": "aboveBar", "shape": "arrowDown", "text": "Short"},
+        {"position": "aboveBar", "shape": "arrowDown", "text": "Exit"},
+        {"position": "belowBar", "shape": "arrowUp", "text": "Exit"},
+    )
+    return [{"time": t, **shapes[k]} for t, k in zip(times[order].tolist(), kinds[order].tolist())]
@@ -4,7 +4,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoBenchmarkTrend(IStrategy):
@@ -25,11 +26,12 @@ class KlineoBenchmarkTrend(IStrategy):
     trailing_only_offset_is_reached = True
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["ema_50"] = ta.EMA(dataframe, timeperiod=50)
-        dataframe["ema_200"] = ta.EMA(dataframe, timeperiod=200)
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
-        dataframe["atr"] = ta.ATR(dataframe, timeperiod=14)
-        dataframe["volume_sma"] = dataframe["volume"].rolling(window=20).mean()
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["ema_50"] = ind.ta("EMA", timeperiod=50)
+        dataframe["ema_200"] = ind.ta("EMA", timeperiod=200)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
+        dataframe["atr"] = ind.ta("ATR", timeperiod=14)
+        dataframe["volume_sma"] = ind.rolling("volume", 20, "mean")
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
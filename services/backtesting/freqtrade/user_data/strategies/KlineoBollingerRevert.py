@@ -3,7 +3,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoBollingerRevert(IStrategy):
@@ -14,11 +15,12 @@ class KlineoBollingerRevert(IStrategy):
     stoploss = -0.06
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        bbands = ta.BBANDS(dataframe, timeperiod=20, nbdevup=2, nbdevdn=2)
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        bbands = ind.ta("BBANDS", timeperiod=20, nbdevup=2, nbdevdn=2)
         dataframe["bb_upper"] = bbands["upperband"]
         dataframe["bb_middle"] = bbands["middleband"]
         dataframe["bb_lower"] = bbands["lowerband"]
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
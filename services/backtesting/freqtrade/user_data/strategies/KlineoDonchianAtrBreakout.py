@@ -3,7 +3,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoDonchianAtrBreakout(IStrategy):
@@ -14,9 +15,10 @@ class KlineoDonchianAtrBreakout(IStrategy):
     stoploss = -0.10
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["donch_high"] = dataframe["high"].rolling(window=20).max()
-        dataframe["donch_low"] = dataframe["low"].rolling(window=20).min()
-        dataframe["atr"] = ta.ATR(dataframe, timeperiod=14)
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["donch_high"] = ind.rolling("high", 20, "max")
+        dataframe["donch_low"] = ind.rolling("low", 20, "min")
+        dataframe["atr"] = ind.ta("ATR", timeperiod=14)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
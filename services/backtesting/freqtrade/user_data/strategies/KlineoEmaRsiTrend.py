@@ -3,7 +3,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoEmaRsiTrend(IStrategy):
@@ -18,10 +19,11 @@ class KlineoEmaRsiTrend(IStrategy):
     trailing_only_offset_is_reached = True
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["ema_fast"] = ta.EMA(dataframe, timeperiod=21)
-        dataframe["ema_slow"] = ta.EMA(dataframe, timeperiod=55)
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
-        dataframe["volume_sma"] = dataframe["volume"].rolling(window=20).mean()
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["ema_fast"] = ind.ta("EMA", timeperiod=21)
+        dataframe["ema_slow"] = ind.ta("EMA", timeperiod=55)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
+        dataframe["volume_sma"] = ind.rolling("volume", 20, "mean")
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
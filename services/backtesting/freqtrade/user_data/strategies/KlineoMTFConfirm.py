@@ -2,7 +2,8 @@
 
 from freqtrade.strategy import IStrategy, informative
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoMTFConfirm(IStrategy):
@@ -19,11 +20,13 @@ class KlineoMTFConfirm(IStrategy):
 
     @informative("1h")
     def populate_indicators_1h(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["ema_200"] = ta.EMA(dataframe, timeperiod=200)
+        ind = shared_indicators(dataframe, metadata, "1h", self.config)
+        dataframe["ema_200"] = ind.ta("EMA", timeperiod=200)
         return dataframe
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
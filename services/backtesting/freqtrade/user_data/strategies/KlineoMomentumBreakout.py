@@ -2,7 +2,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoMomentumBreakout(IStrategy):
@@ -17,10 +18,11 @@ class KlineoMomentumBreakout(IStrategy):
     trailing_only_offset_is_reached = True
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["donch_high"] = dataframe["high"].rolling(window=20).max()
-        dataframe["donch_low"] = dataframe["low"].rolling(window=20).min()
-        dataframe["atr"] = ta.ATR(dataframe, timeperiod=14)
-        dataframe["volume_sma"] = dataframe["volume"].rolling(window=20).mean()
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["donch_high"] = ind.rolling("high", 20, "max")
+        dataframe["donch_low"] = ind.rolling("low", 20, "min")
+        dataframe["atr"] = ind.ta("ATR", timeperiod=14)
+        dataframe["volume_sma"] = ind.rolling("volume", 20, "mean")
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
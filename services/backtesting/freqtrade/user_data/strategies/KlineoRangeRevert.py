@@ -2,7 +2,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 def vwap(df: DataFrame):
@@ -24,11 +25,12 @@ class KlineoRangeRevert(IStrategy):
         return [{"method": "CooldownPeriod", "stop_duration_candles": 2}]
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        bbands = ta.BBANDS(dataframe, timeperiod=20, nbdevup=2, nbdevdn=2)
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        bbands = ind.ta("BBANDS", timeperiod=20, nbdevup=2, nbdevdn=2)
         dataframe["bb_upper"] = bbands["upperband"]
         dataframe["bb_middle"] = bbands["middleband"]
         dataframe["bb_lower"] = bbands["lowerband"]
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
         dataframe["vwap"] = vwap(dataframe)
         return dataframe
 
@@ -5,7 +5,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from klineo_indicators import shared_indicators
 
 
 class KlineoRiskManaged(IStrategy):
@@ -50,8 +51,9 @@ class KlineoRiskManaged(IStrategy):
         ]
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe["ema_100"] = ta.EMA(dataframe, timeperiod=100)
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+        dataframe["ema_100"] = ind.ta("EMA", timeperiod=100)
+        dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -0,0 +1,364 @@
+# Klineo shared indicator store - not a strategy.
+# Strategies on the same pair/timeframe compute the same series (RSI 14, ATR 14, EMA 200, 20-bar
+# Donchian / volume SMA, ...). populate_indicators asks this store instead of computing directly:
+# results are keyed by (pair, timeframe, data file version, indicator, params) and kept as
+# memory-mapped .npy files, so every strategy, process and run on the same data file reuses one
+# computation.
+#
+#   ind = shared_indicators(dataframe, metadata, self.timeframe, self.config)
+#   dataframe["rsi"] = ind.ta("RSI", timeperiod=14)
+#   bb = ind.ta("BBANDS", timeperiod=20, nbdevup=2, nbdevdn=2)   # {"upperband": ..., ...}
+#   dataframe["volume_sma"] = ind.rolling("volume", 20, "mean")
+#
+# Indicators are computed over the pair's whole data file (loaded the way Freqtrade loads it) and
+# sliced by date to the frame, so the key does not depend on where the frame starts: strategies
+# with different startup_candle_count values and timeranges share entries. Windowed indicators
+# (rolling, SMA, BBANDS, Donchian) equal the frame's own values past their window; recursive TA-Lib
+# ones (EMA, RSI, ATR) are seeded at the file's first candle, i.e. warmed up longer than
+# startup_candle_count. Frames that are not a date range of the file (or without Freqtrade's data
+# loader) fall back to a digest of the frame itself and values computed on the frame.
+#
+# The store is only used in the backtest and hyperopt runmodes; dry-run / live frames are computed
+# directly (their candles keep changing and never come from a data file).
+# Env: KLINEO_INDICATOR_CACHE=0 disables the store, KLINEO_INDICATOR_CACHE_DIR (default
+# output/cache/indicators), KLINEO_INDICATOR_CACHE_MAX_BYTES (default 1 GiB, LRU eviction).
+# Inspect / clear: python3 klineo_indicators.py --stats | --clear
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+
+try:
+    import talib
+    import talib.abstract as ta
+except ImportError:
+    talib = None
+    ta = None
+
+try:
+    from freqtrade.data.history import load_pair_history
+    from freqtrade.enums import CandleType
+except ImportError:
+    load_pair_history = None
+    CandleType = None
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+ENTRY_SUFFIX = ".npy"
+# Arrays kept mapped in this process (LRU) so repeated requests skip even the file open
+MEMORY_ENTRIES = 256
+DATA_COLUMNS = ("open", "high", "low", "close", "volume")
+# Freqtrade runmodes (RunMode values) that use the store
+STORE_RUNMODES = ("backtest", "hyperopt")
+
+Result = Union[np.ndarray, Dict[str, np.ndarray]]
+
+# Data files loaded in this process: (datadir, pair, timeframe, candle type) -> (data_version, frame)
+_FILES: Dict[Tuple[str, str, str, str], Optional[Tuple[str, DataFrame]]] = {}
+
+
+def default_cache_dir() -> str:
+    # strategies/ -> user_data/ -> freqtrade/ -> services/backtesting/
+    base = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    return os.environ.get("KLINEO_INDICATOR_CACHE_DIR", os.path.join(base, "output", "cache", "indicators"))
+
+
+def data_version(dataframe: DataFrame) -> str:
+    """Digest of the candles the indicators are computed from (dates and OHLCV)."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(str(len(dataframe)).encode("ascii"))
+    if "date" in dataframe:
+        h.update(np.ascontiguousarray(_dates(dataframe)).tobytes())
+    for col in DATA_COLUMNS:
+        if col in dataframe:
+            h.update(np.ascontiguousarray(dataframe[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _dates(dataframe: DataFrame) -> np.ndarray:
+    # .values is naive UTC datetime64 for tz-aware columns (to_numpy() would box Timestamps)
+    return dataframe["date"].values.astype("datetime64[ns]").view(np.int64)
+
+
+def load_data_file(config: dict, pair: str, timeframe: str) -> Optional[Tuple[str, DataFrame]]:
+    """The pair's whole data file as Freqtrade loads it (gaps filled) and its data_version."""
+    if load_pair_history is None or not config.get("datadir"):
+        return None
+    candle_type = CandleType.get_default(config.get("trading_mode", "spot"))
+    key = (str(config["datadir"]), pair, timeframe, str(candle_type))
+    if key not in _FILES:
+        frame = load_pair_history(
+            pair=pair, timeframe=timeframe, datadir=Path(config["datadir"]),
+            data_format=config.get("dataformat_ohlcv"), candle_type=candle_type,
+        )
+        _FILES[key] = (data_version(frame), frame) if len(frame) else None
+    return _FILES[key]
+
+
+def frame_rows(source: DataFrame, dataframe: DataFrame) -> Optional[slice]:
+    """Rows of source that dataframe is a copy of (same dates and closes), or None."""
+    if not len(dataframe) or "date" not in dataframe or "date" not in source:
+        return None
+    dates, frame_dates = _dates(source), _dates(dataframe)
+    lo = int(np.searchsorted(dates, frame_dates[0]))
+    hi = lo + len(frame_dates)
+    if hi > len(dates) or not np.array_equal(dates[lo:hi], frame_dates):
+        return None
+    closes = source["close"].to_numpy(dtype=np.float64)[lo:hi]
+    if not np.array_equal(closes, dataframe["close"].to_numpy(dtype=np.float64), equal_nan=True):
+        return None
+    return slice(lo, hi)
+
+
+def _params_id(indicator: str, params: Dict[str, Any]) -> str:
+    spec = json.dumps({"indicator": indicator, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+
+
+def _unlink_quiet(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+class IndicatorStore:
+    """On-disk indicator cache; one .npy (plain or structured for multi-output) per entry."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("KLINEO_INDICATOR_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._mapped: "OrderedDict[str, Result]" = OrderedDict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, pair: str, timeframe: str, version: str, indicator: str, params: Dict[str, Any]) -> str:
+        name = f"{pair.replace('/', '_').replace(':', '_')}-{timeframe}.{version}.{indicator}-{_params_id(indicator, params)}"
+        return os.path.join(self.cache_dir, name + ENTRY_SUFFIX)
+
+    # --- read / write ---
+
+    @staticmethod
+    def _unpack(arr: np.ndarray) -> Result:
+        if arr.dtype.names:
+            return {name: arr[name] for name in arr.dtype.names}
+        return arr
+
+    def _remember(self, path: str, value: Result) -> Result:
+        self._mapped[path] = value
+        self._mapped.move_to_end(path)
+        while len(self._mapped) > MEMORY_ENTRIES:
+            self._mapped.popitem(last=False)
+        return value
+
+    def get(self, path: str) -> Optional[Result]:
+        if path in self._mapped:
+            self._mapped.move_to_end(path)
+            return self._mapped[path]
+        if not os.path.isfile(path):
+            return None
+        try:
+            arr = np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        # Access time for LRU; mtime is used because atime is often disabled (noatime)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return self._remember(path, self._unpack(arr))
+
+    def put(self, path: str, value: Result) -> Result:
+        if isinstance(value, dict):
+            names = list(value)
+            arr = np.empty(len(value[names[0]]), dtype=[(n, np.float64) for n in names])
+            for n in names:
+                arr[n] = value[n]
+        else:
+            arr = np.asarray(value, dtype=np.float64)
+        # Atomic (temp file + rename): parallel backtests may compute the same entry
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, arr, allow_pickle=False)
+            os.replace(tmp, path)
+        except BaseException:
+            _unlink_quiet(tmp)
+            raise
+        self.evict()
+        try:
+            return self._remember(path, self._unpack(np.load(path, mmap_mode="r", allow_pickle=False)))
+        except (OSError, ValueError):
+            return self._unpack(arr)
+
+    def fetch(self, path: str, compute: Callable[[], Result]) -> Result:
+        value = self.get(path)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        try:
+            return self.put(path, value)
+        except OSError:
+            return value
+
+    # --- eviction ---
+
+    def entries(self) -> List[Dict[str, Any]]:
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append({"path": path, "size": st.st_size, "used": st.st_mtime})
+        return out
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the store fits in max_bytes. Returns entries removed."""
+        entries = sorted(self.entries(), key=lambda e: e["used"])
+        total = sum(e["size"] for e in entries)
+        removed = 0
+        for e in entries:
+            if total <= self.max_bytes:
+                break
+            if _unlink_quiet(e["path"]):
+                self._mapped.pop(e["path"], None)
+                total -= e["size"]
+                removed += 1
+        return removed
+
+    def clear(self) -> int:
+        self._mapped.clear()
+        return sum(1 for e in self.entries() if _unlink_quiet(e["path"]))
+
+
+class DatasetIndicators:
+    """
+    Indicators of one pair/timeframe frame; values come from the store or are computed once. With a
+    store, indicators are computed over self.source (the whole data file when the frame is a date
+    range of it, else the frame) and sliced to the frame's rows.
+    """
+
+    def __init__(
+        self,
+        dataframe: DataFrame,
+        pair: str,
+        timeframe: str,
+        store: Optional[IndicatorStore],
+        config: Optional[dict] = None,
+    ):
+        self.dataframe = dataframe
+        self.pair = pair
+        self.timeframe = timeframe
+        self.store = store
+        self.source = dataframe
+        self.rows: Optional[slice] = None
+        self.version = None
+        if store is not None:
+            loaded = load_data_file(config or {}, pair, timeframe)
+            rows = frame_rows(loaded[1], dataframe) if loaded else None
+            if rows is not None:
+                self.version, self.source = loaded
+                self.rows = rows
+            else:
+                self.version = data_version(dataframe)
+
+    def get(self, indicator: str, compute: Callable[[], Result], **params: Any) -> Result:
+        """Cached result of compute() for (indicator, params); arrays are read-only when cached."""
+        if self.store is None:
+            return compute()
+        path = self.store.entry_path(self.pair, self.timeframe, self.version, indicator, params)
+        value = self.store.fetch(path, compute)
+        if self.rows is None:
+            return value
+        if isinstance(value, dict):
+            return {name: arr[self.rows] for name, arr in value.items()}
+        return value[self.rows]
+
+    def ta(self, func: str, **params: Any) -> Result:
+        """TA-Lib abstract function (e.g. "RSI", timeperiod=14); multi-output functions return a dict."""
+        if ta is None:
+            raise ImportError("TA-Lib is required for ta() indicators")
+
+        def compute() -> Result:
+            out = ta.Function(func)(self.source, **params)
+            if isinstance(out, DataFrame):
+                return {name: out[name].to_numpy(dtype=np.float64) for name in out.columns}
+            return np.asarray(out, dtype=np.float64)
+
+        return self.get(f"ta_{func}", compute, talib=talib.__version__, **params)
+
+    def rolling(self, column: str, window: int, how: str = "mean") -> np.ndarray:
+        """Pandas rolling aggregate of a column (mean, max, min, std, sum)."""
+        def compute() -> np.ndarray:
+            return getattr(self.source[column].rolling(window=window), how)().to_numpy(dtype=np.float64)
+
+        return self.get(f"rolling_{how}", compute, column=column, window=window)
+
+
+_STORE: Optional[IndicatorStore] = None
+
+
+def shared_store(config: Optional[dict] = None) -> Optional[IndicatorStore]:
+    """
+    Process-wide store; None outside STORE_RUNMODES (per config["runmode"]), when
+    KLINEO_INDICATOR_CACHE=0 or when the cache dir is not writable.
+    """
+    global _STORE
+    runmode = (config or {}).get("runmode")
+    if getattr(runmode, "value", runmode) not in STORE_RUNMODES:
+        return None
+    if os.environ.get("KLINEO_INDICATOR_CACHE", "1") == "0":
+        return None
+    if _STORE is None:
+        try:
+            _STORE = IndicatorStore()
+        except OSError:
+            return None
+    return _STORE
+
+
+def shared_indicators(
+    dataframe: DataFrame,
+    metadata: dict,
+    timeframe: str,
+    config: Optional[dict] = None,
+) -> DatasetIndicators:
+    """Indicators for a populate_* frame; config (the strategy's self.config) locates the data file."""
+    return DatasetIndicators(dataframe, metadata.get("pair", "unknown"), timeframe, shared_store(config), config)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Inspect or clear the Klineo shared indicator store")
+    p.add_argument("--cache-dir", default=None, help="Store directory (default: output/cache/indicators)")
+    p.add_argument("--stats", action="store_true", help="Print entry count and total size")
+    p.add_argument("--clear", action="store_true", help="Remove all entries")
+    args = p.parse_args()
+
+    store = IndicatorStore(args.cache_dir)
+    if args.clear:
+        print(f"Removed {store.clear()} entries from {store.cache_dir}")
+    if args.stats or not args.clear:
+        entries = store.entries()
+        total = sum(e["size"] for e in entries)
+        print(f"{store.cache_dir}: {len(entries)} entries, {total / 1024 ** 2:.1f} MiB (max {store.max_bytes / 1024 ** 2:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Incremental (append-only) re-backtest: extend an existing result to a later end date by
+backtesting only the new tail and merging it into the prior raw/normalized outputs.
+
+Usage:
+  python3 incremental_backtest.py <strategy> <timeframe> <pairs_csv> <prior_timerange> <new_timerange>
+Example (extend 2024-2025 by January 2026):
+  python3 incremental_backtest.py KlineoEmaRsiTrend 15m BTC/USDT 20240101-20251231 20240101-20260131
+
+How the tail is chosen:
+- Trades the prior run force-closed at its end date (exit_reason force_exit) were still open, so they
+  are dropped and the tail starts at the earliest of their open times (carried-over positions).
+- Freqtrade loads startup_candle_count candles before the tail start for indicator warm-up; the
+  download covers that window.
+- Informative timeframes of the strategy are resampled from the downloaded base data (resample.py).
+- Tail trades opened before the prior end date that do not replace a dropped position duplicate
+  prior trades and are discarded.
+How the outputs are merged:
+- The merged raw result (prior kept trades + tail trades) replaces nothing: it is written under the
+  new timerange's name so the next extension can start from it.
+- Only the appended tail trades are parsed. Their normalized trades, candles after the prior's last
+  one and monthly PnL are merged into the prior normalized result, with the carried-over positions
+  taken out. Prior equity points before the first carried position's exit are reused as is, and the
+  rest are continued from the prior cumulative profit. Metrics are recomputed from the trade records.
+- When the prior normalized result is missing or cannot be extended in place (downsampled, candle
+  sidecars, portfolio / Monte Carlo / excursion fields), the merged raw result is parsed in full.
+The tail backtest starts from the prior wallet at the tail start (--dry-run-wallet: starting balance
+plus the profit of prior trades closed by then), so stake sizing continues from the prior run. Open
+slots are not carried over: prior trades still open at the tail start neither hold stake nor a slot
+in the tail, so trades right after the cut can differ slightly from a full re-run.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import batch_backtest
+import catalog
+import columnar_output
+import parse_backtest
+import resample
+from downsample import timeframe_seconds
+from result_cache import timerange_bounds
+
+FORCE_EXIT_REASONS = ("force_exit", "force_sell")
+# Payload fields of parser options the tail parse does not reproduce; their results are parsed in full
+NOT_MERGEABLE = ("resolution", "candles", "portfolio", "monte_carlo", "tv_markers", "approximate", "walk_forward")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Extend a Klineo backtest result by backtesting only the new tail")
+    p.add_argument("strategy")
+    p.add_argument("timeframe")
+    p.add_argument("pairs", help="Comma-separated pairs (e.g. BTC/USDT,ETH/USDT)")
+    p.add_argument("prior_timerange", help="Timerange of the existing result (e.g. 20240101-20251231)")
+    p.add_argument("new_timerange", help="Extended timerange with the same start (e.g. 20240101-20260131)")
+    p.add_argument("--skip-download", action="store_true", help="Assume tail data is already downloaded")
+    p.add_argument("--stream", action="store_true", help="Parse the merged result in streaming mode")
+    return p.parse_args()
+
+
+def result_name(strategy: str, timeframe: str, timerange: str) -> str:
+    return f"{strategy}_{timeframe}_{batch_backtest.safe_name(timerange)}.json"
+
+
+def is_carried_over(t: dict, prior_end: int) -> bool:
+    """Trade still open at the prior end date (Freqtrade force-closes those at the end of a backtest)."""
+    reason = t.get("exit_reason") or t.get("sell_reason")
+    if reason in FORCE_EXIT_REASONS:
+        return True
+    return parse_backtest.trade_close_time_ts(t) >= prior_end
+
+
+def split_prior(trades: List[dict], prior_end: int) -> Tuple[List[dict], List[dict]]:
+    kept, carried = [], []
+    for t in trades:
+        (carried if is_carried_over(t, prior_end) else kept).append(t)
+    return kept, carried
+
+
+def merge_trades(kept: List[dict], carried: List[dict], tail: List[dict], prior_end: int) -> List[dict]:
+    """Prior closed trades + tail trades that opened after the cut or re-open a carried position."""
+    reopen = {(t.get("pair"), parse_backtest.trade_open_time_ts(t)) for t in carried}
+    merged = list(kept)
+    for t in tail:
+        opened = parse_backtest.trade_open_time_ts(t)
+        if opened >= prior_end or (t.get("pair"), opened) in reopen:
+            merged.append(t)
+    return merged
+
+
+def prior_starting_balance(prior_raw: Any, strategy: str) -> Optional[float]:
+    """Starting balance of the prior export (backtest_stats or Freqtrade's per-strategy stats), if recorded."""
+    return parse_backtest.start_balance(prior_raw, strategy, 0.0) or None
+
+
+def tail_wallet(starting_balance: float, kept: List[dict], tail_start: int) -> float:
+    """Prior wallet at the tail start: the starting balance plus the profit of kept trades closed by then."""
+    closed = (t for t in kept if 0 < parse_backtest.trade_close_time_ts(t) <= tail_start)
+    return starting_balance + sum(parse_backtest.trade_profit_abs(t) for t in closed)
+
+
+def merged_stats(
+    starting_balance: Optional[float],
+    merged: List[dict],
+    tail_balance: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """profit_total for the merged trades, when the prior export recorded a starting balance."""
+    if not starting_balance:
+        return None
+    total = sum(parse_backtest.trade_profit_abs(t) for t in merged)
+    stats = {"starting_balance": starting_balance, "profit_total": total / float(starting_balance)}
+    if tail_balance is not None:
+        stats["tail_starting_balance"] = round(tail_balance, 8)
+    return stats
+
+
+def prior_normalized(path: str) -> Optional[Dict[str, Any]]:
+    """The prior normalized result, when it can be extended in place (see NOT_MERGEABLE)."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        payload = columnar_output.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: prior normalized result not readable ({e}); parsing the merged result in full", file=sys.stderr)
+        return None
+    if not isinstance(payload, dict) or any(key in payload for key in NOT_MERGEABLE):
+        return None
+    return payload
+
+
+def merge_equity(
+    prior_equity: List[Dict[str, Any]],
+    records: List[parse_backtest.TradeRecord],
+    cut: Optional[int],
+) -> List[Dict[str, Any]]:
+    """
+    tv_equity of records (prior kept + appended tail trades): the prior points closing before cut
+    (the first carried position's exit) are reused, later points are continued from their cumulative
+    profit. Same values as parse_backtest.build_equity_curve(records).
+    """
+    closed = sorted((r for r in records if r.close_time), key=lambda r: r.close_time)
+    head = [pt for pt in prior_equity[1:] if cut is None or pt["time"] < cut]
+    if not head or len(head) > len(closed):
+        return parse_backtest.build_equity_curve(records)
+    start_balance = prior_equity[0]["value"]
+    cumulative = 0.0
+    for r in closed[: len(head)]:
+        cumulative += r.profit_raw
+    if round(start_balance + cumulative, 2) != head[-1]["value"]:
+        # Prior output from other trades than the prior raw result: rebuild
+        return parse_backtest.build_equity_curve(records)
+    out = [prior_equity[0]] + head
+    for r in closed[len(head):]:
+        cumulative += r.profit_raw
+        out.append({"time": r.close_time, "value": round(start_balance + cumulative, 2)})
+    return out
+
+
+def merge_monthly(
+    prior: List[Dict[str, Any]],
+    tail: List[Dict[str, Any]],
+    carried: List[parse_backtest.TradeRecord],
+) -> List[Dict[str, Any]]:
+    """Prior monthly_pnl_breakdown without the carried positions, plus the tail's."""
+    months = {(m["year"], m["month"]): dict(m) for m in prior}
+    dropped = parse_backtest.TradeStats()
+    for r in carried:
+        dropped.add(r)
+    for m in dropped.monthly_breakdown():
+        month = months.get((m["year"], m["month"]))
+        if month is not None:
+            month["profit_abs"] -= m["profit_abs"]
+            month["trade_count"] -= m["trade_count"]
+    for m in tail:
+        month = months.setdefault((m["year"], m["month"]), {"year": m["year"], "month": m["month"], "profit_abs": 0.0, "trade_count": 0})
+        month["profit_abs"] += m["profit_abs"]
+        month["trade_count"] += m["trade_count"]
+    return [months[k] for k in sorted(months) if months[k]["trade_count"] > 0]
+
+
+def merge_normalized(
+    prior: Dict[str, Any],
+    tail: Dict[str, Any],
+    kept: List[parse_backtest.TradeRecord],
+    carried: List[parse_backtest.TradeRecord],
+    added: List[parse_backtest.TradeRecord],
+    stats: Optional[Dict[str, Any]],
+    timerange: str,
+) -> Dict[str, Any]:
+    """
+    Normalized result for the new timerange from the prior one and the normalized tail (the parse of
+    the appended tail trades only). kept / carried / added are the records of the prior kept trades,
+    the prior carried positions and the appended tail trades.
+    """
+    drop = Counter((r.pair, r.open_time, r.close_time) for r in carried)
+    trades = []
+    for t in prior.get("trades") or []:
+        key = (t.get("pair"), t.get("open_time"), t.get("close_time"))
+        if drop[key]:
+            drop[key] -= 1
+            continue
+        trades.append(t)
+    trades.extend(tail.get("trades") or [])
+
+    tv_ohlc = list(prior.get("tv_ohlc") or [])
+    last = tv_ohlc[-1]["time"] if tv_ohlc else None
+    tv_ohlc.extend(c for c in tail.get("tv_ohlc") or [] if last is None or c["time"] > last)
+
+    records = kept + added
+    cut = min((r.close_time for r in carried if r.close_time), default=None)
+    tv_equity = merge_equity(prior.get("tv_equity") or [], records, cut)
+    trade_stats = parse_backtest.TradeStats()
+    for r in records:
+        trade_stats.add(r)
+    metrics, risk = parse_backtest.equity_metrics(trade_stats, tv_equity, (stats or {}).get("profit_total"))
+
+    payload = {
+        "strategy": prior.get("strategy"),
+        "exchange_data_source": prior.get("exchange_data_source", "binance"),
+        "timeframe": prior.get("timeframe"),
+        "pairs": prior.get("pairs"),
+        "timerange": timerange,
+        "metrics": metrics,
+        "monthly_pnl_breakdown": merge_monthly(prior.get("monthly_pnl_breakdown") or [], tail.get("monthly_pnl_breakdown") or [], carried),
+        "tv_ohlc": tv_ohlc,
+        "tv_equity": tv_equity,
+        "trades": trades,
+    }
+    if risk is not None:
+        payload["risk"] = risk
+    return payload
+
+
+def main():
+    args = parse_args()
+    prior_start, prior_end = timerange_bounds(args.prior_timerange)
+    new_start, new_end = timerange_bounds(args.new_timerange)
+    if prior_end is None or prior_start != new_start or (new_end is not None and new_end <= prior_end):
+        print("Error: new timerange must keep the prior start and end after the prior end", file=sys.stderr)
+        sys.exit(1)
+
+    prior_raw_path = os.path.join(batch_backtest.OUTPUT_RAW, result_name(args.strategy, args.timeframe, args.prior_timerange))
+    if not os.path.isfile(prior_raw_path):
+        print(f"Error: prior raw result not found: {prior_raw_path}", file=sys.stderr)
+        sys.exit(1)
+    prior_raw = parse_backtest.load_json(prior_raw_path)
+    kept, carried = split_prior(parse_backtest.ensure_list_trades(prior_raw), prior_end)
+
+    tail_start = min([prior_end] + [parse_backtest.trade_open_time_ts(t) or prior_end for t in carried])
+    tail_timerange = f"{tail_start}-{new_end if new_end is not None else ''}"
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+    print(
+        f"[Klineo Incremental] {args.strategy} {args.timeframe}: {len(kept)} prior trades kept, "
+        f"{len(carried)} carried over, tail {tail_timerange}"
+    )
+
+    started = time.perf_counter()
+    if not args.skip_download:
+        warmup = batch_backtest.strategy_startup_candles(args.strategy) * timeframe_seconds(args.timeframe)
+        step = {
+            "timeframe": args.timeframe,
+            "pairs": pairs,
+            "timerange": f"{datetime.fromtimestamp(tail_start - warmup, timezone.utc):%Y%m%d}-"
+            + (f"{datetime.fromtimestamp(new_end, timezone.utc):%Y%m%d}" if new_end else ""),
+        }
+        dl = batch_backtest.run_download(step)
+        if dl["status"] != "ok":
+            print(f"[Klineo Incremental] ERROR: download-data failed\n{dl['error']}", file=sys.stderr)
+            sys.exit(1)
+    informative = resample.informative_timeframes(args.strategy, args.timeframe)
+    if informative:
+        resample.prepare(pairs, args.timeframe, informative, os.path.join(batch_backtest.USER_DATA, "data"), batch_backtest.CANDLE_CACHE)
+
+    export_dir = os.path.join(batch_backtest.USER_DATA, "backtest_results", "incremental")
+    os.makedirs(export_dir, exist_ok=True)
+    export_path = os.path.join(export_dir, f"{args.strategy}_{args.timeframe}_{tail_start}.json")
+    cmd = batch_backtest.backtest_command(args.strategy, args.timeframe, tail_timerange, pairs, export_path)
+    # Carry the wallet over so stake sizing in the tail continues from the prior run
+    starting_balance = prior_starting_balance(prior_raw, args.strategy)
+    tail_balance = None
+    if starting_balance:
+        tail_balance = tail_wallet(starting_balance, kept, tail_start)
+        cmd += ["--dry-run-wallet", f"{tail_balance:.8f}"]
+    else:
+        print(
+            "Warning: prior result has no starting balance; the tail starts from the configured wallet "
+            "and the merged profit is not computed",
+            file=sys.stderr,
+        )
+    proc = subprocess.run(cmd)
+    if proc.returncode != 0:
+        sys.exit(proc.returncode)
+    tail_path = batch_backtest.find_export(export_path)
+    if not tail_path:
+        print("[Klineo Incremental] ERROR: Raw result file not found.", file=sys.stderr)
+        sys.exit(1)
+    tail = parse_backtest.ensure_list_trades(parse_backtest.load_json(tail_path))
+
+    merged = merge_trades(kept, carried, tail, prior_end)
+    merged_raw: Dict[str, Any] = {"trades": merged}
+    stats = merged_stats(starting_balance, merged, tail_balance)
+    if stats:
+        merged_raw["backtest_stats"] = stats
+
+    raw_path = os.path.join(batch_backtest.OUTPUT_RAW, result_name(args.strategy, args.timeframe, args.new_timerange))
+    norm_path = os.path.join(batch_backtest.OUTPUT_NORM, result_name(args.strategy, args.timeframe, args.new_timerange))
+    with open(raw_path, "w", encoding="utf-8") as f:
+        json.dump(merged_raw, f)
+
+    argv = [
+        "--raw", raw_path,
+        "--strategy", args.strategy,
+        "--timeframe", args.timeframe,
+        "--pairs", args.pairs,
+        "--timerange", args.new_timerange,
+        "--out", norm_path,
+        "--data-dir", os.path.join(batch_backtest.USER_DATA, "data"),
+        "--candle-cache", batch_backtest.CANDLE_CACHE,
+        *catalog.parser_args(),
+    ]
+    stream = ["--stream"] if args.stream else []
+    prior = prior_normalized(os.path.join(batch_backtest.OUTPUT_NORM, result_name(args.strategy, args.timeframe, args.prior_timerange)))
+    if prior is None:
+        print("[Klineo Incremental] Prior normalized result not reusable; parsing the merged result in full")
+        parse_backtest.main(argv + stream)
+    else:
+        # Parse only the appended tail trades, then merge them into the prior normalized result
+        added = merged[len(kept):]
+        with tempfile.TemporaryDirectory(prefix="klineo-incremental-") as tmp:
+            tail_raw = os.path.join(tmp, "tail.json")
+            tail_out = os.path.join(tmp, "tail_normalized.json")
+            with open(tail_raw, "w", encoding="utf-8") as f:
+                json.dump({"trades": added}, f)
+            parse_backtest.main([
+                "--raw", tail_raw,
+                "--strategy", args.strategy,
+                "--timeframe", args.timeframe,
+                "--pairs", args.pairs,
+                "--timerange", tail_timerange,
+                "--out", tail_out,
+                "--data-dir", os.path.join(batch_backtest.USER_DATA, "data"),
+                "--candle-cache", batch_backtest.CANDLE_CACHE,
+                *stream,
+            ])
+            tail_norm = columnar_output.load(tail_out)
+        first_pair = "BTC/USDT" if "BTC/USDT" in pairs else (pairs[0] if pairs else "BTC/USDT")
+        kept_rec, carried_rec, added_rec = (
+            [parse_backtest.TradeRecord(t, first_pair) for t in trades] for trades in (kept, carried, added)
+        )
+        payload = merge_normalized(prior, tail_norm, kept_rec, carried_rec, added_rec, stats, args.new_timerange)
+        with open(norm_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        parser_args = parse_backtest.parse_args(argv)
+        if parser_args.catalog:
+            parse_backtest.upsert_catalog(parser_args, payload)
+    print(
+        f"[Klineo Incremental] Done in {time.perf_counter() - started:.1f}s: "
+        f"{len(merged) - len(kept)} tail trades merged. Normalized output: {norm_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Stage-level instrumentation for the backtest pipeline.
+Every stage (download-data, Freqtrade backtest, parser load/decode/metrics/dump) records wall time,
+CPU time, peak RSS and input/output byte and row counts into a sidecar next to the normalized output:
+  output/normalized/<name>.stages.json
+Subprocess stages (Freqtrade) are measured through the child's resource usage.
+
+Usage (wrap a command as a stage; exits with the command's return code):
+  python3 instrumentation.py run --stage backtest --stages output/normalized/X.stages.json \\
+    --output-file user_data/backtest_results/klineo_backtest_export.json -- freqtrade backtesting ...
+  python3 instrumentation.py show output/normalized/X.stages.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STAGES_FORMAT = "klineo-stages-v1"
+STAGES_SUFFIX = ".stages.json"
+TRACEMALLOC_TOP = 30
+
+
+def stages_path_for(out_path: str) -> str:
+    """output/normalized/X.json -> output/normalized/X.stages.json"""
+    base, _ = os.path.splitext(out_path)
+    return base + STAGES_SUFFIX
+
+
+def _rss_bytes(who: int) -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale
+
+
+def _children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+class StageRecorder:
+    """Collects per-stage records; stage() yields the record so callers can add byte/row counts."""
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **counts: Any) -> Iterator[Dict[str, Any]]:
+        rec: Dict[str, Any] = {"stage": name, **counts}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield rec
+        finally:
+            rec["wall_seconds"] = round(time.perf_counter() - wall, 4)
+            rec["cpu_seconds"] = round(time.process_time() - cpu, 4)
+            # Process-wide high-water mark at the end of the stage
+            rec["peak_rss_bytes"] = _rss_bytes(resource.RUSAGE_SELF) if resource else None
+            self.stages.append(rec)
+
+    def write(self, path: str, replace: Iterable[str] = (), **fields: Any) -> Dict[str, Any]:
+        return append_stages(path, self.stages, replace, **fields)
+
+
+def run_stage(
+    name: str,
+    cmd: List[str],
+    output_file: Optional[str] = None,
+    **run_kwargs: Any,
+) -> Tuple[Dict[str, Any], subprocess.CompletedProcess]:
+    """
+    Run cmd as a stage (run_kwargs go to subprocess.run). CPU time and peak RSS are the child's;
+    the peak is the largest child this process has waited for, so run one stage at a time per process.
+    """
+    rec: Dict[str, Any] = {"stage": name, "command": cmd[0] if cmd else None}
+    cpu = _children_cpu()
+    wall = time.perf_counter()
+    proc = subprocess.run(cmd, **run_kwargs)
+    rec["wall_seconds"] = round(time.perf_counter() - wall, 4)
+    rec["cpu_seconds"] = round(_children_cpu() - cpu, 4)
+    rec["peak_rss_bytes"] = _rss_bytes(resource.RUSAGE_CHILDREN) if resource else None
+    rec["returncode"] = proc.returncode
+    if output_file and os.path.isfile(output_file):
+        rec["output_bytes"] = os.path.getsize(output_file)
+    return rec, proc
+
+
+def load_stages(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return {"format": STAGES_FORMAT, "stages": []}
+    doc.setdefault("stages", [])
+    return doc
+
+
+def append_stages(
+    path: str,
+    stages: List[Dict[str, Any]],
+    replace: Iterable[str] = (),
+    **fields: Any,
+) -> Dict[str, Any]:
+    """
+    Merge stage records into the sidecar at path. Earlier records with the same names (or any name in
+    replace) are dropped, so re-running one step (e.g. only the parser) keeps the sidecar consistent.
+    """
+    doc = load_stages(path)
+    names = {s["stage"] for s in stages} | set(replace)
+    doc["stages"] = [s for s in doc["stages"] if s.get("stage") not in names] + list(stages)
+    doc.update(fields)
+    doc["updated_at"] = datetime.now(timezone.utc).isoformat()
+    peaks = [s["peak_rss_bytes"] for s in doc["stages"] if s.get("peak_rss_bytes")]
+    doc["totals"] = {
+        "wall_seconds": round(sum(s.get("wall_seconds", 0) for s in doc["stages"]), 4),
+        "cpu_seconds": round(sum(s.get("cpu_seconds", 0) for s in doc["stages"]), 4),
+        "peak_rss_bytes": max(peaks) if peaks else None,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp, path)
+    return doc
+
+
+@contextlib.contextmanager
+def profiled(out_path: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """
+    cProfile + tracemalloc around the block when out_path is given: writes <out>.cprofile (pstats
+    format) and <out>.tracemalloc.txt (top allocation sites). Yields a dict filled with the dump
+    paths and tracemalloc peak. No-op when out_path is None.
+    """
+    info: Dict[str, Any] = {}
+    if not out_path:
+        yield info
+        return
+    import cProfile
+    import tracemalloc
+
+    base, _ = os.path.splitext(out_path)
+    prof = cProfile.Profile()
+    tracemalloc.start()
+    prof.enable()
+    try:
+        yield info
+    finally:
+        prof.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        prof.dump_stats(base + ".cprofile")
+        buf = io.StringIO()
+        buf.write(f"tracemalloc peak: {peak} bytes\n")
+        for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+            buf.write(f"{stat}\n")
+        with open(base + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        info.update({
+            "cprofile": base + ".cprofile",
+            "tracemalloc": base + ".tracemalloc.txt",
+            "tracemalloc_peak_bytes": peak,
+        })
+
+
+def _mib(v: Optional[int]) -> str:
+    return f"{v / 1024 ** 2:.1f}" if v else "-"
+
+
+def show(path: str) -> None:
+    doc = load_stages(path)
+    print(f"{'stage':<14} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9} {'in MiB':>8} {'out MiB':>8} {'rows':>10}")
+    for s in doc["stages"] + [{"stage": "total", **doc.get("totals", {})}]:
+        rows = s.get("output_rows", s.get("input_rows"))
+        print(
+            f"{s['stage']:<14} {s.get('wall_seconds', 0):>9.3f} {s.get('cpu_seconds', 0):>9.3f} "
+            f"{_mib(s.get('peak_rss_bytes')):>9} {_mib(s.get('input_bytes')):>8} {_mib(s.get('output_bytes')):>8} "
+            f"{rows if rows is not None else '-':>10}"
+        )
+
+
+def main():
+    p = argparse.ArgumentParser(description="Klineo backtest pipeline stage instrumentation")
+    sub = p.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run", help="Run a command as a recorded stage")
+    r.add_argument("--stage", required=True, help="Stage name (e.g. download, backtest)")
+    r.add_argument("--stages", required=True, help="Stages sidecar path")
+    r.add_argument("--output-file", default=None, help="File whose size is recorded as output_bytes")
+    r.add_argument("cmd", nargs=argparse.REMAINDER, help="-- command ...")
+    s = sub.add_parser("show", help="Print a stages sidecar as a table")
+    s.add_argument("path")
+    args = p.parse_args()
+
+    if args.command == "show":
+        show(args.path)
+        return
+    cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+    if not cmd:
+        p.error("run needs a command after --")
+    rec, _ = run_stage(args.stage, cmd, args.output_file)
+    append_stages(args.stages, [rec])
+    sys.exit(rec["returncode"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""
+Backtest job scheduler: one long-lived process that owns a persistent queue of run_backtest.sh jobs
+and runs them under a global worker cap, so concurrent user requests never fork unbounded Freqtrade
+processes.
+
+- Lanes: "interactive" jobs always start before "nightly" ones, and nightly jobs leave one slot free
+  for interactive requests when there is more than one worker.
+- Worker cap: CPU count, bounded by available memory / KLINEO_SCHEDULER_JOB_MEMORY; a job also only
+  starts while that much memory is available.
+- Identical queued or running jobs (same strategy, timeframe, pairs, timerange and options) are
+  deduplicated: the submit returns the existing job, upgraded to the interactive lane if needed.
+- Cancellation: queued jobs are dropped, running jobs get SIGTERM (SIGKILL after a grace period).
+- Progress: stage (queued, download, backtest, parse), percent and ETA, estimated from earlier
+  runs' stage durations per strategy/timeframe and pair-day. Events stream as JSON lines.
+- Persistence: one JSON file per job in output/scheduler/jobs/; after a restart queued jobs stay
+  queued and interrupted running jobs are queued again. Job output goes to output/scheduler/logs/.
+
+Protocol (JSON lines over a Unix socket, like backtest_worker.py):
+  python3 job_scheduler.py --socket /tmp/klineo-scheduler.sock
+
+  {"cmd": "submit", "strategy": "KlineoEmaRsiTrend", "timeframe": "15m", "pairs": "BTC/USDT",
+   "timerange": "20240101-20251231", "lane": "interactive", "watch": true}
+  -> {"status": "ok", "job": {...}, "deduplicated": false}
+  -> {"event": "progress", "job": "<id>", "state": "running", "stage": "backtest", "percent": 41.5, "eta_seconds": 12.0}
+  -> {"event": "finished", "job": "<id>", "state": "ok", "normalized_path": "...", ...}
+
+Optional submit keys: lane (interactive | nightly, default interactive), watch, options
+({"max_points": n, "candle_sidecars": true, "format": "columnar", "compress": "gzip", "portfolio": true,
+"excursions": true, "monte_carlo": 10000, "cache": false}).
+Other commands: {"cmd": "watch", "job": id}, {"cmd": "cancel", "job": id}, {"cmd": "status", "job": id},
+{"cmd": "list"}, {"cmd": "stats"}, {"cmd": "ping"}, {"cmd": "shutdown"}.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import shutil
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_cache import timerange_bounds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_SCRIPT = os.path.join(SCRIPT_DIR, "run_backtest.sh")
+USER_DATA = os.path.join(SCRIPT_DIR, "freqtrade", "user_data")
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+STATE_DIR = os.environ.get("KLINEO_SCHEDULER_DIR", os.path.join(SCRIPT_DIR, "output", "scheduler"))
+
+LANES = ("interactive", "nightly")
+STAGES = ("download", "backtest", "parse")
+TERMINAL = ("ok", "failed", "cancelled")
+# run_backtest.sh progress lines -> stage
+STAGE_MARKERS = {
+    "[Klineo Backtest] Downloading data": "download",
+    "[Klineo Backtest] Running backtest": "backtest",
+    "[Klineo Backtest] Parsing to normalized JSON": "parse",
+}
+# Seconds per pair-day for a strategy/timeframe without history
+DEFAULT_STAGE_RATES = {"download": 0.01, "backtest": 0.08, "parse": 0.005}
+HISTORY_ALPHA = 0.3
+DEFAULT_JOB_MEMORY = 1536 * 1024 ** 2
+CANCEL_GRACE_SECONDS = 10.0
+PROGRESS_INTERVAL = 1.0
+KEEP_FINISHED_SECONDS = 7 * 86400
+# Submit options -> run_backtest.sh environment
+OPTION_ENV = {
+    "max_points": "KLINEO_MAX_POINTS",
+    "candle_sidecars": "KLINEO_CANDLE_SIDECARS",
+    "format": "KLINEO_OUTPUT_FORMAT",
+    "compress": "KLINEO_OUTPUT_COMPRESS",
+    "stream": "KLINEO_PARSE_STREAM",
+    "portfolio": "KLINEO_PORTFOLIO",
+    "excursions": "KLINEO_EXCURSIONS",
+    "monte_carlo": "KLINEO_MONTE_CARLO",
+}
+
+
+class SchedulerError(Exception):
+    """Invalid request or unknown job; reported as status "failed"."""
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _write_json(path: str, doc: Any) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp, path)
+
+
+def available_memory() -> Optional[int]:
+    """MemAvailable in bytes (Linux), else free physical pages; None if unknown."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_workers(job_memory: int) -> int:
+    """CPU count, bounded by how many jobs fit in the memory available now."""
+    cap = os.cpu_count() or 1
+    mem = available_memory()
+    if mem is not None:
+        cap = min(cap, mem // max(job_memory, 1))
+    return max(1, int(cap))
+
+
+def job_key(request: Dict[str, Any]) -> str:
+    """Identity of a backtest for deduplication (lane and watch do not matter)."""
+    spec = {k: request[k] for k in ("strategy", "timeframe", "pairs", "timerange", "options")}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+def pair_days(request: Dict[str, Any]) -> float:
+    """Size of a job for duration estimates: pairs x days in the timerange."""
+    start, end = timerange_bounds(request["timerange"])
+    end = end or _now()
+    days = max((end - start) / 86400.0, 1.0) if start else 365.0
+    return days * max(len(request["pairs"].split(",")), 1)
+
+
+class StageHistory:
+    """Exponential moving average of seconds per pair-day for each stage, per strategy/timeframe."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.rates: Dict[str, Dict[str, float]] = json.load(f)
+        except (OSError, ValueError):
+            self.rates = {}
+
+    @staticmethod
+    def _key(request: Dict[str, Any]) -> str:
+        return f"{request['strategy']}|{request['timeframe']}"
+
+    def expected(self, request: Dict[str, Any]) -> Dict[str, float]:
+        rates = {**DEFAULT_STAGE_RATES, **self.rates.get("*", {}), **self.rates.get(self._key(request), {})}
+        size = pair_days(request)
+        return {stage: rates[stage] * size for stage in STAGES}
+
+    def record(self, request: Dict[str, Any], seconds: Dict[str, float]) -> None:
+        size = pair_days(request)
+        for key in (self._key(request), "*"):
+            rates = self.rates.setdefault(key, {})
+            for stage, value in seconds.items():
+                rate = value / size
+                rates[stage] = rate if stage not in rates else (1 - HISTORY_ALPHA) * rates[stage] + HISTORY_ALPHA * rate
+        _write_json(self.path, self.rates)
+
+
+class Scheduler:
+    def __init__(self, state_dir: str = STATE_DIR, workers: Optional[int] = None, job_memory: Optional[int] = None):
+        self.state_dir = state_dir
+        self.jobs_dir = os.path.join(state_dir, "jobs")
+        self.logs_dir = os.path.join(state_dir, "logs")
+        self.exports_dir = os.path.join(USER_DATA, "backtest_results", "scheduler")
+        for d in (self.jobs_dir, self.logs_dir):
+            os.makedirs(d, exist_ok=True)
+        if job_memory is None:
+            job_memory = int(os.environ.get("KLINEO_SCHEDULER_JOB_MEMORY", DEFAULT_JOB_MEMORY))
+        self.job_memory = job_memory
+        if workers is None and os.environ.get("KLINEO_SCHEDULER_WORKERS"):
+            workers = int(os.environ["KLINEO_SCHEDULER_WORKERS"])
+        self.workers = workers or default_workers(job_memory)
+        self.history = StageHistory(os.path.join(state_dir, "stage_history.json"))
+        self.cond = threading.Condition()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.procs: Dict[str, subprocess.Popen] = {}
+        self.watchers: Dict[str, List[queue.Queue]] = {}
+        self.stopping = False
+        self._load()
+
+    # --- Persistence ---
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id + ".json")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        _write_json(self._job_path(job["id"]), job)
+
+    def _load(self) -> None:
+        cutoff = _now() - KEEP_FINISHED_SECONDS
+        for name in sorted(os.listdir(self.jobs_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job["state"] in TERMINAL and (job.get("finished_at") or 0) < cutoff:
+                os.unlink(path)
+                continue
+            if job["state"] == "running":
+                # The scheduler stopped while this job ran; run it again
+                job.update({"state": "queued", "stage": "queued", "started_at": None, "percent": 0.0})
+                self._save(job)
+            self.jobs[job["id"]] = job
+
+    # --- Requests ---
+
+    def submit(self, msg: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        missing = [k for k in ("strategy", "timeframe", "pairs", "timerange") if not msg.get(k)]
+        if missing:
+            raise SchedulerError(f"missing job keys: {', '.join(missing)}")
+        lane = msg.get("lane", "interactive")
+        if lane not in LANES:
+            raise SchedulerError(f"unknown lane: {lane} (use {' or '.join(LANES)})")
+        pairs = msg["pairs"] if isinstance(msg["pairs"], str) else ",".join(msg["pairs"])
+        options = msg.get("options") or {}
+        unknown = set(options) - set(OPTION_ENV) - {"cache"}
+        if unknown:
+            raise SchedulerError(f"unknown options: {', '.join(sorted(unknown))}")
+        try:
+            timerange_bounds(str(msg["timerange"]))
+        except ValueError:
+            raise SchedulerError(f"invalid timerange: {msg['timerange']} (use YYYYMMDD-YYYYMMDD)")
+        request = {
+            "strategy": msg["strategy"],
+            "timeframe": msg["timeframe"],
+            "pairs": ",".join(p.strip() for p in pairs.split(",") if p.strip()),
+            "timerange": str(msg["timerange"]),
+            "options": options,
+        }
+        key = job_key(request)
+        with self.cond:
+            for job in self.jobs.values():
+                if job["key"] == key and job["state"] in ("queued", "running"):
+                    if lane == "interactive" and job["lane"] != "interactive":
+                        job["lane"] = "interactive"
+                        self._save(job)
+                        self.cond.notify_all()
+                    return job, True
+            job_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+            # Jobs run concurrently: the job key (pairs and options included) keeps their files apart
+            name = f"{request['strategy']}_{request['timeframe']}_{request['timerange'].replace('/', '_')}_{key[:12]}"
+            ext = ".kcol" if options.get("format") == "columnar" else ".json"
+            job = {
+                "id": job_id,
+                "key": key,
+                "lane": lane,
+                "state": "queued",
+                "stage": "queued",
+                "percent": 0.0,
+                "eta_seconds": None,
+                "request": request,
+                "normalized_path": os.path.join(OUTPUT_NORM, name + ext),
+                "log_path": os.path.join(self.logs_dir, job_id + ".log"),
+                "submitted_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "stage_started_at": None,
+                "stage_seconds": {},
+                "attempts": 0,
+                "error": None,
+            }
+            self.jobs[job_id] = job
+            self._save(job)
+            self.cond.notify_all()
+        self._emit(job, "queued")
+        return job, False
+
+    def get(self, job_id: Any) -> Dict[str, Any]:
+        job = self.jobs.get(job_id) if isinstance(job_id, str) else None
+        if job is None:
+            raise SchedulerError(f"unknown job: {job_id}")
+        return job
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        with self.cond:
+            job = self.get(job_id)
+            if job["state"] == "queued":
+                self._finish(job, "cancelled", error="cancelled while queued")
+            elif job["state"] == "running":
+                job["cancel_requested"] = True
+                self._save(job)
+                proc = self.procs.get(job_id)
+                if proc is not None:
+                    self._terminate(proc)
+        return job
+
+    def watch(self, job_id: str) -> queue.Queue:
+        """Event queue for a job; a finished job yields its final event right away."""
+        q: queue.Queue = queue.Queue()
+        with self.cond:
+            job = self.get(job_id)
+            if job["state"] in TERMINAL:
+                q.put(self._event(job, "finished"))
+            else:
+                self.watchers.setdefault(job_id, []).append(q)
+                q.put(self._event(job, "progress"))
+        return q
+
+    def unwatch(self, job_id: str, q: queue.Queue) -> None:
+        with self.cond:
+            with contextlib.suppress(ValueError, KeyError):
+                self.watchers[job_id].remove(q)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            states: Dict[str, int] = {}
+            lanes = {lane: 0 for lane in LANES}
+            for job in self.jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+                if job["state"] == "queued":
+                    lanes[job["lane"]] += 1
+            return {
+                "workers": self.workers,
+                "running": len(self.procs),
+                "queued_by_lane": lanes,
+                "jobs_by_state": states,
+                "job_memory_bytes": self.job_memory,
+                "available_memory_bytes": available_memory(),
+            }
+
+    # --- Events ---
+
+    def _event(self, job: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        event = {
+            "event": kind,
+            "job": job["id"],
+            "lane": job["lane"],
+            "state": job["state"],
+            "stage": job["stage"],
+            "percent": job["percent"],
+            "eta_seconds": job["eta_seconds"],
+        }
+        if kind == "finished":
+            event.update({
+                "normalized_path": job["normalized_path"] if job["state"] == "ok" else None,
+                "cached": job.get("cached", False),
+                "error": job["error"],
+                "seconds": round(job["finished_at"] - job["started_at"], 3) if job["started_at"] else 0.0,
+                "stage_seconds": job["stage_seconds"],
+            })
+        return event
+
+    def _emit(self, job: Dict[str, Any], kind: str) -> None:
+        event = self._event(job, kind)
+        for q in list(self.watchers.get(job["id"], [])):
+            q.put(event)
+        if kind == "finished":
+            self.watchers.pop(job["id"], None)
+
+    def _update_progress(self, job: Dict[str, Any]) -> None:
+        """percent / eta_seconds from the expected stage durations and time spent in the current stage."""
+        expected = self.history.expected(job["request"])
+        total = sum(expected.values())
+        if job["stage"] not in STAGES:
+            return
+        i = STAGES.index(job["stage"])
+        elapsed = _now() - (job["stage_started_at"] or _now())
+        current = expected[job["stage"]]
+        # An overrunning stage holds just short of its end until the next stage marker
+        done = sum(expected[s] for s in STAGES[:i]) + min(elapsed, 0.95 * current)
+        job["percent"] = round(min(99.0, 100.0 * done / total), 1) if total else 0.0
+        job["eta_seconds"] = round(max(total - done, 0.0), 1)
+
+    # --- Execution ---
+
+    def _slots_free(self, lane: str) -> bool:
+        running = [self.jobs[j] for j in self.procs]
+        if len(running) >= self.workers:
+            return False
+        if lane == "nightly" and self.workers > 1:
+            # Keep one slot for interactive requests
+            if sum(1 for job in running if job["lane"] == "nightly") >= self.workers - 1:
+                return False
+        mem = available_memory()
+        return mem is None or mem >= self.job_memory or not running
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        queued = [job for job in self.jobs.values() if job["state"] == "queued"]
+        queued.sort(key=lambda job: (LANES.index(job["lane"]), job["submitted_at"]))
+        for job in queued:
+            if self._slots_free(job["lane"]):
+                return job
+        return None
+
+    def _start(self, job: Dict[str, Any]) -> None:
+        request = job["request"]
+        export_dir = os.path.join(self.exports_dir, job["id"])
+        os.makedirs(export_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(job["normalized_path"]))[0]
+        env = dict(os.environ, KLINEO_EXPORT_DIR=export_dir, KLINEO_OUTPUT_NAME=name)
+        for key, name in OPTION_ENV.items():
+            value = request["options"].get(key)
+            if value:
+                env[name] = "1" if value is True else str(value)
+        if request["options"].get("cache") is False:
+            env["KLINEO_RESULT_CACHE"] = "0"
+        log = open(job["log_path"], "a", encoding="utf-8")
+        proc = subprocess.Popen(
+            ["bash", RUN_SCRIPT, request["strategy"], request["timeframe"], request["pairs"], request["timerange"]],
+            cwd=SCRIPT_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            # Own process group, so cancel reaches Freqtrade as well as bash
+            start_new_session=True,
+        )
+        now = _now()
+        job.update({
+            "state": "running", "stage": "queued", "started_at": now, "stage_started_at": now,
+            "stage_seconds": {}, "attempts": job["attempts"] + 1, "error": None, "pid": proc.pid,
+        })
+        self.procs[job["id"]] = proc
+        self._save(job)
+        threading.Thread(target=self._follow, args=(job, proc, log, export_dir), daemon=True).start()
+
+    def _follow(self, job: Dict[str, Any], proc: subprocess.Popen, log, export_dir: str) -> None:
+        """Read the job's output line by line (to its log), track stages, then record the outcome."""
+        tail: List[str] = []
+        with log:
+            for line in proc.stdout:
+                log.write(line)
+                tail = (tail + [line.rstrip()])[-20:]
+                stage = next((s for marker, s in STAGE_MARKERS.items() if line.startswith(marker)), None)
+                with self.cond:
+                    if stage is not None:
+                        self._enter_stage(job, stage)
+                        self._update_progress(job)
+                        self._save(job)
+                        self._emit(job, "progress")
+                    if "Result cache hit" in line:
+                        job["cached"] = True
+        returncode = proc.wait()
+        shutil.rmtree(export_dir, ignore_errors=True)
+        with self.cond:
+            self.procs.pop(job["id"], None)
+            self._enter_stage(job, None)
+            if self.stopping and not job.get("cancel_requested"):
+                # Scheduler shutdown: requeue, the next start runs it again
+                job.update({"state": "queued", "stage": "queued", "started_at": None, "percent": 0.0, "eta_seconds": None})
+                self._save(job)
+            elif job.get("cancel_requested"):
+                self._finish(job, "cancelled", error="cancelled")
+            elif returncode == 0:
+                if not job.get("cached"):
+                    self.history.record(job["request"], {s: v for s, v in job["stage_seconds"].items() if s in STAGES})
+                self._finish(job, "ok")
+            else:
+                self._finish(job, "failed", error="\n".join(tail) or f"run_backtest.sh exited with code {returncode}", returncode=returncode)
+            self.cond.notify_all()
+
+    def _enter_stage(self, job: Dict[str, Any], stage: Optional[str]) -> None:
+        now = _now()
+        if job["stage"] in STAGES and job["stage_started_at"]:
+            job["stage_seconds"][job["stage"]] = round(now - job["stage_started_at"], 3)
+        if stage is not None:
+            job["stage"] = stage
+            job["stage_started_at"] = now
+
+    def _finish(self, job: Dict[str, Any], state: str, error: Optional[str] = None, returncode: Optional[int] = None) -> None:
+        job.update({
+            "state": state,
+            "stage": "done" if state == "ok" else state,
+            "percent": 100.0 if state == "ok" else job["percent"],
+            "eta_seconds": 0.0,
+            "finished_at": _now(),
+            "error": error,
+        })
+        job.pop("pid", None)
+        if returncode is not None:
+            job["returncode"] = returncode
+        self._save(job)
+        self._emit(job, "finished")
+
+    @staticmethod
+    def _terminate(proc: subprocess.Popen) -> None:
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(proc.pid, signal.SIGTERM)
+
+        def kill_later():
+            time.sleep(CANCEL_GRACE_SECONDS)
+            if proc.poll() is None:
+                with contextlib.suppress(ProcessLookupError, PermissionError):
+                    os.killpg(proc.pid, signal.SIGKILL)
+
+        threading.Thread(target=kill_later, daemon=True).start()
+
+    def run(self) -> None:
+        """Dispatch loop: start jobs while slots are free; refresh running jobs' progress every second."""
+        last_tick = 0.0
+        with self.cond:
+            while not self.stopping:
+                job = self._next_job()
+                while job is not None:
+                    self._start(job)
+                    self._emit(job, "progress")
+                    job = self._next_job()
+                if _now() - last_tick >= PROGRESS_INTERVAL:
+                    last_tick = _now()
+                    for job_id in list(self.procs):
+                        job = self.jobs[job_id]
+                        self._update_progress(job)
+                        self._emit(job, "progress")
+                self.cond.wait(timeout=PROGRESS_INTERVAL)
+
+    def shutdown(self) -> None:
+        """Stop dispatching and interrupt running jobs; they are queued again for the next start."""
+        with self.cond:
+            self.stopping = True
+            procs = list(self.procs.values())
+            self.cond.notify_all()
+        for proc in procs:
+            self._terminate(proc)
+        for proc in procs:
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                proc.wait(timeout=CANCEL_GRACE_SECONDS + 1)
+        # Let the output readers record the requeue
+        deadline = _now() + 2.0
+        while self.procs and _now() < deadline:
+            time.sleep(0.05)
+
+
+# --- Socket server ---
+
+def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in job.items() if k not in ("key", "stage_started_at")}
+
+
+def handle(scheduler: Scheduler, msg: Dict[str, Any], send) -> bool:
+    """Answer one request (streaming events for watch); returns False when the server should stop."""
+    cmd = msg.get("cmd", "submit")
+    response: Dict[str, Any] = {"id": msg.get("id"), "status": "ok"}
+    watch_id = None
+    try:
+        if cmd == "submit":
+            job, dedup = scheduler.submit(msg)
+            response.update({"job": _public(job), "deduplicated": dedup})
+            watch_id = job["id"] if msg.get("watch") else None
+        elif cmd == "watch":
+            watch_id = scheduler.get(msg.get("job"))["id"]
+            response["job"] = _public(scheduler.jobs[watch_id])
+        elif cmd == "cancel":
+            response["job"] = _public(scheduler.cancel(msg.get("job")))
+        elif cmd == "status":
+            response["job"] = _public(scheduler.get(msg.get("job")))
+        elif cmd == "list":
+            with scheduler.cond:
+                response["jobs"] = [_public(j) for j in sorted(scheduler.jobs.values(), key=lambda j: j["submitted_at"])]
+        elif cmd == "stats":
+            response.update(scheduler.stats())
+        elif cmd in ("ping", "shutdown"):
+            pass
+        else:
+            raise SchedulerError(f"unknown cmd: {cmd}")
+    except SchedulerError as e:
+        response.update({"status": "failed", "error": str(e)})
+        watch_id = None
+    send(response)
+    if watch_id is not None:
+        q = scheduler.watch(watch_id)
+        try:
+            while True:
+                event = q.get()
+                send(event)
+                if event["event"] == "finished":
+                    break
+        finally:
+            scheduler.unwatch(watch_id, q)
+    return cmd != "shutdown"
+
+
+def serve_socket(scheduler: Scheduler, path: str) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def send(doc: Dict[str, Any]) -> None:
+                self.wfile.write((json.dumps(doc) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+            for raw_line in self.rfile:
+                line = raw_line.decode("utf-8").strip()
+                if not line:
+                    continue
+                try:
+                    msg = json.loads(line)
+                    if not isinstance(msg, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    send({"status": "failed", "error": str(e)})
+                    continue
+                try:
+                    keep_running = handle(scheduler, msg, send)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                if not keep_running:
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    dispatcher = threading.Thread(target=scheduler.run, daemon=True)
+    dispatcher.start()
+    with Server(path, Handler) as server:
+        print(f"[Klineo Scheduler] Listening on {path} ({scheduler.workers} workers)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            scheduler.shutdown()
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Klineo backtest job scheduler (JSON lines over a Unix socket)")
+    p.add_argument("--socket", default="/tmp/klineo-scheduler.sock", help="Unix socket path")
+    p.add_argument("--workers", type=int, default=None, help="Concurrent jobs (default: CPU count bounded by memory)")
+    p.add_argument("--state-dir", default=STATE_DIR, help="Queue/log directory (default: output/scheduler)")
+    args = p.parse_args()
+
+    scheduler = Scheduler(args.state_dir, args.workers)
+
+    def on_sigterm(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        serve_socket(scheduler, args.socket)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo robustness of a backtest's trade sequence.
+max_drawdown_percent (and, with position sizing, the final return) depends on the order the trades
+happened to close in. Here the closed trades' profit_abs sequence is re-drawn many times and each
+simulated equity curve's max drawdown and final return are collected into percentiles:
+
+- bootstrap (default): draw n trades with replacement, so both drawdown and final return vary.
+- shuffle: permute the n trades, so the final return is fixed and only the path (drawdown) varies.
+
+A batch of simulations is one 2-D matrix (simulations x trades): gather, cumsum and a running max
+along axis 1, with no per-trade Python loop. Batches are sized to CHUNK_ELEMENTS so memory stays
+bounded whatever the trade count, and each batch has its own seed (SeedSequence.spawn), so results
+depend on the seed only, not on how batches are spread over the process pool.
+
+Risk of ruin is the share of simulations whose drawdown reaches --ruin-drawdown (default 50%).
+
+Usage (parse_backtest.py --monte-carlo N runs this on the parsed trades):
+  python3 montecarlo.py output/normalized/KlineoEmaRsiTrend_15m_20240101-20251231.json --simulations 10000
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+METHODS = ("bootstrap", "shuffle")
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+# float64 elements per simulation batch (~32 MB per matrix; a batch holds about three)
+CHUNK_ELEMENTS = 4_000_000
+# Below this many simulated trades in total the pool's start-up costs more than it saves
+POOL_MIN_ELEMENTS = 20_000_000
+
+_pool_pnl: Optional[np.ndarray] = None
+
+
+def simulate(
+    pnl: np.ndarray,
+    start_balance: float,
+    simulations: int,
+    method: str = "bootstrap",
+    seed: Optional[Any] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Max drawdown % and final return % of each of `simulations` re-drawn equity curves (one batch)."""
+    n = pnl.size
+    rng = np.random.default_rng(seed)
+    index_type = np.int32 if n < 2 ** 31 else np.int64
+    if method == "shuffle":
+        # One permutation per row: about twice as fast as Generator.permuted(..., axis=1)
+        idx = np.empty((simulations, n), dtype=index_type)
+        for row in idx:
+            row[:] = rng.permutation(n)
+    else:
+        idx = rng.integers(0, n, size=(simulations, n), dtype=index_type)
+    equity = pnl[idx]
+    del idx
+    return curve_stats(equity, start_balance)
+
+
+def curve_stats(pnl_rows: np.ndarray, start_balance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Max drawdown % and final return % per row of trade profits; pnl_rows is overwritten with equity."""
+    equity = np.cumsum(pnl_rows, axis=1, out=pnl_rows)
+    equity += start_balance
+    final_return = (equity[:, -1] / start_balance - 1.0) * 100.0
+    # Drawdown against the running peak, which starts at the starting balance
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, start_balance, out=peak)
+    np.divide(equity, peak, out=peak)
+    max_dd = (1.0 - peak.min(axis=1)) * 100.0
+    return max_dd, final_return
+
+
+def _init_worker(pnl: np.ndarray) -> None:
+    global _pool_pnl
+    _pool_pnl = pnl
+
+
+def _simulate_batch(start_balance: float, simulations: int, method: str, seed: np.random.SeedSequence):
+    return simulate(_pool_pnl, start_balance, simulations, method, seed)
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    out = {f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    out["mean"] = round(float(values.mean()), 2)
+    return out
+
+
+def run(
+    pnl: Sequence[float],
+    start_balance: float = 10000.0,
+    simulations: int = 10000,
+    method: str = "bootstrap",
+    seed: int = 0,
+    ruin_drawdown: float = 50.0,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Simulate and summarize; pnl is the closed trades' profit_abs in close order. Returns the
+    "monte_carlo" block of the normalized payload.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r} (expected one of {', '.join(METHODS)})")
+    pnl = np.ascontiguousarray(pnl, dtype=np.float64)
+    n = pnl.size
+    summary: Dict[str, Any] = {
+        "simulations": simulations,
+        "method": method,
+        "seed": seed,
+        "trades": n,
+        "start_balance": start_balance,
+        "ruin_drawdown_percent": ruin_drawdown,
+    }
+    if n < 2 or simulations < 1 or start_balance <= 0:
+        return summary
+
+    observed_dd, observed_return = curve_stats(pnl[None, :].copy(), start_balance)
+    batch = max(1, CHUNK_ELEMENTS // n)
+    sizes = [min(batch, simulations - i) for i in range(0, simulations, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers > 1 and len(sizes) > 1 and simulations * n >= POOL_MIN_ELEMENTS:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)), initializer=_init_worker, initargs=(pnl,)) as pool:
+            results = list(pool.map(_simulate_batch, [start_balance] * len(sizes), sizes, [method] * len(sizes), seeds))
+    else:
+        results = [simulate(pnl, start_balance, size, method, s) for size, s in zip(sizes, seeds)]
+    max_dd = np.concatenate([r[0] for r in results])
+    final_return = np.concatenate([r[1] for r in results])
+
+    summary.update({
+        "observed": {"max_drawdown_percent": round(float(observed_dd[0]), 2), "final_return_percent": round(float(observed_return[0]), 2)},
+        "max_drawdown_percent": _percentiles(max_dd),
+        "final_return_percent": _percentiles(final_return),
+        "risk_of_ruin_percent": round(float((max_dd >= ruin_drawdown).mean() * 100.0), 2),
+        "probability_of_loss_percent": round(float((final_return < 0).mean() * 100.0), 2),
+    })
+    return summary
+
+
+def trade_pnl(trades: Sequence[dict]) -> np.ndarray:
+    """profit_abs of the closed trades of a normalized payload, in close order."""
+    closed = sorted((t for t in trades if t.get("close_time")), key=lambda t: t["close_time"])
+    return np.fromiter((float(t.get("profit_abs") or 0.0) for t in closed), dtype=np.float64, count=len(closed))
+
+
+def main():
+    import columnar_output
+
+    p = argparse.ArgumentParser(description="Monte Carlo drawdown/return percentiles of a normalized result's trades")
+    p.add_argument("normalized", help="Normalized output (.json / .kcol, optionally compressed)")
+    p.add_argument("--simulations", type=int, default=10000)
+    p.add_argument("--method", choices=METHODS, default="bootstrap")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--ruin-drawdown", type=float, default=50.0, help="Drawdown %% counted as ruin (default 50)")
+    p.add_argument("--start-balance", type=float, default=None, help="Default: the recorded wallet, else the first tv_equity value")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size (default: CPU count)")
+    p.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = p.parse_args()
+
+    payload = columnar_output.load(args.normalized)
+    balance = args.start_balance
+    if balance is None:
+        # The wallet recorded by an earlier --monte-carlo / --portfolio parse, else tv_equity's base
+        recorded = [payload[key].get("start_balance") for key in ("monte_carlo", "portfolio") if isinstance(payload.get(key), dict)]
+        equity = payload.get("tv_equity") or []
+        balance = next((float(b) for b in recorded if b), float(equity[0]["value"]) if equity else 10000.0)
+    summary = run(
+        trade_pnl(payload.get("trades") or []), balance, args.simulations, args.method, args.seed,
+        args.ruin_drawdown, args.workers,
+    )
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"[Klineo Monte Carlo] {summary['simulations']} {summary['method']} simulations over {summary['trades']} trades")
+    if "observed" not in summary:
+        print("Not enough closed trades")
+        return
+    for key in ("max_drawdown_percent", "final_return_percent"):
+        row = "  ".join(f"{name}={value}" for name, value in summary[key].items())
+        print(f"  {key}: observed={summary['observed'][key]}  {row}")
+    print(f"  risk_of_ruin_percent={summary['risk_of_ruin_percent']} (drawdown >= {summary['ruin_drawdown_percent']}%)"
+          f"  probability_of_loss_percent={summary['probability_of_loss_percent']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Columnar OHLCV loader for Freqtrade data files.
+Decodes BTC_USDT-15m.json / .json.gz (and .feather / .parquet when pandas is installed)
+straight into contiguous int64/float64 column arrays; dicts are only built by to_tv().
+"""
+
+import json
+import os
+import struct
+import tempfile
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import gzip
+except ImportError:
+    gzip = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+OHLCV_EXTENSIONS = (".json", ".json.gz", ".feather", ".parquet")
+_STRIP_BRACKETS = {ord("["): None, ord("]"): None}
+
+# Binary column file: 64-byte header (magic, rows), then time int64[rows] followed by
+# open/high/low/close/volume float64[rows]. Used by candle_cache and candle_store.
+COLUMNS_SUFFIX = ".ohlcv"
+_COLUMNS_HEADER = struct.Struct("<8sQ")
+_COLUMNS_MAGIC = b"KLNOHLC1"
+_COLUMNS_HEADER_SIZE = 64
+
+
+class OhlcvColumns:
+    """One pair/timeframe of candles as column arrays (time in Unix seconds)."""
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = np.ascontiguousarray(time, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+    @classmethod
+    def empty(cls) -> "OhlcvColumns":
+        z = np.zeros(0)
+        return cls(z, z, z, z, z, z)
+
+    @classmethod
+    def from_matrix(cls, m: np.ndarray) -> "OhlcvColumns":
+        """Build from an (n, 6) array of [date, open, high, low, close, volume] rows."""
+        return cls(to_unix_seconds(m[:, 0]), m[:, 1], m[:, 2], m[:, 3], m[:, 4], m[:, 5])
+
+    def slice(self, lo: int, hi: int) -> "OhlcvColumns":
+        """Rows [lo, hi) as views on the same buffers."""
+        return OhlcvColumns(*(a[lo:hi] for a in (self.time, self.open, self.high, self.low, self.close, self.volume)))
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> "OhlcvColumns":
+        """Candles with start <= time <= end (either bound optional), via binary search on time."""
+        lo = 0 if start is None else int(np.searchsorted(self.time, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.time, end, side="right"))
+        return self.slice(lo, max(lo, hi))
+
+    def to_tv(self) -> List[Dict[str, Any]]:
+        """TradingView CandlestickSeries rows; the only place per-candle dicts are allocated."""
+        return [
+            {"time": t, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+            for t, o, h, lo, c, v in zip(
+                self.time.tolist(),
+                self.open.tolist(),
+                self.high.tolist(),
+                self.low.tolist(),
+                self.close.tolist(),
+                self.volume.tolist(),
+            )
+        ]
+
+
+def to_unix_seconds(ts: np.ndarray) -> np.ndarray:
+    """Epoch values to int64 seconds; values above 1e10 are treated as milliseconds."""
+    ts = np.asarray(ts, dtype=np.float64)
+    return np.where(ts > 1e10, ts // 1000, ts).astype(np.int64)
+
+
+def iso_to_unix_seconds(values: List[str]) -> np.ndarray:
+    """Vectorized ISO-8601 parse (UTC 'Z' / '+00:00' suffixes accepted)."""
+    cleaned = [v[:-1] if v.endswith("Z") else (v[:-6] if v.endswith("+00:00") else v) for v in values]
+    return np.array(cleaned, dtype="datetime64[s]").astype(np.int64)
+
+
+def ohlcv_path(data_dir: str, pair: str, timeframe: str, exchange: str = "binance") -> Optional[str]:
+    """Path of the first existing Freqtrade data file for pair/timeframe, e.g. binance/BTC_USDT-15m.json."""
+    if not data_dir or not os.path.isdir(data_dir):
+        return None
+    base = os.path.join(data_dir, exchange, f"{pair.replace('/', '_')}-{timeframe}")
+    for ext in OHLCV_EXTENSIONS:
+        if os.path.isfile(base + ext):
+            return base + ext
+    return None
+
+
+def _columns_from_json_text(text: str) -> Optional[OhlcvColumns]:
+    """
+    Fast path for Freqtrade's native [[ms, o, h, l, c, v], ...] layout: strip the brackets and let
+    NumPy parse the numbers in C. Returns None when the text is not a plain numeric matrix.
+    """
+    head = text.lstrip()[:2]
+    if head != "[[":
+        return None
+    rows = text.count("[") - 1
+    if rows <= 0:
+        return OhlcvColumns.empty()
+    try:
+        with warnings.catch_warnings():
+            # Non-numeric tokens (null, strings) end the parse early with a DeprecationWarning
+            warnings.simplefilter("ignore", DeprecationWarning)
+            flat = np.fromstring(text.translate(_STRIP_BRACKETS), dtype=np.float64, sep=",")
+    except ValueError:
+        return None
+    if flat.size != rows * 6:
+        return None
+    return OhlcvColumns.from_matrix(flat.reshape(rows, 6))
+
+
+def columns_from_rows(data: Any) -> OhlcvColumns:
+    """Columns from decoded candle rows (list rows or dict rows, epoch or ISO timestamps)."""
+    if not isinstance(data, list) or not data:
+        return OhlcvColumns.empty()
+    first = data[0]
+    if isinstance(first, (list, tuple)):
+        try:
+            m = np.array(data, dtype=np.float64)
+            if m.ndim == 2 and m.shape[1] >= 6:
+                return OhlcvColumns.from_matrix(m)
+        except (TypeError, ValueError):
+            pass
+        rows = [r for r in data if isinstance(r, (list, tuple)) and len(r) >= 6]
+        if not rows:
+            return OhlcvColumns.empty()
+        return OhlcvColumns.from_matrix(np.array([r[:6] for r in rows], dtype=np.float64))
+
+    rows = [r for r in data if isinstance(r, dict)]
+    if not rows:
+        return OhlcvColumns.empty()
+    raw_t = [r.get("date") or r.get("time") or r.get(0) for r in rows]
+    if all(isinstance(t, (int, float)) for t in raw_t):
+        time = to_unix_seconds(np.array(raw_t, dtype=np.float64))
+    elif all(isinstance(t, str) for t in raw_t):
+        try:
+            time = iso_to_unix_seconds(raw_t)
+        except ValueError:
+            time = _mixed_to_unix_seconds(raw_t)
+    else:
+        time = _mixed_to_unix_seconds(raw_t)
+    cols = [np.fromiter((float(r.get(k, 0)) for r in rows), dtype=np.float64, count=len(rows))
+            for k in ("open", "high", "low", "close", "volume")]
+    return OhlcvColumns(time, *cols)
+
+
+def _mixed_to_unix_seconds(values: List[Any]) -> np.ndarray:
+    """Slow path for heterogeneous timestamp columns; unparseable values become 0."""
+    out = np.zeros(len(values), dtype=np.int64)
+    for i, t in enumerate(values):
+        if isinstance(t, (int, float)):
+            out[i] = int(t) // 1000 if t > 1e10 else int(t)
+        elif isinstance(t, str):
+            try:
+                out[i] = iso_to_unix_seconds([t])[0]
+            except ValueError:
+                pass
+    return out
+
+
+def _columns_from_frame(df: Any) -> OhlcvColumns:
+    date = pd.to_datetime(df["date"], utc=True).dt.tz_localize(None)
+    time = date.to_numpy().astype("datetime64[s]").astype(np.int64)
+    return OhlcvColumns(time, *(df[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close", "volume")))
+
+
+def load_ohlcv_file(path: str) -> Optional[OhlcvColumns]:
+    """Decode one Freqtrade OHLCV file into columns; None if the format is unsupported."""
+    if path.endswith((".feather", ".parquet")):
+        if pd is None:
+            return None
+        df = pd.read_feather(path) if path.endswith(".feather") else pd.read_parquet(path)
+        return _columns_from_frame(df)
+    if path.endswith(".json.gz"):
+        if not gzip:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    cols = _columns_from_json_text(text)
+    if cols is not None:
+        return cols
+    data = json.loads(text)
+    if isinstance(data, dict) and "data" in data:
+        data = data["data"]
+    return columns_from_rows(data)
+
+
+def save_columns(path: str, cols: OhlcvColumns) -> None:
+    """Write columns atomically (temp file + rename) so concurrent readers never see a partial file."""
+    n = len(cols)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_COLUMNS_HEADER.pack(_COLUMNS_MAGIC, n).ljust(_COLUMNS_HEADER_SIZE, b"\0"))
+            for arr in (cols.time, cols.open, cols.high, cols.low, cols.close, cols.volume):
+                f.write(np.ascontiguousarray(arr).tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def mmap_columns(path: str) -> OhlcvColumns:
+    """Memory-map a column file; the returned arrays are views on the file (no copy)."""
+    with open(path, "rb") as f:
+        magic, n = _COLUMNS_HEADER.unpack(f.read(_COLUMNS_HEADER.size))
+    if magic != _COLUMNS_MAGIC or os.path.getsize(path) != _COLUMNS_HEADER_SIZE + 6 * 8 * n:
+        raise ValueError(f"Corrupt OHLCV column file: {path}")
+    if n == 0:
+        return OhlcvColumns.empty()
+    mm = np.memmap(path, dtype=np.uint8, mode="r", offset=_COLUMNS_HEADER_SIZE, shape=(6 * 8 * n,))
+    cols = [mm[i * 8 * n:(i + 1) * 8 * n] for i in range(6)]
+    return OhlcvColumns(cols[0].view(np.int64), *(c.view(np.float64) for c in cols[1:]))
+
+
+def load_ohlcv_columns(data_dir: str, pair: str, timeframe: str, exchange: str = "binance") -> Optional[OhlcvColumns]:
+    path = ohlcv_path(data_dir, pair, timeframe, exchange)
+    if not path:
+        return None
+    return load_ohlcv_file(path)
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Vectorized parameter-grid screening for the Klineo strategies.
+Entry/exit signals for a whole grid of thresholds are evaluated at once with NumPy broadcasting
+((combos, candles) boolean matrices), and trades are simulated for every (signals, ROI ladder,
+stoploss) combination together: one vectorized step per trade, with ROI and stoploss hits found by
+binary search over range-min/max tables. The grid is ranked by approximate return and drawdown in
+seconds, so only the top candidates need a full Freqtrade backtest.
+
+Approximate: one position per pair, entries at the next candle's open, ROI/stoploss checked against
+candle high/low (stoploss first), exit signals at the next open, fees from config.json. Trailing
+stops, protections and the max_open_trades slot limit across pairs are not simulated.
+
+Usage:
+  python3 param_screen.py KlineoBollingerRevert --pairs BTC/USDT --timerange 20240101-20251231
+  python3 param_screen.py KlineoDonchianAtrBreakout --pairs BTC/USDT,ETH/USDT --timerange 20240101-20251231 \\
+    --grid donch_window=10,20,30,55 --stoploss=-0.05,-0.1 --roi '{"0": 0.04, "120": 0.015, "360": 0}'
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import batch_backtest
+import candle_cache
+import ta_numpy
+from downsample import timeframe_seconds
+from ohlcv_columns import OhlcvColumns
+from result_cache import timerange_bounds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_SCREEN = os.path.join(SCRIPT_DIR, "output", "screen")
+DATA_DIR = os.path.join(SCRIPT_DIR, "freqtrade", "user_data", "data")
+CONFIG = os.path.join(SCRIPT_DIR, "freqtrade", "user_data", "config.json")
+CANDLE_CACHE = os.environ.get("KLINEO_CANDLE_CACHE_DIR", os.path.join(SCRIPT_DIR, "output", "cache", "candles"))
+# Cells per (combos, candles) signal matrix; larger grids are screened in chunks of signal combos
+CHUNK_CELLS = 4_000_000
+# Candle windows after an entry searched directly for ROI/stoploss hits before the range tables
+PROBES = (32, 1024)
+RANKINGS = ("ratio", "return", "drawdown")
+
+_ROI_RE = re.compile(r"^\s+minimal_roi\s*=\s*(\{[^}]*\})", re.MULTILINE)
+_STOPLOSS_RE = re.compile(r"^\s+stoploss\s*=\s*(-?[0-9.]+)", re.MULTILINE)
+_TRAILING_RE = re.compile(r"^\s+(trailing_[a-z_]+)\s*=\s*(True|False|None|-?[0-9.]+)", re.MULTILINE)
+
+
+# --- Indicators ---
+
+class Candles:
+    """One pair's candles with memoized indicators; stack() builds (combos, candles) rows per parameter."""
+
+    def __init__(self, cols: OhlcvColumns):
+        self.time = np.asarray(cols.time)
+        self.open = np.asarray(cols.open)
+        self.high = np.asarray(cols.high)
+        self.low = np.asarray(cols.low)
+        self.close = np.asarray(cols.close)
+        self.volume = np.asarray(cols.volume)
+        self._memo: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+    def get(self, name: str, period: Any = None) -> np.ndarray:
+        key = (name, period)
+        if key not in self._memo:
+            self._memo[key] = INDICATORS[name](self, period)
+        return self._memo[key]
+
+    def stack(self, name: str, periods: np.ndarray) -> np.ndarray:
+        """Indicator row per combo for a (combos, 1) parameter column; each distinct period is computed once."""
+        values, inverse = np.unique(periods.ravel(), return_inverse=True)
+        rows = np.stack([self.get(name, int(v)) for v in values.tolist()])
+        return rows[inverse]
+
+
+INDICATORS: Dict[str, Callable[[Candles, Any], np.ndarray]] = {
+    "ema": lambda c, n: ta_numpy.ema(c.close, n),
+    "rsi": lambda c, n: ta_numpy.rsi(c.close, n),
+    "atr": lambda c, n: ta_numpy.atr(c.high, c.low, c.close, n),
+    "sma": lambda c, n: ta_numpy.sma(c.close, n),
+    "std": lambda c, n: ta_numpy.rolling_std(c.close, n),
+    "high_max": lambda c, n: ta_numpy.rolling_max(c.high, n),
+    "low_min": lambda c, n: ta_numpy.rolling_min(c.low, n),
+    "volume_sma": lambda c, n: ta_numpy.sma(c.volume, n),
+    "vwap": lambda c, _: ta_numpy.vwap(c.high, c.low, c.close, c.volume),
+}
+
+
+def shift(a: np.ndarray) -> np.ndarray:
+    """Previous candle's value along the last axis (pandas shift(1))."""
+    out = np.empty(a.shape, dtype=np.float64)
+    out[..., 0] = np.nan
+    out[..., 1:] = a[..., :-1]
+    return out
+
+
+# --- Strategy grids (same rules as the strategy files; "params" are the values the files use) ---
+
+def _benchmark_entry(c: Candles, p):
+    rsi = c.get("rsi", 14)
+    trend_up = c.get("ema", 50) > c.get("ema", 200)
+    vol_ok = c.volume > c.get("volume_sma", 20)
+    return trend_up & vol_ok & (rsi >= p["rsi_low"]) & (rsi <= p["rsi_high"])
+
+
+def _benchmark_exit(c: Candles, p):
+    return (c.get("rsi", 14) < p["rsi_exit"]) | (c.get("ema", 50) < c.get("ema", 200))
+
+
+def _ema_rsi_entry(c: Candles, p):
+    fast, slow = c.stack("ema", p["ema_fast"]), c.stack("ema", p["ema_slow"])
+    cross_above = (fast > slow) & (shift(fast) <= shift(slow))
+    return cross_above & (c.get("rsi", 14) > p["rsi_entry"]) & (c.volume > c.get("volume_sma", 20))
+
+
+def _ema_rsi_exit(c: Candles, p):
+    fast, slow = c.stack("ema", p["ema_fast"]), c.stack("ema", p["ema_slow"])
+    cross_below = (fast < slow) & (shift(fast) >= shift(slow))
+    return cross_below | (c.get("rsi", 14) < p["rsi_exit"])
+
+
+def _donchian_entry(c: Candles, p):
+    return c.close > shift(c.stack("high_max", p["donch_window"]))
+
+
+def _donchian_exit(c: Candles, p):
+    return c.close < shift(c.stack("low_min", p["exit_window"]))
+
+
+def _momentum_entry(c: Candles, p):
+    break_out = c.close > shift(c.stack("high_max", p["donch_window"]))
+    return break_out & (c.volume > c.stack("volume_sma", p["volume_window"]))
+
+
+def _momentum_exit(c: Candles, p):
+    inside_channel = c.close < c.stack("high_max", p["donch_window"])
+    return inside_channel | (c.close < shift(c.stack("low_min", p["donch_window"])))
+
+
+def _bollinger_entry(c: Candles, p):
+    lower = c.stack("sma", p["bb_period"]) - p["bb_dev"] * c.stack("std", p["bb_period"])
+    return (c.close < lower) & (c.get("rsi", 14) < p["rsi_entry"])
+
+
+def _bollinger_exit(c: Candles, p):
+    return (c.close > c.stack("sma", p["bb_period"])) | (c.get("rsi", 14) > p["rsi_exit"])
+
+
+def _range_entry(c: Candles, p):
+    return _bollinger_entry(c, p) & (c.close < c.get("vwap"))
+
+
+def _range_exit(c: Candles, p):
+    return (c.close >= c.stack("sma", p["bb_period"])) | (c.get("rsi", 14) > p["rsi_exit"])
+
+
+def _risk_entry(c: Candles, p):
+    rsi = c.get("rsi", 14)
+    return (c.close > c.stack("ema", p["ema_period"])) & (rsi >= p["rsi_low"]) & (rsi <= p["rsi_high"])
+
+
+def _risk_exit(c: Candles, p):
+    return c.get("rsi", 14) < p["rsi_exit"]
+
+
+_BB_GRID = {"bb_period": [14, 20, 30], "bb_dev": [1.5, 2.0, 2.5, 3.0], "rsi_entry": [25, 30, 35], "rsi_exit": [50, 55, 60]}
+_BB_PARAMS = {"bb_period": 20, "bb_dev": 2.0, "rsi_entry": 30, "rsi_exit": 55}
+
+SPECS: Dict[str, Dict[str, Any]] = {
+    "KlineoBenchmarkTrend": {
+        "grid": {"rsi_low": [45, 50, 55], "rsi_high": [60, 65, 70, 75], "rsi_exit": [40, 45, 50]},
+        "params": {"rsi_low": 50, "rsi_high": 65, "rsi_exit": 45},
+        "entry": _benchmark_entry,
+        "exit": _benchmark_exit,
+    },
+    "KlineoEmaRsiTrend": {
+        "grid": {"ema_fast": [9, 12, 21], "ema_slow": [34, 55, 89], "rsi_entry": [48, 52, 56], "rsi_exit": [40, 45, 50]},
+        "params": {"ema_fast": 21, "ema_slow": 55, "rsi_entry": 52, "rsi_exit": 45},
+        "entry": _ema_rsi_entry,
+        "exit": _ema_rsi_exit,
+    },
+    "KlineoDonchianAtrBreakout": {
+        "grid": {"donch_window": [10, 15, 20, 30, 40, 55], "exit_window": [10, 20, 30]},
+        "params": {"donch_window": 20, "exit_window": 20},
+        "entry": _donchian_entry,
+        "exit": _donchian_exit,
+    },
+    "KlineoMomentumBreakout": {
+        "grid": {"donch_window": [10, 15, 20, 30, 40, 55], "volume_window": [10, 20, 50]},
+        "params": {"donch_window": 20, "volume_window": 20},
+        "entry": _momentum_entry,
+        "exit": _momentum_exit,
+    },
+    "KlineoBollingerRevert": {"grid": _BB_GRID, "params": _BB_PARAMS, "entry": _bollinger_entry, "exit": _bollinger_exit},
+    "KlineoRangeRevert": {"grid": _BB_GRID, "params": _BB_PARAMS, "entry": _range_entry, "exit": _range_exit},
+    "KlineoRiskManaged": {
+        "grid": {"ema_period": [50, 100, 200], "rsi_low": [45, 50, 55], "rsi_high": [60, 65], "rsi_exit": [44, 48, 52]},
+        "params": {"ema_period": 100, "rsi_low": 50, "rsi_high": 60, "rsi_exit": 48},
+        "entry": _risk_entry,
+        "exit": _risk_exit,
+    },
+}
+
+
+def strategy_defaults(strategy: str) -> Dict[str, Any]:
+    """timeframe, startup_candle_count, minimal_roi, stoploss and trailing_* settings declared in the strategy file."""
+    path = os.path.join(batch_backtest.STRATEGIES_DIR, f"{strategy}.py")
+    text = open(path, encoding="utf-8").read() if os.path.isfile(path) else ""
+    roi = _ROI_RE.search(text)
+    sl = _STOPLOSS_RE.search(text)
+    return {
+        "timeframe": batch_backtest.strategy_timeframes().get(strategy, "15m"),
+        "startup": batch_backtest.strategy_startup_candles(strategy),
+        "minimal_roi": ast.literal_eval(roi.group(1)) if roi else {"0": 0.1},
+        "stoploss": float(sl.group(1)) if sl else -0.1,
+        "trailing": {name: ast.literal_eval(value) for name, value in _TRAILING_RE.findall(text)},
+    }
+
+
+# --- Simulation ---
+
+class RangeMin:
+    """Sparse table answering "first index >= start whose value <= limit" for many queries at once."""
+
+    def __init__(self, values: np.ndarray):
+        self.n = int(values.size)
+        self.levels = [np.asarray(values, dtype=np.float64)]
+        while (1 << len(self.levels)) <= self.n:
+            prev = self.levels[-1]
+            half = 1 << (len(self.levels) - 1)
+            self.levels.append(np.minimum(prev[:-half], prev[half:]))
+
+    def first_le(self, start: np.ndarray, limit: np.ndarray) -> np.ndarray:
+        """Per query, the first index >= start with value <= limit (n when there is none)."""
+        pos = np.array(start, dtype=np.int64)
+        for k in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[k]
+            step = 1 << k
+            # Skip the block [pos, pos + step) when all of it stays above the limit
+            block_min = level[np.minimum(pos, level.size - 1)]
+            pos += np.where((pos + step <= self.n) & (block_min > limit), step, 0)
+        return pos
+
+
+def next_true(mask: np.ndarray) -> np.ndarray:
+    """(rows, n + 1) index of the first True at or after each column (n when none)."""
+    rows, n = mask.shape
+    idx = np.where(mask, np.arange(n, dtype=np.int32), np.int32(n))
+    out = np.full((rows, n + 1), n, dtype=np.int32)
+    out[:, :n] = np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1]
+    return out
+
+
+def roi_steps(minimal_roi: Dict[str, float], tf_seconds: int) -> List[Tuple[int, float]]:
+    """minimal_roi {"minutes": ratio} -> [(first candle after entry, ratio)] sorted by candle."""
+    steps = sorted((int(math.ceil(int(k) * 60 / tf_seconds)), float(v)) for k, v in minimal_roi.items())
+    return steps or [(0, 10.0)]
+
+
+def _probe(window: np.ndarray, starts: np.ndarray, hit: Callable[[np.ndarray], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(found, offset of the first hit) in the candles window[start] = start .. start + width - 1."""
+    mask = hit(window[starts])
+    return mask.any(axis=1), mask.argmax(axis=1)
+
+
+def simulate(
+    c: Candles,
+    entry: np.ndarray,
+    exit_: np.ndarray,
+    combos: Dict[str, np.ndarray],
+    ladders: List[List[Tuple[int, float]]],
+    first_index: int,
+    fee: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trades of every full combo on one pair: (combo ids, exit times, net profit ratios).
+    combos maps each full combo to its signal row ("signal"), ROI ladder ("ladder") and "stoploss".
+    ROI/stoploss hits are looked up in growing windows after the entry (most trades end in the first)
+    and through the range tables beyond the last; only hits before the exit signal are searched for.
+    """
+    n = len(c)
+    next_entry = next_true(entry)
+    next_exit = next_true(exit_)
+    lows = RangeMin(c.low)
+    highs = RangeMin(-c.high)
+    fee_in, fee_out = 1.0 + fee, 1.0 - fee
+    roi_fee = fee_in / fee_out
+    probes = []
+    for width in PROBES:
+        # Row s = candles s .. s + width - 1, padded so that nothing past the end is hit
+        low_win = sliding_window_view(np.concatenate((c.low, np.full(width, np.inf))), width)
+        high_win = sliding_window_view(np.concatenate((c.high, np.full(width, -np.inf))), width)
+        # ROI ratio in force at each candle offset, per ladder (inf = no ROI yet)
+        roi = np.full((len(ladders), width), np.inf)
+        for li, steps in enumerate(ladders):
+            for a, ratio in steps:
+                if a < width:
+                    roi[li, a:] = ratio
+        probes.append((width, low_win, high_win, roi))
+    widest = PROBES[-1]
+
+    ids = np.arange(combos["signal"].size)
+    pos = np.full(ids.size, max(first_index - 1, 0), dtype=np.int64)
+    out_ids, out_time, out_ret = [], [], []
+    # One iteration per trade; every live combo advances together
+    while ids.size:
+        e = next_entry[combos["signal"][ids], pos].astype(np.int64)
+        live = e < n - 1
+        ids, e = ids[live], e[live]
+        if not ids.size:
+            break
+        s = e + 1
+        price = c.open[s]
+        ladder = combos["ladder"][ids]
+        stop_price = price * (1.0 + combos["stoploss"][ids])
+        # Exit signal first: ROI/stoploss hits after it do not matter, which bounds the searches
+        j_sig = next_exit[combos["signal"][ids], s].astype(np.int64) + 1
+
+        j_stop = np.full(ids.size, n, dtype=np.int64)
+        j_roi = np.full(ids.size, n, dtype=np.int64)
+        roi_price = np.zeros(ids.size)
+        stop_todo = roi_todo = np.arange(ids.size)
+        for width, low_win, high_win, roi in probes:
+            if stop_todo.size:
+                found, off = _probe(low_win, s[stop_todo], lambda w: w <= stop_price[stop_todo, None])
+                j_stop[stop_todo[found]] = s[stop_todo[found]] + off[found]
+                stop_todo = stop_todo[~found]
+                stop_todo = stop_todo[j_sig[stop_todo] > s[stop_todo] + width]
+            if roi_todo.size:
+                targets = price[roi_todo, None] * (1.0 + roi[ladder[roi_todo]]) * roi_fee
+                found, off = _probe(high_win, s[roi_todo], lambda w: w >= targets)
+                j_roi[roi_todo[found]] = s[roi_todo[found]] + off[found]
+                roi_price[roi_todo[found]] = np.take_along_axis(targets[found], off[found, None], axis=1)[:, 0]
+                roi_todo = roi_todo[~found]
+                roi_todo = roi_todo[j_sig[roi_todo] > s[roi_todo] + width]
+        # Rare: still open beyond the widest window and before any exit signal
+        if stop_todo.size:
+            j_stop[stop_todo] = lows.first_le(s[stop_todo] + widest, stop_price[stop_todo])
+        for li, steps in enumerate(ladders):
+            far = roi_todo[ladder[roi_todo] == li]
+            if not far.size:
+                continue
+            sf, best_j, best_px = s[far], j_roi[far], roi_price[far]
+            for k, (a, ratio) in enumerate(steps):
+                end = sf + steps[k + 1][0] if k + 1 < len(steps) else np.full(sf.size, n)
+                # Rate at which the net profit (after both fees) reaches the ROI ratio
+                target = price[far] * (1.0 + ratio) * roi_fee
+                j = highs.first_le(sf + max(a, widest), -target)
+                hit = (j < end) & (j < best_j)
+                best_j = np.where(hit, j, best_j)
+                best_px = np.where(hit, target, best_px)
+            j_roi[far], roi_price[far] = best_j, best_px
+
+        j = np.minimum(np.minimum(j_sig, j_stop), j_roi)
+        forced = j >= n
+        jc = np.minimum(j, n - 1)
+        later = jc > s
+        exit_price = np.where(
+            j == j_sig,
+            c.open[jc],
+            np.where(
+                j == j_stop,
+                np.where(later, np.minimum(stop_price, c.open[jc]), stop_price),
+                np.where(later, np.maximum(roi_price, c.open[jc]), roi_price),
+            ),
+        )
+        exit_price = np.where(forced, c.close[n - 1], exit_price)
+
+        out_ids.append(ids)
+        out_time.append(c.time[jc])
+        out_ret.append(exit_price * fee_out / (price * fee_in) - 1.0)
+        ids, pos = ids[~forced], jc[~forced]
+
+    if not out_ids:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty
+    return np.concatenate(out_ids), np.concatenate(out_time), np.concatenate(out_ret)
+
+
+def combo_metrics(count: int, ids: np.ndarray, times: np.ndarray, rets: np.ndarray, stake_fraction: float) -> Dict[str, np.ndarray]:
+    """Per-combo trades, win rate, compounded return and trade-close max drawdown."""
+    order = np.lexsort((times, ids))
+    ids, rets = ids[order], rets[order]
+    trades = np.bincount(ids, minlength=count)
+    wins = np.bincount(ids, weights=rets > 0, minlength=count)
+    gross_win = np.bincount(ids, weights=np.maximum(rets, 0.0), minlength=count)
+    gross_loss = np.bincount(ids, weights=np.maximum(-rets, 0.0), minlength=count)
+    log_growth = np.log1p(np.maximum(stake_fraction * rets, -0.999999))
+    total = np.bincount(ids, weights=log_growth, minlength=count)
+
+    # Equity per combo as (combos, max trades) rows; NaN padding is ignored by fmax
+    width = int(trades.max()) if trades.size and trades.max() > 0 else 0
+    max_dd = np.zeros(count)
+    if width:
+        starts = np.concatenate(([0], np.cumsum(trades)[:-1]))
+        col = np.arange(ids.size) - np.repeat(starts, trades)
+        curve = np.full((count, width), np.nan)
+        curve[ids, col] = log_growth
+        curve = np.nancumsum(curve, axis=1) + np.where(np.isnan(curve), np.nan, 0.0)
+        peak = np.fmax(np.fmax.accumulate(curve, axis=1), 0.0)
+        with np.errstate(invalid="ignore"):
+            dd = 1.0 - np.exp(curve - peak)
+        max_dd = np.nan_to_num(np.nanmax(np.where(np.isnan(dd), -np.inf, dd), axis=1), neginf=0.0)
+        max_dd = np.maximum(max_dd, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(trades > 0, wins / trades * 100.0, 0.0)
+        profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, np.nan)
+        avg = np.where(trades > 0, (gross_win - gross_loss) / trades * 100.0, 0.0)
+    return {
+        "trades": trades,
+        "win_rate": win_rate,
+        "return_percent": np.expm1(total) * 100.0,
+        "max_drawdown_percent": max_dd * 100.0,
+        "profit_factor": profit_factor,
+        "avg_profit_percent": avg,
+    }
+
+
+# --- Screening ---
+
+def load_candles(pairs: Sequence[str], timeframe: str, timerange: str, startup: int, data_dir: str) -> Dict[str, Tuple[Candles, int]]:
+    """pair -> (candles including the startup warm-up, index of the first candle in the timerange)."""
+    start, end = timerange_bounds(timerange)
+    warmup = startup * timeframe_seconds(timeframe)
+    out = {}
+    for pair in pairs:
+        cols = candle_cache.load_columns(data_dir, pair, timeframe, CANDLE_CACHE)
+        if cols is None or not len(cols):
+            print(f"Warning: no {timeframe} candles for {pair} in {data_dir}", file=sys.stderr)
+            continue
+        cols = cols.window(start - warmup if start is not None else None, end)
+        first = int(np.searchsorted(cols.time, start, side="left")) if start is not None else 0
+        if len(cols) > first + 1:
+            out[pair] = (Candles(cols), first)
+    return out
+
+
+def screen(
+    strategy: str,
+    pairs: Sequence[str],
+    timerange: str,
+    grid: Dict[str, List[float]],
+    rois: List[Dict[str, float]],
+    stoplosses: List[float],
+    fee: float,
+    stake_fraction: float,
+    data_dir: str = DATA_DIR,
+) -> List[Dict[str, Any]]:
+    spec = SPECS[strategy]
+    defaults = strategy_defaults(strategy)
+    timeframe = defaults["timeframe"]
+    tf_seconds = timeframe_seconds(timeframe)
+    candles = load_candles(pairs, timeframe, timerange, defaults["startup"], data_dir)
+    if not candles:
+        raise SystemExit(f"Error: no candles for {', '.join(pairs)} {timeframe} in {timerange}")
+
+    names = list(grid)
+    signal_combos = np.array(list(itertools.product(*(grid[k] for k in names))), dtype=np.float64).reshape(-1, len(names))
+    ladders = [roi_steps(r, tf_seconds) for r in rois]
+    per_signal = len(ladders) * len(stoplosses)
+    longest = max(len(c) for c, _ in candles.values())
+    chunk = max(1, CHUNK_CELLS // longest)
+
+    results: List[Dict[str, Any]] = []
+    for lo in range(0, len(signal_combos), chunk):
+        block = signal_combos[lo:lo + chunk]
+        params = {k: block[:, i:i + 1] for i, k in enumerate(names)}
+        full = np.arange(len(block) * per_signal)
+        combos = {
+            "signal": full // per_signal,
+            "ladder": (full // len(stoplosses)) % len(ladders),
+            "stoploss": np.asarray(stoplosses, dtype=np.float64)[full % len(stoplosses)],
+        }
+        ids, times, rets = [], [], []
+        for c, first in candles.values():
+            shape = (len(block), len(c))
+            entry = np.broadcast_to(spec["entry"](c, params), shape)
+            # Freqtrade ignores an exit signal on a candle that also signals an entry
+            exit_ = np.broadcast_to(spec["exit"](c, params), shape) & ~entry
+            i, t, r = simulate(c, entry, exit_, combos, ladders, first, fee)
+            ids.append(i)
+            times.append(t)
+            rets.append(r)
+        m = combo_metrics(full.size, np.concatenate(ids), np.concatenate(times), np.concatenate(rets), stake_fraction)
+        for f in range(full.size):
+            row = block[combos["signal"][f]]
+            entry_params = {k: (int(v) if float(v).is_integer() else float(v)) for k, v in zip(names, row.tolist())}
+            pf = float(m["profit_factor"][f])
+            results.append({
+                "params": entry_params,
+                "minimal_roi": rois[combos["ladder"][f]],
+                "stoploss": float(combos["stoploss"][f]),
+                "trades": int(m["trades"][f]),
+                "win_rate": round(float(m["win_rate"][f]), 2),
+                "return_percent": round(float(m["return_percent"][f]), 4),
+                "max_drawdown_percent": round(float(m["max_drawdown_percent"][f]), 4),
+                "profit_factor": round(pf, 4) if math.isfinite(pf) else None,
+                "avg_profit_percent": round(float(m["avg_profit_percent"][f]), 4),
+            })
+    return results
+
+
+def rank(results: List[Dict[str, Any]], by: str, min_trades: int) -> List[Dict[str, Any]]:
+    """Sort by return / max(drawdown, 1) (ratio), return, or lowest drawdown; thin samples go last."""
+    for r in results:
+        r["score"] = round(r["return_percent"] / max(r["max_drawdown_percent"], 1.0), 4)
+    keys = {
+        "ratio": lambda r: (-r["score"], -r["return_percent"]),
+        "return": lambda r: (-r["return_percent"], r["max_drawdown_percent"]),
+        "drawdown": lambda r: (r["max_drawdown_percent"], -r["return_percent"]),
+    }
+    return sorted(results, key=lambda r: (r["trades"] < min_trades,) + keys[by](r))
+
+
+def _parse_grid(items: List[str], defaults: Dict[str, List[float]]) -> Dict[str, List[float]]:
+    grid = dict(defaults)
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in grid:
+            raise SystemExit(f"Error: unknown grid parameter {name!r} (known: {', '.join(defaults)})")
+        grid[name] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def _default_rois(roi: Dict[str, float]) -> List[Dict[str, float]]:
+    """The strategy's ladder and the same ladder scaled to half / one and a half."""
+    return [{k: round(v * s, 6) for k, v in roi.items()} for s in (0.5, 1.0, 1.5)]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Screen a Klineo strategy's parameter grid with vectorized signals")
+    p.add_argument("strategy", choices=sorted(SPECS))
+    p.add_argument("--pairs", required=True, help="Comma-separated pairs")
+    p.add_argument("--timerange", required=True, help="Freqtrade timerange (YYYYMMDD-YYYYMMDD)")
+    p.add_argument("--grid", action="append", default=[], help="name=v1,v2,... override (repeatable)")
+    p.add_argument("--roi", action="append", default=[], help="minimal_roi JSON ladder (repeatable)")
+    p.add_argument("--stoploss", default=None, help="Comma-separated stoplosses (e.g. -0.05,-0.1)")
+    p.add_argument("--rank", choices=RANKINGS, default="ratio", help="Ranking (default: return / drawdown)")
+    p.add_argument("--min-trades", type=int, default=10, help="Rank combos with fewer trades last")
+    p.add_argument("--top", type=int, default=10, help="Rows to print")
+    p.add_argument("--data-dir", default=DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--out", default=None, help="Ranking JSON (default: output/screen/<strategy>_<tf>_<timerange>.json)")
+    args = p.parse_args()
+
+    defaults = strategy_defaults(args.strategy)
+    with open(CONFIG, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    fee = float(config.get("fee", 0.001))
+    stake_fraction = 1.0 / max(int(config.get("max_open_trades", 1)), 1)
+    grid = _parse_grid(args.grid, SPECS[args.strategy]["grid"])
+    rois = [json.loads(r) for r in args.roi] or _default_rois(defaults["minimal_roi"])
+    if args.stoploss:
+        stoplosses = [float(v) for v in args.stoploss.split(",") if v.strip()]
+    else:
+        stoplosses = [round(defaults["stoploss"] * s, 6) for s in (0.5, 1.0, 1.5)]
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+
+    started = time.perf_counter()
+    results = rank(
+        screen(args.strategy, pairs, args.timerange, grid, rois, stoplosses, fee, stake_fraction, args.data_dir),
+        args.rank,
+        args.min_trades,
+    )
+    seconds = time.perf_counter() - started
+
+    timeframe = defaults["timeframe"]
+    out = args.out or os.path.join(OUTPUT_SCREEN, f"{args.strategy}_{timeframe}_{args.timerange.replace('/', '_')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "strategy": args.strategy,
+            "timeframe": timeframe,
+            "pairs": pairs,
+            "timerange": args.timerange,
+            "approximate": True,
+            "rank": args.rank,
+            "grid": grid,
+            "minimal_roi": rois,
+            "stoploss": stoplosses,
+            "fee": fee,
+            "combos": len(results),
+            "seconds": round(seconds, 3),
+            "results": results,
+        }, f, indent=2)
+
+    print(f"[Klineo Screen] {args.strategy} {timeframe} {','.join(pairs)} {args.timerange}: {len(results)} combos in {seconds:.2f}s -> {out}")
+    print(f"{'#':>3} {'return %':>9} {'max dd %':>9} {'score':>7} {'trades':>7} {'win %':>6}  params")
+    for i, r in enumerate(results[:args.top], 1):
+        desc = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(
+            f"{i:>3} {r['return_percent']:>9.2f} {r['max_drawdown_percent']:>9.2f} {r['score']:>7.2f} {r['trades']:>7} "
+            f"{r['win_rate']:>6.1f}  {desc} stoploss={r['stoploss']} roi={json.dumps(r['minimal_roi'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,21 @@ Produces tv_ohlc (TradingView CandlestickSeries) and tv_equity (LineSeries).
 """
 
 import argparse
+import heapq
 import json
 import os
+import struct
 import sys
+import tempfile
+from array import array
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+
+import columnar_output
+import instrumentation
+from result_cache import timerange_bounds
 
 # Optional: load OHLCV from .json or .json.gz
 try:
@@ -18,8 +27,39 @@ try:
 except ImportError:
     gzip = None
 
+# Optional: SQLite catalog of results (--catalog)
+try:
+    import sqlite3
+    import catalog
+except ImportError:
+    sqlite3 = None
+    catalog = None
+
+# Optional: columnar OHLCV decoding, candle cache, per-pair sidecars, downsampling, risk metrics,
+# mark-to-market, Monte Carlo and trade excursions (require numpy)
+try:
+    import ohlcv_columns
+    import candle_cache
+    import candle_store
+    import downsample
+    import excursions
+    import montecarlo
+    import portfolio
+    import risk_metrics
+    import numpy as np
+except ImportError:
+    ohlcv_columns = None
+    candle_cache = None
+    candle_store = None
+    downsample = None
+    excursions = None
+    montecarlo = None
+    portfolio = None
+    risk_metrics = None
+    np = None
 
-def parse_args():
+
+def parse_args(argv: Optional[List[str]] = None):
     p = argparse.ArgumentParser(description="Parse Freqtrade backtest to Klineo normalized JSON")
     p.add_argument("--raw", required=True, help="Path to raw backtest result JSON")
     p.add_argument("--strategy", required=True, help="Strategy name")
@@ -28,7 +68,81 @@ def parse_args():
     p.add_argument("--timerange", required=True, help="Timerange (e.g. 20240101-20251231)")
     p.add_argument("--out", required=True, help="Output path for normalized JSON")
     p.add_argument("--data-dir", default=None, help="Freqtrade user_data/data dir for OHLCV")
-    return p.parse_args()
+    p.add_argument(
+        "--candle-cache",
+        default=None,
+        help="Directory for the persistent decoded-candle cache (requires numpy; disabled if omitted)",
+    )
+    p.add_argument(
+        "--candle-sidecars",
+        action="store_true",
+        help="Write every pair's candles to <out>.candles/ sidecar files instead of inlining tv_ohlc (requires numpy)",
+    )
+    p.add_argument(
+        "--max-points",
+        type=int,
+        default=None,
+        help="Point budget per chart series: aggregate tv_ohlc to coarser timeframes and LTTB-reduce tv_equity (requires numpy)",
+    )
+    p.add_argument(
+        "--portfolio",
+        action="store_true",
+        help="Mark open positions to market on every candle: combined/per-pair equity and exposure, intra-trade drawdown (requires numpy)",
+    )
+    p.add_argument(
+        "--excursions",
+        action="store_true",
+        help="Index every trade's entry/exit candle: MAE/MFE, bars held and tv_markers for the chart (requires numpy)",
+    )
+    p.add_argument(
+        "--monte-carlo",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Re-draw the closed trades' PnL sequence N times: drawdown/return percentiles and risk of ruin (requires numpy)",
+    )
+    p.add_argument(
+        "--monte-carlo-method",
+        choices=("bootstrap", "shuffle"),
+        default="bootstrap",
+        help="bootstrap: draw trades with replacement (default); shuffle: permute them (final return fixed)",
+    )
+    p.add_argument("--ruin-drawdown", type=float, default=50.0, help="Monte Carlo drawdown %% counted as ruin (default 50)")
+    p.add_argument(
+        "--monte-carlo-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Process pool size for large Monte Carlo runs (default: CPU count)",
+    )
+    p.add_argument(
+        "--catalog",
+        default=None,
+        metavar="DB",
+        help="Upsert the result's metrics, monthly breakdown and trades into this SQLite catalog (see catalog.py)",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream trades from the raw file and write output incrementally (flat memory for huge exports)",
+    )
+    p.add_argument(
+        "--format",
+        choices=("json", "columnar"),
+        default="json",
+        help="Output format: json (default) or columnar (column arrays, delta-encoded times; see columnar_output.py)",
+    )
+    p.add_argument(
+        "--compress",
+        choices=columnar_output.COMPRESSIONS,
+        default="none",
+        help="Compress the output file (zstd needs the zstandard package)",
+    )
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write cProfile (<out>.cprofile) and tracemalloc (<out>.tracemalloc.txt) dumps of the parse",
+    )
+    return p.parse_args(argv)
 
 
 def load_json(path: str) -> Union[dict, list]:
@@ -48,36 +162,49 @@ def ensure_list_trades(raw: Union[dict, list]) -> list:
     return []
 
 
+@lru_cache(maxsize=1 << 16)
+def iso_to_unix_seconds(v: str) -> int:
+    """Parse an ISO-8601 timestamp; cached because trades share candle-aligned open/close times."""
+    try:
+        return int(datetime.fromisoformat(v.replace("Z", "+00:00")).timestamp())
+    except Exception:
+        return 0
+
+
+def to_unix_seconds(v: Any) -> int:
+    """Unix seconds from epoch seconds/milliseconds, an ISO string or a datetime; 0 if unparseable."""
+    if isinstance(v, (int, float)):
+        return int(v) // 1000 if v > 1e10 else int(v)
+    if isinstance(v, str):
+        return iso_to_unix_seconds(v)
+    if isinstance(v, datetime):
+        # In-memory Freqtrade results (backtest_worker.py) carry datetimes / pandas Timestamps
+        return int(v.timestamp())
+    return 0
+
+
+def _first_ts(t: dict, keys: tuple) -> int:
+    for key in keys:
+        v = t.get(key)
+        if v:
+            ts = to_unix_seconds(v)
+            if ts:
+                return ts
+    return 0
+
+
+_OPEN_TIME_KEYS = ("open_date_utc", "open_timestamp", "open_date")
+_CLOSE_TIME_KEYS = ("close_date_utc", "close_timestamp", "close_date")
+
+
 def trade_open_time_ts(t: dict) -> int:
     """Unix seconds for trade open."""
-    for key in ("open_date_utc", "open_timestamp", "open_date"):
-        if key in t and t[key]:
-            v = t[key]
-            if isinstance(v, (int, float)):
-                return int(v) if v > 1e10 else int(v) * 1000 // 1000
-            if isinstance(v, str):
-                try:
-                    dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
-                    return int(dt.timestamp())
-                except Exception:
-                    pass
-    return 0
+    return _first_ts(t, _OPEN_TIME_KEYS)
 
 
 def trade_close_time_ts(t: dict) -> int:
     """Unix seconds for trade close."""
-    for key in ("close_date_utc", "close_timestamp", "close_date"):
-        if key in t and t[key]:
-            v = t[key]
-            if isinstance(v, (int, float)):
-                return int(v) if v > 1e10 else int(v) * 1000 // 1000
-            if isinstance(v, str):
-                try:
-                    dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
-                    return int(dt.timestamp())
-                except Exception:
-                    pass
-    return 0
+    return _first_ts(t, _CLOSE_TIME_KEYS)
 
 
 def trade_duration_minutes(t: dict) -> float:
@@ -90,14 +217,161 @@ def trade_duration_minutes(t: dict) -> float:
     return 0.0
 
 
-def load_ohlcv(data_dir: str, pair: str, timeframe: str) -> List[Dict[str, Any]]:
+def trade_profit_abs(t: dict) -> float:
+    return float(t.get("profit_abs") or t.get("profit_amount") or 0)
+
+
+class TradeRecord:
+    """
+    One raw trade parsed exactly once (timestamps included). Metrics, equity and the monthly
+    breakdown are all derived from these records; to_dict() gives the Klineo trade shape.
+    """
+
+    __slots__ = (
+        "pair", "open_time", "close_time", "open_rate", "close_rate",
+        "profit_raw", "profit_abs", "profit_ratio", "duration_minutes", "is_win",
+    )
+
+    def __init__(self, t: dict, default_pair: str):
+        profit_raw = trade_profit_abs(t)
+        profit_ratio = float(t.get("profit_ratio") or t.get("profit_pct") or 0)
+        if "profit_ratio" in t and profit_ratio == 0 and profit_raw != 0:
+            profit_ratio = float(t.get("profit_ratio", 0))
+        open_time = _first_ts(t, _OPEN_TIME_KEYS)
+        close_time = _first_ts(t, _CLOSE_TIME_KEYS)
+        duration = t.get("duration")
+        if duration is not None:
+            duration = float(duration)
+        elif open_time and close_time:
+            duration = (close_time - open_time) / 60.0
+        else:
+            duration = 0.0
+
+        self.pair = str(t.get("pair") or t.get("pair_id") or default_pair)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.open_rate = float(t.get("open_rate") or t.get("open_price") or 0)
+        self.close_rate = float(t.get("close_rate") or t.get("close_price") or 0)
+        self.profit_raw = profit_raw  # unrounded, for the equity curve
+        self.profit_abs = round(profit_raw, 4)
+        self.profit_ratio = round(profit_ratio, 6)
+        self.duration_minutes = round(duration, 1)
+        self.is_win = profit_raw > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pair": self.pair,
+            "open_time": self.open_time,
+            "close_time": self.close_time,
+            "open_rate": self.open_rate,
+            "close_rate": self.close_rate,
+            "profit_abs": self.profit_abs,
+            "profit_ratio": self.profit_ratio,
+            "duration_minutes": self.duration_minutes,
+            "is_win": self.is_win,
+        }
+
+
+def normalize_trade(t: dict, default_pair: str) -> Dict[str, Any]:
+    """Map one raw Freqtrade trade to the Klineo trade shape."""
+    return TradeRecord(t, default_pair).to_dict()
+
+
+def max_drawdown_percent(values: Iterable[float]) -> float:
+    """Largest peak-to-trough drop (%) over a sequence of equity values."""
+    max_dd = 0.0
+    peak = None
+    for v in values:
+        if peak is None or v > peak:
+            peak = v
+        dd = (peak - v) / peak * 100.0 if peak else 0
+        if dd > max_dd:
+            max_dd = dd
+    return max_dd
+
+
+@lru_cache(maxsize=1 << 14)
+def _month_key(day: int) -> str:
+    dt = datetime.utcfromtimestamp(day * 86400)
+    return f"{dt.year}-{dt.month:02d}"
+
+
+class TradeStats:
+    """Single-pass accumulator for the dashboard metrics and monthly PnL of trade records."""
+
+    def __init__(self):
+        self.total_trades = 0
+        self.wins = 0
+        self.profit_ratio_sum = 0.0
+        self.profit_abs_sum = 0.0
+        self.duration_sum = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.monthly_pnl: Dict[str, Any] = {}
+
+    def add(self, rec: TradeRecord) -> None:
+        profit_abs = rec.profit_abs
+        self.total_trades += 1
+        if rec.is_win:
+            self.wins += 1
+        self.profit_ratio_sum += rec.profit_ratio
+        self.profit_abs_sum += profit_abs
+        self.duration_sum += rec.duration_minutes
+        if profit_abs > 0:
+            self.gross_profit += profit_abs
+        elif profit_abs < 0:
+            self.gross_loss += profit_abs
+
+        if rec.close_time:
+            key = _month_key(rec.close_time // 86400)
+            month = self.monthly_pnl.get(key)
+            if month is None:
+                year, mon = int(key[:4]), int(key[5:])
+                month = self.monthly_pnl[key] = {"year": year, "month": mon, "profit_abs": 0.0, "trade_count": 0}
+            month["profit_abs"] += profit_abs
+            month["trade_count"] += 1
+
+    def metrics(self, max_dd_percent: float, profit_total: Optional[float] = None) -> Dict[str, Any]:
+        n = self.total_trades
+        win_rate = (self.wins / n * 100.0) if n else 0.0
+        profit_percent = float(profit_total) if profit_total is not None else self.profit_ratio_sum
+        avg_duration = (self.duration_sum / n) if n else None
+        avg_profit_per_trade = (self.profit_abs_sum / n) if n else 0.0
+        # Profit factor: gross profit / abs(gross loss)
+        profit_factor = None
+        if self.gross_loss != 0:
+            profit_factor = round(self.gross_profit / abs(self.gross_loss), 4)
+        return {
+            "total_trades": n,
+            "win_rate": round(win_rate, 2),
+            "profit_percent": round(profit_percent, 4),
+            "max_drawdown_percent": round(max_dd_percent, 2),
+            "profit_factor": profit_factor,
+            "sharpe_ratio": None,
+            "avg_trade_duration_minutes": round(avg_duration, 1) if avg_duration is not None else None,
+            "avg_profit_per_trade": round(avg_profit_per_trade, 4),
+            "total_profit_abs": round(self.profit_abs_sum, 4),
+        }
+
+    def monthly_breakdown(self) -> List[Dict[str, Any]]:
+        return sorted(self.monthly_pnl.values(), key=lambda x: (x["year"], x["month"]))
+
+
+def load_ohlcv(data_dir: str, pair: str, timeframe: str, cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Load OHLCV candles from Freqtrade data dir.
     Pair format: BTC/USDT -> file BTC_USDT-15m.json or BTC_USDT-15m.json.gz
+    Uses the columnar NumPy engine (ohlcv_columns) when available, else the per-row path.
+    With cache_dir, decoded candles are reused from the persistent candle cache.
     """
     if not data_dir or not os.path.isdir(data_dir):
         return []
-    # First pair for chart (prefer BTC/USDT if in list)
+    if ohlcv_columns is not None:
+        try:
+            cols = candle_cache.load_columns(data_dir, pair, timeframe, cache_dir)
+        except Exception:
+            return []
+        return cols.to_tv() if cols is not None else []
     symbol = pair.replace("/", "_")
     base = os.path.join(data_dir, "binance", f"{symbol}-{timeframe}")
     for ext in (".json", ".json.gz"):
@@ -114,59 +388,25 @@ def load_ohlcv(data_dir: str, pair: str, timeframe: str) -> List[Dict[str, Any]]
         except Exception:
             return []
         if isinstance(data, list):
-            out = []
-            for row in data:
-                if isinstance(row, dict):
-                    t = row.get("date") or row.get("time") or row.get(0)
-                    if isinstance(t, (int, float)):
-                        ts = int(t) if t > 1e10 else int(t) / 1000
-                    elif isinstance(t, str):
-                        try:
-                            ts = int(datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp())
-                        except Exception:
-                            ts = 0
-                    else:
-                        ts = 0
-                    out.append({
-                        "time": ts,
-                        "open": float(row.get("open", 0)),
-                        "high": float(row.get("high", 0)),
-                        "low": float(row.get("low", 0)),
-                        "close": float(row.get("close", 0)),
-                        "volume": float(row.get("volume", 0)),
-                    })
-                elif isinstance(row, (list, tuple)) and len(row) >= 6:
-                    ts = int(row[0]) if row[0] > 1e10 else int(row[0]) // 1000
-                    out.append({
-                        "time": ts,
-                        "open": float(row[1]),
-                        "high": float(row[2]),
-                        "low": float(row[3]),
-                        "close": float(row[4]),
-                        "volume": float(row[5]),
-                    })
-            return out
+            return load_ohlcv_rows(data)
         if isinstance(data, dict) and "data" in data:
             return load_ohlcv_from_struct(data["data"])
     return []
 
 
 def load_ohlcv_from_struct(data: Any) -> List[Dict[str, Any]]:
+    if ohlcv_columns is not None:
+        return ohlcv_columns.columns_from_rows(data).to_tv()
+    return load_ohlcv_rows(data)
+
+
+def load_ohlcv_rows(data: Any) -> List[Dict[str, Any]]:
+    """Per-row fallback when NumPy is not installed."""
     out = []
     for row in data:
         if isinstance(row, dict):
-            t = row.get("date") or row.get("time") or row.get(0)
-            if isinstance(t, (int, float)):
-                ts = int(t) if t > 1e10 else int(t) / 1000
-            elif isinstance(t, str):
-                try:
-                    ts = int(datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp())
-                except Exception:
-                    ts = 0
-            else:
-                ts = 0
             out.append({
-                "time": ts,
+                "time": to_unix_seconds(row.get("date") or row.get("time") or row.get(0)),
                 "open": float(row.get("open", 0)),
                 "high": float(row.get("high", 0)),
                 "low": float(row.get("low", 0)),
@@ -174,9 +414,8 @@ def load_ohlcv_from_struct(data: Any) -> List[Dict[str, Any]]:
                 "volume": float(row.get("volume", 0)),
             })
         elif isinstance(row, (list, tuple)) and len(row) >= 6:
-            ts = int(row[0]) if row[0] > 1e10 else int(row[0]) // 1000
             out.append({
-                "time": ts,
+                "time": to_unix_seconds(row[0]),
                 "open": float(row[1]),
                 "high": float(row[2]),
                 "low": float(row[3]),
@@ -186,152 +425,666 @@ def load_ohlcv_from_struct(data: Any) -> List[Dict[str, Any]]:
     return out
 
 
-def build_equity_curve(trades: list, start_balance: float = 10000.0) -> List[Dict[str, Any]]:
-    """Build tv_equity from trades: (time, value) with cumulative profit."""
+def collect_ohlcv(args, pairs_list: List[str], first_pair: str, raw_ohlcv: Any = None):
+    """
+    Candle output for the payload: (tv_ohlc, extra payload fields).
+    --candle-sidecars: every pair goes to <out>.candles/, tv_ohlc stays empty, extra has the "candles" index.
+    --max-points: tv_ohlc is the finest timeframe within budget, extra has "tv_ohlc_levels" and "resolution".
+    Otherwise the first pair is inlined at full resolution.
+    """
+    extra: Dict[str, Any] = {}
+    if args.candle_sidecars and args.data_dir and candle_store is not None:
+        sidecar_dir = candle_store.sidecar_dir_for(args.out)
+        index = candle_store.write_sidecars(sidecar_dir, args.data_dir, pairs_list or [first_pair], args.timeframe, args.candle_cache)
+        index["dir"] = os.path.basename(sidecar_dir)
+        extra["candles"] = index
+        return [], extra
+    if args.candle_sidecars:
+        print("Warning: --candle-sidecars needs numpy and --data-dir; inlining tv_ohlc", file=sys.stderr)
+
+    if args.max_points and downsample is not None:
+        cols = None
+        if args.data_dir:
+            try:
+                cols = candle_cache.load_columns(args.data_dir, first_pair, args.timeframe, args.candle_cache)
+            except Exception:
+                cols = None
+        if (cols is None or not len(cols)) and raw_ohlcv is not None:
+            cols = ohlcv_columns.columns_from_rows(raw_ohlcv)
+        tv_ohlc, levels, resolution = downsample.build_resolution(cols, args.timeframe, 0, args.max_points)
+        extra["tv_ohlc_levels"] = levels
+        extra["resolution"] = resolution
+        return tv_ohlc, extra
+    if args.max_points:
+        print("Warning: --max-points needs numpy; writing full-resolution output", file=sys.stderr)
+
+    # OHLCV for first pair (TradingView CandlestickSeries)
+    tv_ohlc = []
+    if args.data_dir:
+        tv_ohlc = load_ohlcv(args.data_dir, first_pair, args.timeframe, args.candle_cache)
+    if not tv_ohlc and raw_ohlcv is not None:
+        tv_ohlc = load_ohlcv_from_struct(raw_ohlcv)
+    return tv_ohlc, extra
+
+
+def start_balance(raw: Any, strategy: str, default: float = 10000.0) -> float:
+    """Starting balance of the backtest (in-memory backtest_stats or Freqtrade's per-strategy stats)."""
+    if isinstance(raw, dict):
+        stats = raw.get("backtest_stats") or (raw.get("strategy") or {}).get(strategy) or {}
+        if isinstance(stats, dict) and stats.get("starting_balance"):
+            return float(stats["starting_balance"])
+    return default
+
+
+def mark_to_market(args, pairs_list: List[str], records: List["TradeRecord"], trades_raw: list, raw: Any) -> Optional[Dict[str, Any]]:
+    """--portfolio block: every pair's open positions valued on each candle (see portfolio.py)."""
+    if portfolio is None or not args.data_dir:
+        print("Warning: --portfolio needs numpy and --data-dir; skipping mark-to-market equity", file=sys.stderr)
+        return None
+    candles = {}
+    for pair in pairs_list:
+        cols = candle_cache.load_columns(args.data_dir, pair, args.timeframe, args.candle_cache)
+        if cols is not None and len(cols):
+            candles[pair] = cols
+    try:
+        start, end = timerange_bounds(args.timerange)
+    except ValueError:
+        start = end = None
+    balance = start_balance(raw, args.strategy)
+    mtm = portfolio.mark_to_market(candles, portfolio.trade_columns(records, trades_raw), balance, start, end)
+    return portfolio.payload(mtm, balance, args.max_points)
+
+
+def trade_excursions(args, pairs_list: List[str], trades: Dict[str, Any], tv_ohlc: list, first_pair: str) -> Optional[Dict[str, Any]]:
+    """--excursions: per-trade candle indices and MAE/MFE (see excursions.py), plus markers for tv_ohlc."""
+    if excursions is None or not args.data_dir:
+        print("Warning: --excursions needs numpy and --data-dir; skipping trade excursions", file=sys.stderr)
+        return None
+    candles = {}
+    for pair in pairs_list:
+        cols = candle_cache.load_columns(args.data_dir, pair, args.timeframe, args.candle_cache)
+        if cols is not None and len(cols):
+            candles[pair] = cols
+    try:
+        bar_seconds = downsample.timeframe_seconds(args.timeframe)
+    except (KeyError, ValueError):
+        bar_seconds = None
+    ex = excursions.index_trades(candles, trades, bar_seconds)
+    tv_times = np.fromiter((bar["time"] for bar in tv_ohlc), dtype=np.int64, count=len(tv_ohlc))
+    return {"fields": ex, "summary": excursions.summary(ex), "tv_markers": excursions.tv_markers(tv_times, trades, first_pair)}
+
+
+def monte_carlo(args, pnl: Iterable[float], balance: float, metrics: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """--monte-carlo block for closed-trade profits in close order; adds its headline numbers to metrics."""
+    if montecarlo is None:
+        print("Warning: --monte-carlo needs numpy; skipping Monte Carlo", file=sys.stderr)
+        return None
+    pnl = np.fromiter(pnl, dtype=np.float64)
+    summary = montecarlo.run(
+        pnl, balance, args.monte_carlo, args.monte_carlo_method, ruin_drawdown=args.ruin_drawdown,
+        workers=args.monte_carlo_workers,
+    )
+    if "observed" in summary:
+        metrics["max_drawdown_percent_p95"] = summary["max_drawdown_percent"]["p95"]
+        metrics["risk_of_ruin_percent"] = summary["risk_of_ruin_percent"]
+    return summary
+
+
+def build_equity_curve(records: List[TradeRecord], start_balance: float = 10000.0) -> List[Dict[str, Any]]:
+    """Build tv_equity from trade records: (time, value) with cumulative profit."""
     out = []
     cumulative = 0.0
     # Sort by close time
-    sorted_trades = sorted(
-        [t for t in trades if trade_close_time_ts(t)],
-        key=trade_close_time_ts,
-    )
+    closed = sorted((r for r in records if r.close_time), key=lambda r: r.close_time)
     # Initial point (use first trade open or 0)
-    if sorted_trades:
-        t0 = trade_open_time_ts(sorted_trades[0]) or trade_close_time_ts(sorted_trades[0])
+    if closed:
+        t0 = closed[0].open_time or closed[0].close_time
         if t0:
             out.append({"time": t0, "value": start_balance})
-    for t in sorted_trades:
-        close_ts = trade_close_time_ts(t)
-        if not close_ts:
-            continue
-        profit = float(t.get("profit_abs") or t.get("profit_amount") or 0)
-        cumulative += profit
-        out.append({"time": close_ts, "value": round(start_balance + cumulative, 2)})
-    if not out and trades:
-        out.append({"time": trade_open_time_ts(trades[0]) or 0, "value": start_balance})
+    for r in closed:
+        cumulative += r.profit_raw
+        out.append({"time": r.close_time, "value": round(start_balance + cumulative, 2)})
+    if not out and records:
+        out.append({"time": records[0].open_time or 0, "value": start_balance})
     if not out:
         out.append({"time": 0, "value": start_balance})
     return out
 
 
-def main():
-    args = parse_args()
-    raw_path = args.raw
-    if not os.path.isfile(raw_path):
-        print(f"Error: raw file not found: {raw_path}", file=sys.stderr)
-        sys.exit(1)
+def equity_metrics(
+    stats: TradeStats,
+    tv_equity: List[Dict[str, Any]],
+    profit_percent: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """stats.metrics() with the max drawdown of tv_equity, plus the risk metrics and payload "risk" (numpy only)."""
+    n_equity = len(tv_equity)
+    if risk_metrics is None:
+        max_dd_percent = max_drawdown_percent(pt["value"] for pt in tv_equity) if n_equity >= 2 else 0.0
+        return stats.metrics(max_dd_percent, profit_percent), None
+    values = np.fromiter((pt["value"] for pt in tv_equity), dtype=np.float64, count=n_equity)
+    max_dd_percent = risk_metrics.max_drawdown_percent(values) if n_equity >= 2 else 0.0
+    metrics = stats.metrics(max_dd_percent, profit_percent)
+    # Sharpe/Sortino/Calmar etc. on the daily-resampled curve
+    risk_fields, risk = risk_metrics.compute((pt["time"] for pt in tv_equity), values)
+    metrics.update(risk_fields)
+    return metrics, risk
+
+
+# --- Streaming mode (--stream) ---
+# Reads the raw export's trades array element by element, folds metrics in one pass and
+# spools normalized trades / equity points to temp files, so peak memory does not grow
+# with the number of trades.
+
+STREAM_CHUNK_SIZE = 1 << 16
+EQUITY_RUN_SIZE = 50_000
+
+
+class JsonArrayStream:
+    """Minimal incremental JSON reader: decodes one top-level value or array element at a time."""
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Grow reads with the pending buffer so one huge value is not re-scanned quadratically
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"Malformed JSON: expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"Malformed JSON: expected ',' or ']' at offset {self.pos - 1}")
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Yield keys of an object; the caller must consume each value before advancing."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError(f"Malformed JSON: expected ',' or '}}' at offset {self.pos - 1}")
+
+
+def iter_raw_trades(path: str, extras: Dict[str, Any], keep: Iterable[str] = ("backtest_stats",)) -> Iterator[dict]:
+    """
+    Yield raw trades from a backtest export (array or object with 'trades' key) without loading
+    the whole file. Other top-level keys listed in `keep` are decoded into `extras`.
+    """
+    keep = set(keep)
+    with open(path, "r", encoding="utf-8") as f:
+        js = JsonArrayStream(f)
+        head = js.peek()
+        if head == "[":
+            yield from js.iter_array()
+            return
+        if head != "{":
+            return
+        for key in js.iter_object_keys():
+            if key == "trades" and js.peek() == "[":
+                yield from js.iter_array()
+            elif key in keep:
+                extras[key] = js.value()
+            else:
+                js.value()
+
+
+_EQUITY_RECORD = struct.Struct("<qqqd")  # close_ts, seq, open_ts, profit_abs
+
+
+def _write_equity_run(records: list) -> Any:
+    records.sort()
+    run = tempfile.TemporaryFile()
+    for rec in records:
+        run.write(_EQUITY_RECORD.pack(*rec))
+    run.seek(0)
+    records.clear()
+    return run
+
+
+def _read_equity_run(run) -> Iterator[tuple]:
+    size = _EQUITY_RECORD.size
+    while True:
+        block = run.read(size * 4096)
+        if not block:
+            return
+        yield from _EQUITY_RECORD.iter_unpack(block)
+
+
+def iter_equity_points(runs: list, first_open_ts: int, start_balance: float = 10000.0) -> Iterator[Dict[str, Any]]:
+    """Same points as build_equity_curve, merged from close-time sorted runs on disk."""
+    merged = heapq.merge(*(_read_equity_run(r) for r in runs))
+    cumulative = 0.0
+    emitted = False
+    for close_ts, _seq, open_ts, profit in merged:
+        if not emitted:
+            t0 = open_ts or close_ts
+            if t0:
+                yield {"time": t0, "value": start_balance}
+            emitted = True
+        cumulative += profit
+        yield {"time": close_ts, "value": round(start_balance + cumulative, 2)}
+    if not emitted:
+        yield {"time": first_open_ts or 0, "value": start_balance}
+
+
+def _write_json_array(f, key: str, items: Iterable[Any], last: bool = False) -> int:
+    f.write(f'  "{key}": [')
+    n = 0
+    for item in items:
+        f.write(",\n    " if n else "\n    ")
+        f.write(json.dumps(item))
+        n += 1
+    f.write("\n  ]" if n else "]")
+    f.write("\n" if last else ",\n")
+    return n
+
+
+def _iter_spooled_lines(spool) -> Iterator[Any]:
+    spool.seek(0)
+    for line in spool:
+        yield json.loads(line)
+
+
+def write_normalized_stream(
+    args,
+    pairs_list: List[str],
+    first_pair: str,
+    recorder: Optional[instrumentation.StageRecorder] = None,
+) -> None:
+    recorder = recorder or instrumentation.StageRecorder()
+    if args.portfolio:
+        # Marking to market needs every trade at once, which --stream avoids holding
+        print("Warning: --portfolio is not supported with --stream; skipping mark-to-market equity", file=sys.stderr)
+    extras: Dict[str, Any] = {}
+    stats = TradeStats()
+    runs: list = []
+    pending: list = []
+    first_open_ts = None
+    # Closed trades' (close time, profit) for --monte-carlo, 16 bytes per trade
+    close_times, close_profits = array("q"), array("d")
+    # Per-trade (pair, open, close, rate, side) for --excursions, 29 bytes per trade
+    pair_codes: Dict[str, int] = {}
+    ex_pair, ex_open, ex_close, ex_rate, ex_short = array("i"), array("q"), array("q"), array("d"), array("b")
 
-    raw = load_json(raw_path)
-    trades_raw = ensure_list_trades(raw)
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as trades_spool, \
+            tempfile.TemporaryFile("w+", encoding="utf-8") as equity_spool:
+        keep = ("backtest_stats",) if args.data_dir else ("backtest_stats", "ohlcv")
+        with recorder.stage("trades", input_bytes=os.path.getsize(args.raw)) as st:
+            for seq, t in enumerate(iter_raw_trades(args.raw, extras, keep)):
+                rec = TradeRecord(t, first_pair)
+                stats.add(rec)
+                trades_spool.write(json.dumps(rec.to_dict()))
+                trades_spool.write("\n")
+                if first_open_ts is None:
+                    first_open_ts = rec.open_time
+                if args.excursions:
+                    ex_pair.append(pair_codes.setdefault(rec.pair, len(pair_codes)))
+                    ex_open.append(rec.open_time)
+                    ex_close.append(rec.close_time or 0)
+                    ex_rate.append(rec.open_rate)
+                    ex_short.append(bool(t.get("is_short")))
+                if rec.close_time:
+                    pending.append((rec.close_time, seq, rec.open_time, rec.profit_raw))
+                    if args.monte_carlo:
+                        close_times.append(rec.close_time)
+                        close_profits.append(rec.profit_raw)
+                    if len(pending) >= EQUITY_RUN_SIZE:
+                        runs.append(_write_equity_run(pending))
+            if pending:
+                runs.append(_write_equity_run(pending))
+            st["input_rows"] = stats.total_trades
 
+        # Equity points (spooled) and max drawdown, in one merge pass
+        with recorder.stage("metrics") as st:
+            n_equity = 0
+            peak = None
+            max_dd_percent = 0.0
+            # Day-close equity for the daily risk metrics (8 bytes per day, not per point)
+            daily = risk_metrics.DailyEquity() if risk_metrics is not None else None
+            for pt in iter_equity_points(runs, first_open_ts or 0):
+                v = pt["value"]
+                if daily is not None:
+                    daily.add(pt["time"], v)
+                if peak is None or v > peak:
+                    peak = v
+                dd = (peak - v) / peak * 100.0 if peak else 0
+                if dd > max_dd_percent:
+                    max_dd_percent = dd
+                equity_spool.write(json.dumps(pt))
+                equity_spool.write("\n")
+                n_equity += 1
+            for run in runs:
+                run.close()
+            risk = None
+            if daily is not None and n_equity:
+                risk_fields, risk = risk_metrics.compute_daily(*daily.grid())
+            del daily
+            st["output_rows"] = n_equity
+
+        with recorder.stage("ohlcv") as st:
+            tv_ohlc, extra = collect_ohlcv(args, pairs_list, first_pair, extras.pop("ohlcv", None))
+            st["output_rows"] = len(tv_ohlc)
+        equity_mask = None
+        if args.max_points and downsample is not None:
+            extra.setdefault("resolution", {"max_points": args.max_points})["tv_equity_source_points"] = n_equity
+            if n_equity > args.max_points:
+                x = np.fromiter((pt["time"] for pt in _iter_spooled_lines(equity_spool)), dtype=np.float64, count=n_equity)
+                y = np.fromiter((pt["value"] for pt in _iter_spooled_lines(equity_spool)), dtype=np.float64, count=n_equity)
+                equity_mask = np.zeros(n_equity, dtype=bool)
+                equity_mask[downsample.lttb_indices(x, y, args.max_points)] = True
+                del x, y
+
+        profit_total = (extras.get("backtest_stats") or {}).get("profit_total")
+        metrics = stats.metrics(max_dd_percent if n_equity >= 2 else 0.0, profit_total)
+        if risk is not None:
+            metrics.update(risk_fields)
+            extra["risk"] = risk
+        if args.monte_carlo:
+            with recorder.stage("monte_carlo", input_rows=len(close_profits)) as st:
+                pnl = close_profits
+                if montecarlo is not None:
+                    # Stable sort: same close order as the equity curve
+                    pnl = np.frombuffer(close_profits, dtype=np.float64)[np.argsort(np.frombuffer(close_times, dtype=np.int64), kind="stable")]
+                mc = monte_carlo(args, pnl, start_balance(extras, args.strategy), metrics)
+                if mc is not None:
+                    extra["monte_carlo"] = mc
+                    st["output_rows"] = args.monte_carlo
+            del close_times, close_profits
+        ex = None
+        if args.excursions:
+            with recorder.stage("excursions", input_rows=len(ex_open)) as st:
+                trades = {}
+                if excursions is not None:
+                    trades = {
+                        "pair": np.array(list(pair_codes), dtype=object)[np.frombuffer(ex_pair, dtype=np.int32)],
+                        "open_time": np.frombuffer(ex_open, dtype=np.int64),
+                        "close_time": np.frombuffer(ex_close, dtype=np.int64),
+                        "open_rate": np.frombuffer(ex_rate, dtype=np.float64),
+                        "is_short": np.frombuffer(ex_short, dtype=np.int8).astype(bool),
+                    }
+                ex = trade_excursions(args, pairs_list or [first_pair], trades, tv_ohlc, first_pair)
+                if ex is not None:
+                    metrics.update(ex["summary"])
+                    extra["tv_markers"] = ex["tv_markers"]
+                    st["output_rows"] = ex["summary"]["excursion_trades"]
+                del trades
+            del ex_pair, ex_open, ex_close, ex_rate, ex_short
+        header = {
+            "strategy": args.strategy,
+            "exchange_data_source": "binance",
+            "timeframe": args.timeframe,
+            "pairs": pairs_list or [first_pair],
+            "timerange": args.timerange,
+            "metrics": metrics,
+            "monthly_pnl_breakdown": stats.monthly_breakdown(),
+        }
+        header.update(extra)
+
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with recorder.stage("dump") as st:
+            equity_points = _iter_spooled_lines(equity_spool)
+            if equity_mask is not None:
+                equity_points = (pt for i, pt in enumerate(equity_points) if equity_mask[i])
+            trade_rows = _iter_spooled_lines(trades_spool)
+            if ex is not None:
+                trade_rows = ({**trade, **fields} for trade, fields in zip(trade_rows, excursions.trade_fields(ex["fields"])))
+            if args.format == "columnar":
+                # Encoded column by column from temp files, so memory stays flat like the JSON path
+                lengths = columnar_output.dump_stream(
+                    {**header, "tv_ohlc": tv_ohlc, "tv_equity": equity_points, "trades": trade_rows},
+                    str(out_path),
+                    _compression(args),
+                )
+                n_written, n_trades = lengths["tv_equity"], lengths["trades"]
+            else:
+                with columnar_output.open_output(str(out_path), _compression(args)) as f:
+                    f.write("{\n")
+                    for key, value in header.items():
+                        f.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+                    _write_json_array(f, "tv_ohlc", tv_ohlc)
+                    n_written = _write_json_array(f, "tv_equity", equity_points)
+                    n_trades = _write_json_array(f, "trades", trade_rows, last=True)
+                    f.write("}\n")
+            st["output_rows"] = len(tv_ohlc) + n_written + n_trades
+            st["output_bytes"] = out_path.stat().st_size
+        if args.catalog:
+            with recorder.stage("catalog", input_rows=n_trades):
+                upsert_catalog(args, header, _iter_spooled_lines(trades_spool))
+
+    print(f"Wrote normalized output to {out_path} (stream, trades={stats.total_trades}, tv_ohlc={len(tv_ohlc)}, tv_equity={n_written})")
+
+
+def upsert_catalog(args, payload: Dict[str, Any], trades: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+    """--catalog: upsert the written result (catalog.py). The output is already written, so failures only warn."""
+    if catalog is None:
+        print("Warning: --catalog needs sqlite3; result not catalogued", file=sys.stderr)
+        return
+    try:
+        conn = catalog.connect(args.catalog)
+        try:
+            catalog.upsert(conn, args.out, payload, trades)
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: catalog upsert failed: {e}", file=sys.stderr)
+
+
+def _compression(args) -> Optional[str]:
+    return None if args.compress == "none" else args.compress
+
+
+# Stage names recorded by the parser (both modes); a new parse replaces all of them in the sidecar
+PARSE_STAGES = ("load_json", "ohlcv", "trades", "metrics", "monte_carlo", "portfolio", "excursions", "dump", "catalog")
+
+
+def write_normalized(
+    args,
+    pairs_list: List[str],
+    first_pair: str,
+    recorder: Optional[instrumentation.StageRecorder] = None,
+    raw: Any = None,
+) -> None:
+    recorder = recorder or instrumentation.StageRecorder()
+    if raw is None:
+        with recorder.stage("load_json", input_bytes=os.path.getsize(args.raw)) as st:
+            raw = load_json(args.raw)
+            trades_raw = ensure_list_trades(raw)
+            st["input_rows"] = len(trades_raw)
+    else:
+        trades_raw = ensure_list_trades(raw)
+
+    with recorder.stage("ohlcv") as st:
+        tv_ohlc, extra = collect_ohlcv(args, pairs_list, first_pair, raw.get("ohlcv") if isinstance(raw, dict) else None)
+        st["output_rows"] = len(tv_ohlc)
+
+    # Parse each raw trade once; everything below derives from the records
+    with recorder.stage("trades", input_rows=len(trades_raw)) as st:
+        records = [TradeRecord(t, first_pair) for t in trades_raw]
+        st["output_rows"] = len(records)
+
+    with recorder.stage("metrics") as st:
+        # Metrics (dashboard-ready)
+        stats = TradeStats()
+        for rec in records:
+            stats.add(rec)
+        profit_percent = None
+        if isinstance(raw, dict) and "backtest_stats" in raw:
+            profit_percent = raw["backtest_stats"].get("profit_total")
+
+        # Max drawdown from equity curve
+        tv_equity = build_equity_curve(records)
+        n_equity = len(tv_equity)
+        metrics, risk = equity_metrics(stats, tv_equity, profit_percent)
+        if risk is not None:
+            extra["risk"] = risk
+        if args.max_points and downsample is not None:
+            tv_equity = downsample.downsample_equity(tv_equity, args.max_points)
+            extra.setdefault("resolution", {"max_points": args.max_points})["tv_equity_source_points"] = n_equity
+        st["output_rows"] = n_equity
+
+    if args.monte_carlo:
+        with recorder.stage("monte_carlo", input_rows=len(records)) as st:
+            closed = sorted((r for r in records if r.close_time), key=lambda r: r.close_time)
+            mc = monte_carlo(args, (r.profit_raw for r in closed), start_balance(raw, args.strategy), metrics)
+            if mc is not None:
+                extra["monte_carlo"] = mc
+                st["output_rows"] = args.monte_carlo
+
+    if args.portfolio:
+        with recorder.stage("portfolio", input_rows=len(records)) as st:
+            mtm = mark_to_market(args, pairs_list or [first_pair], records, trades_raw, raw)
+            if mtm is not None:
+                metrics["max_drawdown_percent_mtm"] = mtm["max_drawdown_percent"]
+                extra["portfolio"] = mtm
+                st["output_rows"] = len(mtm["tv_equity"])
+
+    ex = None
+    if args.excursions:
+        with recorder.stage("excursions", input_rows=len(records)) as st:
+            trades = excursions.trade_columns(records, trades_raw) if excursions is not None else {}
+            ex = trade_excursions(args, pairs_list or [first_pair], trades, tv_ohlc, first_pair)
+            if ex is not None:
+                metrics.update(ex["summary"])
+                extra["tv_markers"] = ex["tv_markers"]
+                st["output_rows"] = ex["summary"]["excursion_trades"]
+
+    with recorder.stage("dump") as st:
+        trades_out = [rec.to_dict() for rec in records]
+        if ex is not None:
+            for trade, fields in zip(trades_out, excursions.trade_fields(ex["fields"])):
+                trade.update(fields)
+        payload = {
+            "strategy": args.strategy,
+            "exchange_data_source": "binance",
+            "timeframe": args.timeframe,
+            "pairs": pairs_list or [first_pair],
+            "timerange": args.timerange,
+            "metrics": metrics,
+            "monthly_pnl_breakdown": stats.monthly_breakdown(),
+            "tv_ohlc": tv_ohlc,
+            "tv_equity": tv_equity,
+            "trades": trades_out,
+        }
+        payload.update(extra)
+        if isinstance(raw, dict) and raw.get("preview"):
+            # Approximate results from preview_backtest.py say so in the payload
+            payload["approximate"] = True
+            payload["preview"] = raw["preview"]
+        if isinstance(raw, dict) and raw.get("walk_forward"):
+            # Stitched out-of-sample result of walk_forward.py: the windows it was built from
+            payload["walk_forward"] = raw["walk_forward"]
+
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if args.format == "columnar":
+            columnar_output.dump(payload, str(out_path), _compression(args))
+        else:
+            with columnar_output.open_output(str(out_path), _compression(args)) as f:
+                json.dump(payload, f, indent=2)
+        st["output_rows"] = len(tv_ohlc) + len(tv_equity) + len(records)
+        st["output_bytes"] = out_path.stat().st_size
+
+    if args.catalog:
+        with recorder.stage("catalog", input_rows=len(records)):
+            upsert_catalog(args, payload)
+
+    print(f"Wrote normalized output to {out_path} (trades={stats.total_trades}, tv_ohlc={len(tv_ohlc)}, tv_equity={len(tv_equity)})")
+
+
+def run(args, raw: Any = None, recorder: Optional[instrumentation.StageRecorder] = None) -> None:
+    """
+    Parse args.raw (or raw, an already-loaded result object) into args.out and write the stages
+    sidecar. recorder may already hold earlier stages (e.g. an in-process backtest).
+    """
     pairs_list = [p.strip() for p in args.pairs.split(",") if p.strip()]
     first_pair = "BTC/USDT" if "BTC/USDT" in pairs_list else (pairs_list[0] if pairs_list else "BTC/USDT")
 
-    # OHLCV for first pair (TradingView CandlestickSeries)
-    tv_ohlc = []
-    if args.data_dir:
-        tv_ohlc = load_ohlcv(args.data_dir, first_pair, args.timeframe)
-    if not tv_ohlc and isinstance(raw, dict) and "ohlcv" in raw:
-        tv_ohlc = load_ohlcv_from_struct(raw["ohlcv"])
-
-    # Normalized trades
-    trades = []
-    for t in trades_raw:
-        open_ts = trade_open_time_ts(t)
-        close_ts = trade_close_time_ts(t)
-        profit_abs = float(t.get("profit_abs") or t.get("profit_amount") or 0)
-        profit_ratio = float(t.get("profit_ratio") or t.get("profit_pct") or 0)
-        if "profit_ratio" in t and profit_ratio == 0 and profit_abs != 0:
-            profit_ratio = float(t.get("profit_ratio", 0))
-        duration_min = trade_duration_minutes(t)
-        is_win = profit_abs > 0
-        trades.append({
-            "pair": str(t.get("pair") or t.get("pair_id") or first_pair),
-            "open_time": open_ts,
-            "close_time": close_ts,
-            "open_rate": float(t.get("open_rate") or t.get("open_price") or 0),
-            "close_rate": float(t.get("close_rate") or t.get("close_price") or 0),
-            "profit_abs": round(profit_abs, 4),
-            "profit_ratio": round(profit_ratio, 6),
-            "duration_minutes": round(duration_min, 1),
-            "is_win": is_win,
-        })
-
-    # Metrics (dashboard-ready)
-    total_trades = len(trades)
-    wins = sum(1 for x in trades if x["is_win"])
-    win_rate = (wins / total_trades * 100.0) if total_trades else 0.0
-    profit_ratio_sum = sum(x["profit_ratio"] for x in trades)
-    profit_abs_sum = sum(x["profit_abs"] for x in trades)
-    profit_percent = profit_ratio_sum
-    if isinstance(raw, dict) and "backtest_stats" in raw:
-        bs = raw["backtest_stats"]
-        profit_percent = float(bs.get("profit_total", profit_ratio_sum))
-    avg_duration = (sum(x["duration_minutes"] for x in trades) / total_trades) if total_trades else None
-    avg_profit_per_trade = (profit_abs_sum / total_trades) if total_trades else 0.0
-
-    # Profit factor: gross profit / abs(gross loss)
-    gross_profit = sum(x["profit_abs"] for x in trades if x["profit_abs"] > 0)
-    gross_loss = sum(x["profit_abs"] for x in trades if x["profit_abs"] < 0)
-    profit_factor = None
-    if gross_loss != 0:
-        profit_factor = round(gross_profit / abs(gross_loss), 4)
-
-    # Max drawdown from equity curve
-    tv_equity = build_equity_curve(trades_raw)
-    max_dd_percent = 0.0
-    if len(tv_equity) >= 2:
-        peak = tv_equity[0]["value"]
-        for pt in tv_equity:
-            v = pt["value"]
-            if v > peak:
-                peak = v
-            dd = (peak - v) / peak * 100.0 if peak else 0
-            if dd > max_dd_percent:
-                max_dd_percent = dd
-
-    # Monthly PnL breakdown (for copy-trading marketplace UI)
-    monthly_pnl: Dict[str, Any] = {}
-    for tr in trades:
-        close_ts = tr.get("close_time") or 0
-        if close_ts:
-            dt = datetime.utcfromtimestamp(close_ts)
-            key = f"{dt.year}-{dt.month:02d}"
-            if key not in monthly_pnl:
-                monthly_pnl[key] = {"year": dt.year, "month": dt.month, "profit_abs": 0.0, "trade_count": 0}
-            monthly_pnl[key]["profit_abs"] += tr.get("profit_abs", 0)
-            monthly_pnl[key]["trade_count"] += 1
-    monthly_breakdown = sorted(monthly_pnl.values(), key=lambda x: (x["year"], x["month"]))
-
-    payload = {
-        "strategy": args.strategy,
-        "exchange_data_source": "binance",
-        "timeframe": args.timeframe,
-        "pairs": pairs_list or [first_pair],
-        "timerange": args.timerange,
-        "metrics": {
-            "total_trades": total_trades,
-            "win_rate": round(win_rate, 2),
-            "profit_percent": round(profit_percent, 4),
-            "max_drawdown_percent": round(max_dd_percent, 2),
-            "profit_factor": profit_factor,
-            "sharpe_ratio": None,
-            "avg_trade_duration_minutes": round(avg_duration, 1) if avg_duration is not None else None,
-            "avg_profit_per_trade": round(avg_profit_per_trade, 4),
-            "total_profit_abs": round(profit_abs_sum, 4),
+    # Per-stage wall/CPU/RSS and byte/row counts go to <out>.stages.json
+    recorder = recorder or instrumentation.StageRecorder()
+    with instrumentation.profiled(args.out if args.profile else None) as profile:
+        if args.stream and raw is None:
+            write_normalized_stream(args, pairs_list, first_pair, recorder)
+        else:
+            write_normalized(args, pairs_list, first_pair, recorder, raw)
+    fields: Dict[str, Any] = {
+        "run": {
+            "strategy": args.strategy,
+            "timeframe": args.timeframe,
+            "pairs": pairs_list or [first_pair],
+            "timerange": args.timerange,
+            "mode": "memory" if raw is not None else ("stream" if args.stream else "default"),
         },
-        "monthly_pnl_breakdown": monthly_breakdown,
-        "tv_ohlc": tv_ohlc,
-        "tv_equity": tv_equity,
-        "trades": trades,
     }
+    if profile:
+        fields["profile"] = profile
+    recorder.write(instrumentation.stages_path_for(args.out), replace=PARSE_STAGES, **fields)
 
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=2)
 
-    print(f"Wrote normalized output to {out_path} (trades={total_trades}, tv_ohlc={len(tv_ohlc)}, tv_equity={len(tv_equity)})")
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if not os.path.isfile(args.raw):
+        print(f"Error: raw file not found: {args.raw}", file=sys.stderr)
+        sys.exit(1)
+    run(args)
 
 
 if __name__ == "__main__":
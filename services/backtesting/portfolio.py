@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Mark-to-market portfolio equity at candle resolution.
+tv_equity only moves when a trade closes, so drawdown inside open positions is invisible and all
+pairs share one line. Here every open position is valued at each candle's close (net of its exit
+fee), for every pair at once:
+
+  pnl[t]      = realized profit of trades closed up to t + sum(amount * (1 - fee_close)) * close[t] - sum(open value)
+  exposure[t] = sum(amount) * close[t]                 (over the trades open on candle t)
+
+Per pair this is a handful of difference arrays (np.bincount at entry/exit candle, then cumsum), so
+the cost is O(candles + trades) per pair without a per-candle loop. Pairs are then forward-filled
+onto the union of their candle times and summed into the combined equity/exposure series, and the
+max drawdown is taken on the combined mark-to-market equity.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from downsample import lttb_indices
+from ohlcv_columns import OhlcvColumns
+from risk_metrics import max_drawdown_percent
+
+
+def trade_columns(records: Sequence[Any], trades_raw: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """
+    Per-trade arrays from parse_backtest.TradeRecord objects and their raw trades (for amount and fees).
+    Without an amount it is derived from stake_amount, or from profit_abs / profit_ratio.
+    """
+    n = len(records)
+    cols = {
+        "pair": np.array([r.pair for r in records], dtype=object),
+        "open_time": np.fromiter((r.open_time for r in records), dtype=np.int64, count=n),
+        "close_time": np.fromiter((r.close_time or 0 for r in records), dtype=np.int64, count=n),
+        "profit_abs": np.fromiter((r.profit_raw for r in records), dtype=np.float64, count=n),
+        "amount": np.zeros(n),
+        "open_value": np.zeros(n),
+        "close_factor": np.ones(n),
+    }
+    for i, (rec, t) in enumerate(zip(records, trades_raw)):
+        fee_open = float(t.get("fee_open") or 0.0)
+        fee_close = float(t.get("fee_close") or 0.0)
+        amount = float(t.get("amount") or 0.0)
+        if not amount and rec.open_rate:
+            stake = float(t.get("stake_amount") or 0.0)
+            if not stake and rec.profit_ratio:
+                stake = rec.profit_raw / rec.profit_ratio / (1.0 + fee_open)
+            amount = stake / rec.open_rate
+        cols["amount"][i] = amount
+        cols["open_value"][i] = amount * rec.open_rate * (1.0 + fee_open)
+        cols["close_factor"][i] = 1.0 - fee_close
+    return cols
+
+
+def pair_series(cols: OhlcvColumns, trades: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """pnl and exposure of one pair's trades (mask) on each of its candles."""
+    n = len(cols)
+    # Held from the entry candle up to (not including) the exit candle, where the profit is realized
+    entry = np.searchsorted(cols.time, trades["open_time"][mask], side="left")
+    closed = trades["close_time"][mask] > 0
+    exit_ = np.where(closed, np.searchsorted(cols.time, trades["close_time"][mask], side="left"), n)
+
+    def stepped(weights: np.ndarray) -> np.ndarray:
+        delta = np.bincount(entry, weights, minlength=n + 1) - np.bincount(exit_, weights, minlength=n + 1)
+        return np.cumsum(delta[:n])
+
+    amount = trades["amount"][mask]
+    held = stepped(amount)
+    held_net = stepped(amount * trades["close_factor"][mask])
+    cost = stepped(trades["open_value"][mask])
+    realized = np.cumsum(np.bincount(exit_[closed], trades["profit_abs"][mask][closed], minlength=n + 1)[:n])
+    # Positions that are flat again leave float residue from the +/- sums; clamp it to zero
+    open_now = stepped(np.ones(amount.size)) > 0.5
+    held = np.where(open_now, held, 0.0)
+    unrealized = np.where(open_now, held_net * cols.close - cost, 0.0)
+    return {"pnl": realized + unrealized, "exposure": held * cols.close}
+
+
+def mark_to_market(
+    candles: Dict[str, OhlcvColumns],
+    trades: Dict[str, np.ndarray],
+    start_balance: float,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Combined and per-pair series on the union of the pairs' candle times within [start, end]:
+    {"time", "equity", "exposure", "pairs": {pair: {"pnl", "exposure"}}, "max_drawdown_percent"}.
+    """
+    windows = {pair: cols.window(start, end) for pair, cols in candles.items()}
+    windows = {pair: cols for pair, cols in windows.items() if len(cols)}
+    if not windows:
+        return {"time": np.zeros(0, dtype=np.int64), "equity": np.zeros(0), "exposure": np.zeros(0), "pairs": {}, "max_drawdown_percent": 0.0}
+    grid = np.unique(np.concatenate([cols.time for cols in windows.values()]))
+    pnl = np.zeros(grid.size)
+    exposure = np.zeros(grid.size)
+    pairs: Dict[str, Dict[str, np.ndarray]] = {}
+    for pair, cols in windows.items():
+        series = pair_series(cols, trades, trades["pair"] == pair)
+        # Forward-fill onto the grid; before the pair's first candle it contributes nothing
+        idx = np.searchsorted(cols.time, grid, side="right") - 1
+        before = idx < 0
+        idx = np.maximum(idx, 0)
+        p = np.where(before, 0.0, series["pnl"][idx])
+        # A pair without a candle at a grid time is not marked there: no exposure, pnl carried
+        x = np.where(before | (cols.time[idx] != grid), 0.0, series["exposure"][idx])
+        pnl += p
+        exposure += x
+        pairs[pair] = {"pnl": p, "exposure": x}
+    equity = start_balance + pnl
+    return {
+        "time": grid,
+        "equity": equity,
+        "exposure": exposure,
+        "pairs": pairs,
+        "max_drawdown_percent": max_drawdown_percent(equity),
+    }
+
+
+def _points(time: np.ndarray, values: np.ndarray, max_points: Optional[int], decimals: int = 2) -> List[Dict[str, Any]]:
+    """TradingView LineSeries points, LTTB-reduced to max_points when given."""
+    if max_points and time.size > max_points:
+        idx = lttb_indices(time.astype(np.float64), values, max_points)
+        time, values = time[idx], values[idx]
+    return [{"time": t, "value": v} for t, v in zip(time.tolist(), np.round(values, decimals).tolist())]
+
+
+def payload(mtm: Dict[str, Any], start_balance: float, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """The "portfolio" block of the normalized payload."""
+    equity, exposure = mtm["equity"], mtm["exposure"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exposure_pct = np.where(equity > 0, exposure / equity * 100.0, 0.0)
+    pairs = {}
+    for pair, s in mtm["pairs"].items():
+        peak = np.maximum.accumulate(s["pnl"]) if s["pnl"].size else s["pnl"]
+        pairs[pair] = {
+            "profit_abs": round(float(s["pnl"][-1]), 4) if s["pnl"].size else 0.0,
+            "max_drawdown_abs": round(float((peak - s["pnl"]).max()), 4) if s["pnl"].size else 0.0,
+            "max_exposure": round(float(s["exposure"].max()), 4) if s["exposure"].size else 0.0,
+            "tv_pnl": _points(mtm["time"], s["pnl"], max_points),
+            "tv_exposure": _points(mtm["time"], s["exposure"], max_points),
+        }
+    return {
+        "start_balance": start_balance,
+        "max_drawdown_percent": round(mtm["max_drawdown_percent"], 2),
+        "max_exposure_percent": round(float(exposure_pct.max()), 2) if exposure_pct.size else 0.0,
+        "avg_exposure_percent": round(float(exposure_pct.mean()), 2) if exposure_pct.size else 0.0,
+        "tv_equity": _points(mtm["time"], equity, max_points),
+        "tv_exposure": _points(mtm["time"], exposure, max_points),
+        "pairs": pairs,
+    }
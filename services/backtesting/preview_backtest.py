@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Preview backtest: an approximate result for a Klineo strategy in well under a second, straight from
+the decoded-candle cache, to show while the full Freqtrade run (run_backtest.sh / backtest_worker.py)
+is still going. The payload has the parse_backtest.py shape plus "approximate": true and a "preview"
+block, and is written to output/preview/ so it never replaces a real result.
+
+Signals use the strategy's own values (param_screen.SPECS) with NumPy indicators (ta_numpy.py).
+Exits follow Freqtrade's backtesting rules for long trades: an exit signal fills at the next open
+(ignored while the entry signal is also set), then stoploss, minimal_roi and trailing stop in that
+order, checked against candle high/low with Freqtrade's exit prices. Every possible entry is resolved
+at once in growing candle windows; trades are then chained per pair under max_open_trades with
+Freqtrade's unlimited stake sizing. Protections, order timeouts and precision rounding are not
+simulated.
+
+Usage:
+  python3 preview_backtest.py KlineoEmaRsiTrend --pairs BTC/USDT --timerange 20240101-20251231
+  python3 preview_backtest.py KlineoBollingerRevert --pairs BTC/USDT,ETH/USDT --timerange 20240101-20251231 --max-points 2000
+"""
+
+import argparse
+import heapq
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import param_screen
+import parse_backtest
+from downsample import timeframe_seconds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PREVIEW = os.path.join(SCRIPT_DIR, "output", "preview")
+DATA_DIR = param_screen.DATA_DIR
+CONFIG = param_screen.CONFIG
+# Candle windows after each possible entry, searched in turn for the exit (most trades end in the first)
+WINDOWS = (64, 512, 4096)
+# Freqtrade defaults for keys config.json does not set
+DEFAULT_WALLET = 1000.0
+DEFAULT_BALANCE_RATIO = 0.99
+
+EXIT_REASONS = ("exit_signal", "stop_loss", "roi", "trailing_stop_loss", "force_exit")
+_SIGNAL, _STOP, _ROI, _TRAILING, _FORCE = range(len(EXIT_REASONS))
+
+
+class ExitRules:
+    """minimal_roi / stoploss / trailing settings of a strategy, laid out per candle offset after entry."""
+
+    def __init__(self, defaults: Dict[str, Any], tf_seconds: int, fee: float):
+        self.fee = fee
+        self.stoploss = abs(float(defaults["stoploss"]))
+        trailing = defaults.get("trailing") or {}
+        self.trailing = bool(trailing.get("trailing_stop", False))
+        self.positive = trailing.get("trailing_stop_positive")
+        self.offset = float(trailing.get("trailing_stop_positive_offset") or 0.0)
+        self.only_offset = bool(trailing.get("trailing_only_offset_is_reached", False))
+
+        steps = param_screen.roi_steps(defaults["minimal_roi"], tf_seconds)
+        # roi[d]: ratio in force d candles after entry (the last entry holds from there on)
+        self.roi = np.full(steps[-1][0] + 1, np.inf)
+        for a, ratio in steps:
+            self.roi[a:] = ratio
+        # Freqtrade exits at the open when a ROI entry starts exactly on a candle and the open is above it
+        tf_minutes = tf_seconds // 60
+        self.roi_starts = np.zeros(self.roi.size + 1, dtype=bool)
+        for minutes in defaults["minimal_roi"]:
+            if int(minutes) > 0 and int(minutes) % tf_minutes == 0 and int(minutes) // tf_minutes < self.roi.size:
+                self.roi_starts[int(minutes) // tf_minutes] = True
+
+    def at(self, table: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        return table[np.minimum(offsets, table.size - 1)]
+
+    def profit_price(self, open_rate: np.ndarray, ratio: Any) -> np.ndarray:
+        """Rate at which a trade's profit ratio after both fees equals ratio."""
+        return open_rate * (1.0 + self.fee) * (1.0 + ratio) / (1.0 - self.fee)
+
+
+def resolve_exits(c: param_screen.Candles, entry: np.ndarray, exit_: np.ndarray, first: int, rules: ExitRules) -> Dict[str, np.ndarray]:
+    """
+    Exit of a trade opened at every possible entry of one pair, all resolved together: entry candle,
+    exit candle, exit rate and reason per candidate. Candles are searched in windows after the entry
+    (WINDOWS, then the rest of the data) and only unresolved candidates go on to the next window.
+    """
+    n = len(c)
+    # Entry signal on candle e fills at the open of e + 1; Freqtrade does not enter on the last candle
+    e = np.flatnonzero(entry[:max(n - 2, 0)])
+    s = e[e >= max(first - 1, 0)] + 1
+    open_rate = c.open[s]
+    init_stop = open_rate * (1.0 - rules.stoploss)
+    arm_price = rules.profit_price(open_rate, rules.offset)
+    exit_signal = exit_ & ~entry
+
+    j = np.full(s.size, n - 1, dtype=np.int64)
+    rate = np.zeros(s.size)
+    reason = np.full(s.size, _FORCE, dtype=np.int8)
+    # Highest trailing stop so far per candidate (carried between windows)
+    trail = np.full(s.size, -np.inf)
+    todo = np.arange(s.size)
+    offset = 0
+    for width in WINDOWS + (n,):
+        if not todo.size:
+            break
+        d = offset + np.arange(width)
+        t = s[todo, None] + d
+        valid = t < n
+        tc = np.minimum(t, n - 1)
+        high, low, opens = c.high[tc], c.low[tc], c.open[tc]
+
+        # Trailing stop: raised from the candle's high before its low is checked
+        if rules.trailing:
+            armed = high >= arm_price[todo, None] if rules.only_offset else np.ones(high.shape, dtype=bool)
+            use_positive = (high > arm_price[todo, None]) if rules.positive is not None else np.zeros(high.shape, dtype=bool)
+            distance = np.where(use_positive, abs(rules.positive or 0.0), rules.stoploss)
+            candidate = np.where(armed & valid, high * (1.0 - distance), -np.inf)
+        else:
+            candidate = np.full(high.shape, -np.inf)
+        running = np.maximum.accumulate(np.concatenate((trail[todo, None], candidate), axis=1), axis=1)
+        stop_before = np.maximum(init_stop[todo, None], running[:, :-1])
+        stop_after = np.maximum(init_stop[todo, None], running[:, 1:])
+        # Freqtrade only moves the stop when the candle's low is still above it
+        stop = np.where(low <= stop_before, stop_before, stop_after)
+        stop_hit = valid & (low <= stop)
+
+        roi_ratio = rules.at(rules.roi, d)
+        roi_target = rules.profit_price(open_rate[todo, None], roi_ratio)
+        roi_hit = valid & (high > roi_target)
+        signal = valid & (d > 0) & exit_signal[np.maximum(tc - 1, 0)]
+        event = signal | stop_hit | roi_hit | (t == n - 1)
+
+        found = event.any(axis=1)
+        k = event.argmax(axis=1)[found]
+        rows = np.flatnonzero(found)
+        idx = todo[found]
+        tk, dk = tc[rows, k], d[k]
+        o, h, lo = opens[rows, k], high[rows, k], low[rows, k]
+        st = stop[rows, k]
+        trailing_hit = st > init_stop[idx]
+
+        is_signal = signal[rows, k]
+        is_stop = ~is_signal & stop_hit[rows, k] & ~trailing_hit
+        is_roi = ~is_signal & ~is_stop & roi_hit[rows, k]
+        is_trailing = ~is_signal & ~is_stop & ~is_roi & stop_hit[rows, k]
+
+        # Stop above the whole candle: filled at the open
+        stop_rate = np.where(st > h, o, st)
+        if rules.trailing:
+            # Trailing stop hit on the entry candle: Freqtrade assumes the worst path through the candle
+            if rules.only_offset and rules.offset and rules.positive:
+                worst = o * (1.0 + rules.offset - abs(rules.positive))
+                worst = np.where(o < h, worst, o * (1.0 - abs(rules.positive)))
+            else:
+                worst = o * (1.0 - abs(rules.positive or 0.0))
+            stop_rate = np.where(is_trailing & (dk == 0) & (st <= h), np.maximum(lo, worst), stop_rate)
+        roi_rate = rules.profit_price(open_rate[idx], 0.0) + open_rate[idx] * rules.at(rules.roi, dk) / (1.0 - rules.fee)
+        roi_rate = np.where(rules.at(rules.roi_starts, dk) & (dk > 0) & (o > roi_rate), o, np.clip(roi_rate, lo, h))
+
+        j[idx] = tk
+        reason[idx] = np.select([is_signal, is_stop, is_roi, is_trailing], [_SIGNAL, _STOP, _ROI, _TRAILING], _FORCE)
+        rate[idx] = np.select(
+            [is_signal, is_stop | is_trailing, is_roi],
+            [o, stop_rate, roi_rate],
+            c.close[n - 1],
+        )
+        trail[todo[~found]] = running[~found, -1]
+        todo = todo[~found]
+        offset += width
+    return {"entry": s, "exit": j, "open_rate": open_rate, "close_rate": rate, "reason": reason}
+
+
+def chain_trades(
+    pairs: Sequence[str],
+    candles: Dict[str, Tuple[param_screen.Candles, int]],
+    exits: Dict[str, Dict[str, np.ndarray]],
+    max_open_trades: int,
+    wallet: float,
+    balance_ratio: float,
+    fee: float,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Walk the possible entries of all pairs in time order (pairs in list order within a candle) and keep
+    those Freqtrade would open: the pair has no open trade and a slot is free. Stakes follow
+    stake_amount "unlimited": the tradable balance split over max_open_trades. Returns (trades, final balance).
+    """
+    order = []
+    for p, pair in enumerate(pairs):
+        if pair not in exits:
+            continue
+        c = candles[pair][0]
+        ex = exits[pair]
+        order.append(np.stack((c.time[ex["entry"]].astype(np.float64), np.full(ex["entry"].size, p), np.arange(ex["entry"].size)), axis=1))
+    if not order:
+        return [], wallet
+    events = np.concatenate(order)
+    events = events[np.lexsort((events[:, 1], events[:, 0]))].astype(np.int64)
+
+    realized = 0.0
+    tied = 0.0
+    busy_until: Dict[int, int] = {}
+    open_heap: List[Tuple[int, int, float, float]] = []
+    trades: List[Dict[str, Any]] = []
+    slots = max(int(max_open_trades), 1)
+    for entry_time, p, i in events.tolist():
+        # Trades that closed before this candle, or on it for pairs processed earlier, free their slot
+        while open_heap and (open_heap[0][0], open_heap[0][1]) < (entry_time, p):
+            _, _, stake, profit = heapq.heappop(open_heap)
+            tied -= stake
+            realized += profit
+        if busy_until.get(p, -1) >= entry_time or len(open_heap) >= slots:
+            continue
+        total = (wallet + realized) * balance_ratio
+        available = total - tied
+        stake = min(total / slots, available)
+        if stake <= 0:
+            continue
+        pair = pairs[p]
+        c = candles[pair][0]
+        ex = exits[pair]
+        open_rate, close_rate = float(ex["open_rate"][i]), float(ex["close_rate"][i])
+        exit_time = int(c.time[ex["exit"][i]])
+        amount = stake / open_rate
+        open_value = amount * open_rate * (1.0 + fee)
+        profit = amount * close_rate * (1.0 - fee) - open_value
+        busy_until[p] = exit_time
+        tied += stake
+        heapq.heappush(open_heap, (exit_time, p, stake, profit))
+        trades.append({
+            "pair": pair,
+            "open_timestamp": entry_time * 1000,
+            "close_timestamp": exit_time * 1000,
+            "open_rate": open_rate,
+            "close_rate": close_rate,
+            "amount": amount,
+            "stake_amount": stake,
+            "fee_open": fee,
+            "fee_close": fee,
+            "profit_abs": profit,
+            "profit_ratio": profit / open_value,
+            "trade_duration": (exit_time - entry_time) // 60,
+            "exit_reason": EXIT_REASONS[int(ex["reason"][i])],
+            "is_open": False,
+        })
+    realized += sum(profit for _, _, _, profit in open_heap)
+    return trades, wallet + realized
+
+
+def load_config() -> Dict[str, Any]:
+    with open(CONFIG, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def preview_raw(
+    strategy: str,
+    pairs: Sequence[str],
+    timerange: str,
+    data_dir: str = DATA_DIR,
+    params: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Freqtrade-shaped raw result ({"trades", "backtest_stats", "preview"}) of an approximate backtest.
+    params overrides some of the strategy's signal values (param_screen.SPECS names).
+    """
+    if strategy not in param_screen.SPECS:
+        raise ValueError(f"{strategy} is not supported by the preview (supported: {', '.join(sorted(param_screen.SPECS))})")
+    started = time.perf_counter()
+    spec = param_screen.SPECS[strategy]
+    defaults = param_screen.strategy_defaults(strategy)
+    timeframe = defaults["timeframe"]
+    config = load_config()
+    fee = float(config.get("fee", 0.001))
+    wallet = float(config.get("dry_run_wallet", DEFAULT_WALLET))
+    rules = ExitRules(defaults, timeframe_seconds(timeframe), fee)
+
+    candles = param_screen.load_candles(pairs, timeframe, timerange, defaults["startup"], data_dir)
+    values = {**spec["params"], **(params or {})}
+    columns = {k: np.array([[float(v)]]) for k, v in values.items()}
+    exits = {}
+    for pair, (c, first) in candles.items():
+        entry = np.broadcast_to(spec["entry"](c, columns), (1, len(c)))[0]
+        exit_ = np.broadcast_to(spec["exit"](c, columns), (1, len(c)))[0]
+        exits[pair] = resolve_exits(c, entry, exit_, first, rules)
+    trades, final = chain_trades(
+        list(pairs), candles, exits,
+        int(config.get("max_open_trades", 1)),
+        wallet,
+        float(config.get("tradable_balance_ratio", DEFAULT_BALANCE_RATIO)),
+        fee,
+    )
+    trades.sort(key=lambda t: (t["open_timestamp"], list(pairs).index(t["pair"])))
+    return {
+        "trades": trades,
+        "backtest_stats": {"profit_total": (final - wallet) / wallet, "starting_balance": wallet, "final_balance": final},
+        "preview": {
+            "engine": "numpy",
+            "params": values,
+            "pairs_with_data": list(candles),
+            "seconds": round(time.perf_counter() - started, 3),
+        },
+    }
+
+
+def preview_path(strategy: str, timeframe: str, timerange: str, fmt: str = "json") -> str:
+    name = f"{strategy}_{timeframe}_{timerange.replace('/', '_')}"
+    return os.path.join(OUTPUT_PREVIEW, name + (".kcol" if fmt == "columnar" else ".json"))
+
+
+def run_preview(
+    strategy: str,
+    pairs: Sequence[str],
+    timerange: str,
+    out: Optional[str] = None,
+    data_dir: str = DATA_DIR,
+    max_points: Optional[int] = None,
+    fmt: str = "json",
+) -> str:
+    """Write the preview payload (parse_backtest.py shape) and its stages sidecar; returns the output path."""
+    timeframe = param_screen.strategy_defaults(strategy)["timeframe"]
+    out = out or preview_path(strategy, timeframe, timerange, fmt)
+    recorder = parse_backtest.instrumentation.StageRecorder()
+    with recorder.stage("preview") as st:
+        raw = preview_raw(strategy, pairs, timerange, data_dir)
+        st["output_rows"] = len(raw["trades"])
+    argv = [
+        "--raw", "(preview)",
+        "--strategy", strategy,
+        "--timeframe", timeframe,
+        "--pairs", ",".join(pairs),
+        "--timerange", timerange,
+        "--out", out,
+        "--data-dir", data_dir,
+        "--candle-cache", param_screen.CANDLE_CACHE,
+        "--format", fmt,
+    ]
+    if max_points:
+        argv += ["--max-points", str(max_points)]
+    parse_backtest.run(parse_backtest.parse_args(argv), raw=raw, recorder=recorder)
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Approximate NumPy preview of a Klineo strategy backtest")
+    p.add_argument("strategy", choices=sorted(param_screen.SPECS))
+    p.add_argument("--pairs", required=True, help="Comma-separated pairs")
+    p.add_argument("--timerange", required=True, help="Freqtrade timerange (YYYYMMDD-YYYYMMDD)")
+    p.add_argument("--out", default=None, help="Output path (default: output/preview/<strategy>_<tf>_<timerange>.json)")
+    p.add_argument("--data-dir", default=DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--max-points", type=int, default=None, help="Point budget per chart series (see parse_backtest.py)")
+    p.add_argument("--format", choices=("json", "columnar"), default="json", help="Output format")
+    args = p.parse_args()
+
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+    started = time.perf_counter()
+    out = run_preview(args.strategy, pairs, args.timerange, args.out, args.data_dir, args.max_points, args.format)
+    print(f"[Klineo Preview] {args.strategy} {','.join(pairs)} {args.timerange} in {time.perf_counter() - started:.2f}s (approximate) -> {out}")
+
+
+if __name__ == "__main__":
+    main()
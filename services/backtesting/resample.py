@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Informative timeframes resampled from the base timeframe instead of downloaded separately.
+A strategy on 5m with @informative("1h") would otherwise need its own 1h download and file; the 1h
+candles are exactly the 5m candles aggregated per hour (first open, max high, min low, last close,
+summed volume), so they are derived from the base data already on disk.
+
+- resample_ohlcv(): vectorized aggregation that keeps only complete edge buckets (a first or last
+  hour with missing 5m candles would not match the exchange's 1h candle). Interior gaps (exchange
+  downtime) are aggregated from the candles that exist, like the exchange does.
+- load_resampled(): decoded through candle_cache, keyed by the base file's version.
+- write_informative(): writes <pair>-<tf>.json in Freqtrade's data format next to the base file, so
+  Freqtrade's DataProvider loads it for @informative. The file gets the base file's mtime and is only
+  rewritten when the base data changed.
+
+Usage (run_backtest.sh, backtest_worker.py, batch_backtest.py and incremental_backtest.py call this
+after download-data):
+  python3 resample.py --strategy KlineoMTFConfirm --timeframe 5m --pairs BTC/USDT,ETH/USDT
+  python3 resample.py --timeframe 5m --informative 1h,4h --pairs BTC/USDT
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from typing import List, Optional, Sequence
+
+import candle_cache
+import ohlcv_columns
+from downsample import aggregate_ohlc, timeframe_seconds
+from ohlcv_columns import OhlcvColumns
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "freqtrade", "user_data", "data")
+STRATEGIES_DIR = os.path.join(SCRIPT_DIR, "freqtrade", "user_data", "strategies")
+
+# @informative("1h") / @informative('4h', ffill=...) on the strategy's own pair; decorators with an
+# asset argument (another pair) are skipped since that pair's base data is not downloaded
+_INFORMATIVE_RE = re.compile(r"^\s*@informative\(\s*['\"](\w+)['\"]\s*(?:\)|,\s*(?!['\"]))", re.MULTILINE)
+
+
+def informative_timeframes(strategy: str, base_timeframe: str) -> List[str]:
+    """Same-pair @informative timeframes of a strategy file that can be resampled from base_timeframe."""
+    path = os.path.join(STRATEGIES_DIR, f"{strategy}.py")
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        found = _INFORMATIVE_RE.findall(f.read())
+    base = timeframe_seconds(base_timeframe)
+    return sorted(
+        {tf for tf in found if timeframe_seconds(tf) > base and timeframe_seconds(tf) % base == 0},
+        key=timeframe_seconds,
+    )
+
+
+def resample_ohlcv(cols: OhlcvColumns, base_timeframe: str, timeframe: str) -> OhlcvColumns:
+    """Aggregate time-sorted base candles to timeframe; incomplete first/last buckets are dropped."""
+    base = timeframe_seconds(base_timeframe)
+    step = timeframe_seconds(timeframe)
+    if step % base:
+        raise ValueError(f"{timeframe} is not a multiple of {base_timeframe}")
+    if not len(cols):
+        return OhlcvColumns.empty()
+    out = aggregate_ohlc(cols, step)
+    # The data may start after the first bucket opened, or stop before the last one closed
+    first = 0 if cols.time[0] == out.time[0] else 1
+    last = len(out) if cols.time[-1] == out.time[-1] + step - base else len(out) - 1
+    if first >= last:
+        return OhlcvColumns.empty()
+    return OhlcvColumns(*(a[first:last] for a in (out.time, out.open, out.high, out.low, out.close, out.volume)))
+
+
+def load_resampled(
+    data_dir: str,
+    pair: str,
+    base_timeframe: str,
+    timeframe: str,
+    cache_dir: Optional[str] = None,
+    exchange: str = "binance",
+) -> Optional[OhlcvColumns]:
+    """Resampled candles for pair/timeframe, through the candle cache when cache_dir is given."""
+    source = ohlcv_columns.ohlcv_path(data_dir, pair, base_timeframe, exchange)
+    if not source:
+        return None
+    # Own cache key per (target, base) pair so a downloaded file of the target timeframe never collides
+    key = f"{timeframe}@{base_timeframe}"
+    cache = candle_cache.CandleCache(cache_dir) if cache_dir else None
+    if cache is not None:
+        cols = cache.get(source, exchange, pair, key)
+        if cols is not None:
+            cache.hits += 1
+            return cols
+        cache.misses += 1
+    base = candle_cache.load_columns(data_dir, pair, base_timeframe, cache_dir)
+    if base is None:
+        return None
+    cols = resample_ohlcv(base, base_timeframe, timeframe)
+    if cache is not None:
+        try:
+            return ohlcv_columns.mmap_columns(cache.put(source, exchange, pair, key, cols))
+        except OSError:
+            pass
+    return cols
+
+
+def informative_path(data_dir: str, pair: str, timeframe: str, exchange: str = "binance") -> str:
+    return os.path.join(data_dir, exchange, f"{pair.replace('/', '_')}-{timeframe}.json")
+
+
+def write_informative(
+    data_dir: str,
+    pair: str,
+    base_timeframe: str,
+    timeframe: str,
+    cache_dir: Optional[str] = None,
+    exchange: str = "binance",
+) -> Optional[str]:
+    """
+    Write the resampled candles as Freqtrade JSON data ([[ms, o, h, l, c, v], ...]); returns the path,
+    or None when there is no base data. Skipped when the file already matches the base file's mtime.
+    """
+    source = ohlcv_columns.ohlcv_path(data_dir, pair, base_timeframe, exchange)
+    if not source:
+        return None
+    path = informative_path(data_dir, pair, timeframe, exchange)
+    base_mtime = os.stat(source).st_mtime_ns
+    if os.path.isfile(path) and os.stat(path).st_mtime_ns == base_mtime:
+        return path
+    cols = load_resampled(data_dir, pair, base_timeframe, timeframe, cache_dir, exchange)
+    data = [list(row) for row in zip((cols.time * 1000).tolist(), *(a.tolist() for a in (cols.open, cols.high, cols.low, cols.close, cols.volume)))]
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        # Same mtime as the base file: marks the file as derived from this version of it
+        os.utime(tmp, ns=(base_mtime, base_mtime))
+        os.replace(tmp, path)
+    except BaseException:
+        candle_cache._unlink_quiet(tmp)
+        raise
+    return path
+
+
+def prepare(
+    pairs: Sequence[str],
+    base_timeframe: str,
+    timeframes: Sequence[str],
+    data_dir: str = DATA_DIR,
+    cache_dir: Optional[str] = None,
+) -> List[str]:
+    """write_informative for every pair and timeframe; returns the files written or already current."""
+    written = []
+    for pair in pairs:
+        for tf in timeframes:
+            path = write_informative(data_dir, pair, base_timeframe, tf, cache_dir)
+            if path is None:
+                print(f"Warning: no {base_timeframe} data for {pair}, {tf} not resampled", file=sys.stderr)
+            else:
+                written.append(path)
+    return written
+
+
+def main():
+    p = argparse.ArgumentParser(description="Resample informative timeframes from the base timeframe data")
+    p.add_argument("--timeframe", required=True, help="Base timeframe (e.g. 5m)")
+    p.add_argument("--pairs", required=True, help="Comma-separated pairs")
+    p.add_argument("--strategy", default=None, help="Resample the strategy's @informative timeframes")
+    p.add_argument("--informative", default=None, help="Comma-separated timeframes (instead of --strategy)")
+    p.add_argument("--data-dir", default=DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--cache-dir", default=None, help="Candle cache dir (default: none)")
+    args = p.parse_args()
+
+    if args.informative:
+        timeframes = [tf.strip() for tf in args.informative.split(",") if tf.strip()]
+    elif args.strategy:
+        timeframes = informative_timeframes(args.strategy, args.timeframe)
+    else:
+        p.error("give --strategy or --informative")
+    if not timeframes:
+        return
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+    written = prepare(pairs, args.timeframe, timeframes, args.data_dir, args.cache_dir)
+    print(f"[Klineo Resample] {','.join(timeframes)} from {args.timeframe}: {len(written)} files")
+
+
+if __name__ == "__main__":
+    main()
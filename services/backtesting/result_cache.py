@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of normalized backtest results.
+The key hashes everything a result depends on: strategy source, config.json, pairs, timeframe,
+timerange, output options, the parser sources and every data file of the pairs. Data files are
+fingerprinted by default by the decoded candles the backtest reads: timerange start minus the
+strategy's startup_candle_count (the file's first candle for strategies on the shared indicator
+store, whose recursive indicators are seeded there) through the end (--fingerprint slice). download-data rewriting a
+shared pair file, or appending newer candles, then leaves the key alone. --fingerprint content hashes
+whole files, mtime uses mtime/size. A hit restores the normalized output (and candle sidecars)
+without running Freqtrade.
+Size is bounded with LRU eviction; hit/miss counts are kept in stats.json.
+
+Usage (run_backtest.sh calls lookup before download-data and store after parsing):
+  python3 result_cache.py lookup --strategy S --timeframe 15m --pairs BTC/USDT --timerange 20240101-20251231 --out N.json
+  python3 result_cache.py store  --strategy S --timeframe 15m --pairs BTC/USDT --timerange 20240101-20251231 --out N.json
+  python3 result_cache.py stats
+  python3 result_cache.py clear
+lookup exits 0 on a hit (output restored) and 1 on a miss.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Optional: candle-slice fingerprints (require numpy); whole-file content hashes otherwise
+try:
+    import candle_cache
+    import ohlcv_columns
+    from downsample import timeframe_seconds
+except ImportError:
+    candle_cache = None
+    ohlcv_columns = None
+    timeframe_seconds = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+USER_DATA = os.path.join(SCRIPT_DIR, "freqtrade", "user_data")
+STRATEGIES_DIR = os.path.join(USER_DATA, "strategies")
+CONFIG = os.path.join(USER_DATA, "config.json")
+DATA_DIR = os.path.join(USER_DATA, "data")
+DEFAULT_MAX_BYTES = 1024 ** 3
+# Parser modules whose changes alter the normalized output
+PARSER_SOURCES = (
+    "parse_backtest.py", "ohlcv_columns.py", "candle_cache.py", "candle_store.py", "downsample.py",
+    "columnar_output.py", "risk_metrics.py", "portfolio.py", "montecarlo.py", "excursions.py",
+)
+# Modules next to the strategies that they import
+STRATEGY_HELPERS = ("klineo_indicators.py",)
+ENTRY_FILE = "normalized.json"
+META_FILE = "meta.json"
+CANDLES_DIR = "candles"
+STATS_FILE = "stats.json"
+FINGERPRINTS = ("slice", "content", "mtime")
+_STARTUP_CANDLES = re.compile(r"^\s*startup_candle_count\s*(?::\s*int\s*)?=\s*(\d+)", re.MULTILINE)
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("KLINEO_RESULT_CACHE_DIR", os.path.join(SCRIPT_DIR, "output", "cache", "results"))
+
+
+def timerange_bounds(timerange: str) -> Tuple[Optional[int], Optional[int]]:
+    """'20240101-20251231' (or epoch seconds) -> (start, end) Unix seconds; open ends are None."""
+    def one(v: str) -> Optional[int]:
+        if not v:
+            return None
+        if len(v) == 8:
+            return int(datetime.strptime(v, "%Y%m%d").replace(tzinfo=timezone.utc).timestamp())
+        return int(v)
+
+    start, _, end = timerange.partition("-")
+    return one(start), one(end)
+
+
+def is_cacheable(timerange: str) -> bool:
+    """Only closed ranges that ended in the past: newer candles could still be downloaded otherwise."""
+    try:
+        _, end = timerange_bounds(timerange)
+    except ValueError:
+        return False
+    return end is not None and end < time.time()
+
+
+# --- Fingerprints ---
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _data_files(data_dir: str, pairs: List[str], exchange: str = "binance") -> List[str]:
+    """Every data file of the pairs (all timeframes, so informative timeframes are covered too)."""
+    base = Path(data_dir) / exchange
+    if not base.is_dir():
+        return []
+    files = set()
+    for pair in pairs:
+        files.update(str(p) for p in base.glob(f"{pair.replace('/', '_')}-*") if p.is_file())
+    return sorted(files)
+
+
+def startup_candles(strategy: str) -> Optional[int]:
+    """The strategy's literal startup_candle_count (None when its source does not set one)."""
+    path = os.path.join(STRATEGIES_DIR, f"{strategy}.py")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        m = _STARTUP_CANDLES.search(f.read())
+    return int(m.group(1)) if m else None
+
+
+def uses_indicator_store(strategy: str) -> bool:
+    """True when the strategy takes indicators from klineo_indicators and the store is enabled."""
+    if os.environ.get("KLINEO_INDICATOR_CACHE", "1") == "0":
+        return False
+    path = os.path.join(STRATEGIES_DIR, f"{strategy}.py")
+    if not os.path.isfile(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        return "shared_indicators(" in f.read()
+
+
+def _slice_digest(
+    path: str,
+    data_dir: str,
+    pair: str,
+    timerange: str,
+    startup: int,
+    from_first_candle: bool = False,
+    exchange: str = "binance",
+) -> Optional[str]:
+    """
+    Digest of the decoded candles of one data file that a backtest over timerange reads (its warm-up
+    of startup candles included, or everything before the end with from_first_candle). None when
+    the file is not a pair/timeframe OHLCV file.
+    """
+    name = os.path.basename(path)
+    prefix = pair.replace("/", "_") + "-"
+    timeframe = name[len(prefix):].split(".", 1)[0]
+    source = ohlcv_columns.ohlcv_path(data_dir, pair, timeframe, exchange)
+    if not source or os.path.abspath(source) != os.path.abspath(path):
+        return None
+    try:
+        start, end = timerange_bounds(timerange)
+        if from_first_candle:
+            start = None
+        elif start is not None:
+            start -= startup * timeframe_seconds(timeframe)
+    except (KeyError, ValueError):
+        return None
+    cols = candle_cache.CandleCache().load(data_dir, pair, timeframe, exchange)
+    if cols is None:
+        return None
+    window = cols.window(start, end)
+    h = hashlib.sha1(f"{start}:{end}:{len(window)}".encode("utf-8"))
+    for column in (window.time, window.open, window.high, window.low, window.close, window.volume):
+        h.update(column.tobytes())
+    return "slice:" + h.hexdigest()
+
+
+def data_fingerprint(
+    data_dir: str,
+    pairs: List[str],
+    mode: str = "mtime",
+    timerange: Optional[str] = None,
+    startup: Optional[int] = None,
+    from_first_candle: bool = False,
+) -> Dict[str, str]:
+    """
+    Per data file: "slice" digests the candles read for timerange (falls back to the file content
+    without numpy, a timerange or a known startup_candle_count), "content" the whole file, "mtime"
+    its mtime and size. from_first_candle slices from the file's first candle instead of the
+    warm-up start.
+    """
+    if mode == "slice" and (candle_cache is None or not timerange or startup is None):
+        mode = "content"
+    out = {}
+    for path in _data_files(data_dir, pairs):
+        digest = None
+        if mode == "slice":
+            pair = next((p for p in pairs if os.path.basename(path).startswith(p.replace("/", "_") + "-")), None)
+            try:
+                digest = _slice_digest(path, data_dir, pair, timerange, startup, from_first_candle) if pair else None
+            except (OSError, ValueError):
+                digest = None
+        if digest is None and mode == "mtime":
+            st = os.stat(path)
+            digest = f"{st.st_mtime_ns}:{st.st_size}"
+        out[os.path.basename(path)] = digest or _file_digest(path)
+    return out
+
+
+def cache_inputs(
+    strategy: str,
+    timeframe: str,
+    pairs: List[str],
+    timerange: str,
+    out_path: str,
+    candle_sidecars: bool = False,
+    max_points: Optional[int] = None,
+    data_dir: str = DATA_DIR,
+    content_hash: bool = False,
+    output_format: str = "json",
+    compress: str = "none",
+    portfolio: bool = False,
+    monte_carlo: int = 0,
+    excursions: bool = False,
+    fingerprint: str = "slice",
+) -> Dict[str, Any]:
+    """
+    Everything the normalized output depends on, as a JSON-serializable dict. fingerprint picks
+    how data files are fingerprinted (FINGERPRINTS); content_hash=True is fingerprint="content".
+    """
+    strategy_path = os.path.join(STRATEGIES_DIR, f"{strategy}.py")
+    indicator_store = uses_indicator_store(strategy)
+    return {
+        "strategy": strategy,
+        "strategy_source": _file_digest(strategy_path) if os.path.isfile(strategy_path) else None,
+        "strategy_helpers": {
+            name: _file_digest(os.path.join(STRATEGIES_DIR, name))
+            for name in STRATEGY_HELPERS
+            if os.path.isfile(os.path.join(STRATEGIES_DIR, name))
+        },
+        # Shared-store indicators are computed over the whole data file, not the backtest frame
+        "indicator_store": indicator_store,
+        "config": _file_digest(CONFIG) if os.path.isfile(CONFIG) else None,
+        "timeframe": timeframe,
+        "pairs": sorted(pairs),
+        "timerange": timerange,
+        "candle_sidecars": bool(candle_sidecars),
+        # Sidecar dirs are referenced by name from the payload
+        "out_name": os.path.basename(out_path) if candle_sidecars else None,
+        "max_points": max_points,
+        "output_format": output_format,
+        "compress": compress,
+        "portfolio": bool(portfolio),
+        "monte_carlo": monte_carlo or 0,
+        "excursions": bool(excursions),
+        "parser": {
+            name: _file_digest(os.path.join(SCRIPT_DIR, name))
+            for name in PARSER_SOURCES
+            if os.path.isfile(os.path.join(SCRIPT_DIR, name))
+        },
+        "data": data_fingerprint(
+            data_dir, pairs, "content" if content_hash else fingerprint, timerange, startup_candles(strategy),
+            indicator_store,
+        ),
+    }
+
+
+def cache_key(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+# --- Cache ---
+
+class ResultCache:
+    """On-disk cache of normalized outputs; one directory per input key."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("KLINEO_RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str, out_path: str) -> bool:
+        """Restore the cached output for key to out_path (plus sidecars). Counts a hit or a miss."""
+        entry = self.entry_dir(key)
+        src = os.path.join(entry, ENTRY_FILE)
+        if not os.path.isfile(src):
+            self._count("misses")
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        candles = os.path.join(entry, CANDLES_DIR)
+        if os.path.isdir(candles):
+            sidecar_dir = os.path.splitext(out_path)[0] + ".candles"
+            shutil.rmtree(sidecar_dir, ignore_errors=True)
+            shutil.copytree(candles, sidecar_dir)
+        tmp = out_path + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, out_path)
+        # Last use for LRU (mtime, as atime is often disabled)
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self._count("hits")
+        return True
+
+    def put(self, key: str, out_path: str, inputs: Dict[str, Any]) -> str:
+        """Store out_path (and its sidecar dir, if any) under key, then evict down to max_bytes."""
+        entry = self.entry_dir(key)
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        shutil.copyfile(out_path, os.path.join(tmp, ENTRY_FILE))
+        sidecar_dir = os.path.splitext(out_path)[0] + ".candles"
+        if inputs.get("candle_sidecars") and os.path.isdir(sidecar_dir):
+            shutil.copytree(sidecar_dir, os.path.join(tmp, CANDLES_DIR))
+        meta = {"key": key, "stored_at": datetime.now(timezone.utc).isoformat(), "inputs": inputs}
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp, entry)
+        self._count("stores")
+        self.evict()
+        return entry
+
+    # --- eviction ---
+
+    def entries(self) -> List[Dict[str, Any]]:
+        out = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isfile(os.path.join(path, META_FILE)):
+                continue
+            size = sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+            out.append({"path": path, "size": size, "used": os.stat(path).st_mtime})
+        return out
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in max_bytes. Returns entries removed."""
+        entries = sorted(self.entries(), key=lambda e: e["used"])
+        total = sum(e["size"] for e in entries)
+        removed = 0
+        for e in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(e["path"], ignore_errors=True)
+            total -= e["size"]
+            removed += 1
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def clear(self) -> int:
+        removed = 0
+        for e in self.entries():
+            shutil.rmtree(e["path"], ignore_errors=True)
+            removed += 1
+        return removed
+
+    # --- hit/miss counters (shared by concurrent runs) ---
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.cache_dir, STATS_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _count(self, field: str, n: int = 1) -> None:
+        path = os.path.join(self.cache_dir, STATS_FILE)
+        with open(path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            stats = self.stats()
+            stats[field] = stats.get(field, 0) + n
+            tmp = f"{path}.tmp-{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(stats, f)
+            os.replace(tmp, path)
+
+
+def lookup(cache: ResultCache, inputs: Dict[str, Any], out_path: str) -> bool:
+    return cache.get(cache_key(inputs), out_path)
+
+
+def store(cache: ResultCache, inputs: Dict[str, Any], out_path: str) -> Optional[str]:
+    if not os.path.isfile(out_path):
+        return None
+    return cache.put(cache_key(inputs), out_path, inputs)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Klineo normalized-result cache")
+    p.add_argument("command", choices=("lookup", "store", "stats", "clear"))
+    p.add_argument("--cache-dir", default=None, help="Cache directory (default: output/cache/results)")
+    p.add_argument("--strategy")
+    p.add_argument("--timeframe")
+    p.add_argument("--pairs", help="Comma-separated pairs")
+    p.add_argument("--timerange")
+    p.add_argument("--out", help="Normalized output path")
+    p.add_argument("--data-dir", default=DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--candle-sidecars", action="store_true")
+    p.add_argument("--max-points", type=int, default=None)
+    p.add_argument("--format", default="json", help="Normalized output format (json or columnar)")
+    p.add_argument("--compress", default="none", help="Normalized output compression (none, gzip, zstd)")
+    p.add_argument("--portfolio", action="store_true", help="Output includes the mark-to-market portfolio block")
+    p.add_argument("--monte-carlo", type=int, default=0, help="Monte Carlo simulations in the output")
+    p.add_argument("--excursions", action="store_true", help="Output includes per-trade MAE/MFE and chart markers")
+    p.add_argument(
+        "--fingerprint",
+        choices=FINGERPRINTS,
+        default="slice",
+        help="Data file fingerprint: slice (candles the backtest reads, default), content (whole file) or mtime (mtime/size)",
+    )
+    p.add_argument("--content-hash", action="store_true", help="Same as --fingerprint content")
+    args = p.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.command == "clear":
+        print(f"Removed {cache.clear()} entries from {cache.cache_dir}")
+        return
+    if args.command == "stats":
+        entries = cache.entries()
+        stats = cache.stats()
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        rate = f"{100.0 * hits / (hits + misses):.1f}%" if hits + misses else "n/a"
+        print(
+            f"{cache.cache_dir}: {len(entries)} entries, {sum(e['size'] for e in entries) / 1024 ** 2:.1f} MiB "
+            f"(max {cache.max_bytes / 1024 ** 2:.0f} MiB)"
+        )
+        print(
+            f"hits={hits} misses={misses} hit_rate={rate} "
+            f"stores={stats.get('stores', 0)} evictions={stats.get('evictions', 0)}"
+        )
+        return
+
+    if not all((args.strategy, args.timeframe, args.pairs, args.timerange, args.out)):
+        p.error(f"{args.command} needs --strategy, --timeframe, --pairs, --timerange and --out")
+    if not is_cacheable(args.timerange):
+        # Open or still-running ranges always go through download-data + backtest
+        sys.exit(1 if args.command == "lookup" else 0)
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+    inputs = cache_inputs(
+        args.strategy, args.timeframe, pairs, args.timerange, args.out,
+        args.candle_sidecars, args.max_points, args.data_dir, args.content_hash, args.format, args.compress,
+        args.portfolio, args.monte_carlo, args.excursions, args.fingerprint,
+    )
+    if args.command == "lookup":
+        sys.exit(0 if lookup(cache, inputs, args.out) else 1)
+    store(cache, inputs, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Vectorized risk metrics for normalized backtest results.
+The equity curve (tv_equity: a point per trade close) is resampled to a daily grid (equity at each
+UTC day's close), and Sharpe, Sortino, Calmar, CAGR, volatility, drawdown duration and rolling
+30/90-day return and volatility are computed with NumPy. Crypto trades every day, so returns are
+annualized over 365 days; the risk-free rate is 0.
+"""
+
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DAY = 86400
+ANNUALIZATION_DAYS = 365
+ROLLING_WINDOWS = (30, 90)
+
+
+def max_drawdown_percent(values: np.ndarray) -> float:
+    """Largest peak-to-trough drop (%) of a value series (same result as the per-point loop)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak != 0, (peak - values) / peak * 100.0, 0.0)
+    return max(float(dd.max()), 0.0)
+
+
+def daily_equity(times: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (day_start_ts, equity at day close) for every UTC day from the first to the last point.
+    times must be sorted; days without a trade close carry the previous value forward.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    first = times[0] // DAY * DAY
+    days = np.arange(first, times[-1] // DAY * DAY + DAY, DAY, dtype=np.int64)
+    idx = np.searchsorted(times, days + DAY, side="left") - 1
+    return days, values[np.maximum(idx, 0)]
+
+
+class DailyEquity:
+    """
+    Incremental daily_equity for streamed curves: add() points in time order and only the equity at
+    each UTC day's close is kept (8 bytes per day, however many points there are).
+    """
+
+    def __init__(self):
+        self.first_day: Optional[int] = None
+        self.values = array("d")
+
+    def add(self, time: int, value: float) -> None:
+        day = int(time) // DAY * DAY
+        if self.first_day is None:
+            self.first_day = day
+        idx = (day - self.first_day) // DAY
+        # Days without a point carry the previous close forward
+        while len(self.values) <= idx:
+            self.values.append(self.values[-1] if self.values else value)
+        self.values[idx] = value
+
+    def grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(day_start_ts, equity at day close), as daily_equity returns them."""
+        equity = np.frombuffer(self.values, dtype=np.float64).copy() if self.values else np.empty(0)
+        first = self.first_day or 0
+        return np.arange(first, first + equity.size * DAY, DAY, dtype=np.int64), equity
+
+
+def drawdown_durations(equity: np.ndarray) -> Tuple[int, int]:
+    """(longest, current) number of days spent below a previous equity high."""
+    n = equity.size
+    peak = np.maximum.accumulate(equity)
+    at_high = equity >= peak
+    # Index of the last high at or before each day
+    last_high = np.maximum.accumulate(np.where(at_high, np.arange(n), 0))
+    underwater = np.arange(n) - last_high
+    return int(underwater.max()), int(underwater[-1])
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    return c[window:] - c[:-window]
+
+
+def rolling_stats(days: np.ndarray, equity: np.ndarray, returns: np.ndarray, window: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Trailing window-day return (%) and annualized volatility (%) as TradingView line series."""
+    if equity.size <= window:
+        return {"return_percent": [], "volatility_percent": []}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(equity[:-window] != 0, equity[window:] / equity[:-window] - 1.0, 0.0) * 100.0
+    s1 = _rolling_sum(returns, window)
+    s2 = _rolling_sum(returns * returns, window)
+    var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+    vol = np.sqrt(var * ANNUALIZATION_DAYS) * 100.0
+    # returns[i] is the return of day i + 1, so windows end on days[window:]
+    t = days[window:].tolist()
+    return {
+        "return_percent": [{"time": a, "value": round(b, 4)} for a, b in zip(t, ret.tolist())],
+        "volatility_percent": [{"time": a, "value": round(b, 4)} for a, b in zip(t, vol.tolist())],
+    }
+
+
+def _ratio(num: float, den: float) -> Optional[float]:
+    if den == 0 or not math.isfinite(den) or not math.isfinite(num):
+        return None
+    return round(num / den, 4)
+
+
+def compute(
+    times: Iterable[int],
+    values: Iterable[float],
+    windows: Iterable[int] = ROLLING_WINDOWS,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (metrics, risk) from equity points. metrics holds the scalar ratios for payload["metrics"],
+    risk the daily-grid details and rolling series for payload["risk"]. Ratios are None when there
+    are fewer than two days of equity.
+    """
+    times = np.fromiter(times, dtype=np.int64)
+    values = np.fromiter(values, dtype=np.float64)
+    if times.size == 0:
+        return compute_daily(np.empty(0, dtype=np.int64), np.empty(0), windows)
+    order = np.argsort(times, kind="stable")
+    days, equity = daily_equity(times[order], values[order])
+    return compute_daily(days, equity, windows)
+
+
+def compute_daily(
+    days: np.ndarray,
+    equity: np.ndarray,
+    windows: Iterable[int] = ROLLING_WINDOWS,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """compute() from an equity curve already on the daily grid (daily_equity or DailyEquity.grid)."""
+    metrics: Dict[str, Any] = {
+        "sharpe_ratio": None,
+        "sortino_ratio": None,
+        "calmar_ratio": None,
+        "cagr_percent": None,
+        "volatility_percent": None,
+        "max_drawdown_duration_days": None,
+    }
+    risk: Dict[str, Any] = {"daily_points": int(days.size), "annualization_days": ANNUALIZATION_DAYS, "rolling": {}}
+    if days.size < 2 or equity[0] <= 0:
+        return metrics, risk
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(equity[:-1] != 0, np.diff(equity) / equity[:-1], 0.0)
+    mean = float(returns.mean())
+    std = float(returns.std(ddof=1)) if returns.size > 1 else 0.0
+    downside = float(np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2)))
+    ann = math.sqrt(ANNUALIZATION_DAYS)
+
+    years = (days.size - 1) / ANNUALIZATION_DAYS
+    growth = float(equity[-1] / equity[0])
+    try:
+        cagr: Optional[float] = growth ** (1.0 / years) - 1.0 if growth > 0 else -1.0
+    except OverflowError:
+        # Huge growth over a few days does not annualize meaningfully
+        cagr = None
+    max_dd = max_drawdown_percent(equity)
+    longest, current = drawdown_durations(equity)
+
+    metrics.update({
+        "sharpe_ratio": _ratio(mean * ann, std),
+        "sortino_ratio": _ratio(mean * ann, downside),
+        "calmar_ratio": _ratio(cagr * 100.0, max_dd) if cagr is not None else None,
+        "cagr_percent": round(cagr * 100.0, 4) if cagr is not None else None,
+        "volatility_percent": round(std * ann * 100.0, 4),
+        "max_drawdown_duration_days": longest,
+    })
+    risk.update({
+        "max_drawdown_percent_daily": round(max_dd, 2),
+        "current_drawdown_duration_days": current,
+        "rolling": {f"{w}d": rolling_stats(days, equity, returns, w) for w in windows},
+    })
+    return metrics, risk
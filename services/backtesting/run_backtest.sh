@@ -2,6 +2,24 @@
 # Run Freqtrade backtest and produce normalized JSON for Klineo.
 # Usage: ./run_backtest.sh <strategy> <timeframe> <pairs_csv> <timerange>
 # Example: ./run_backtest.sh KlineoEmaRsiTrend 15m BTC/USDT,ETH/USDT 20240101-20251231
+# Env: KLINEO_PARSE_STREAM=1 parses the raw result in streaming mode (flat memory for huge exports).
+#      KLINEO_CANDLE_SIDECARS=1 writes every pair's candles to <normalized>.candles/ instead of inlining tv_ohlc.
+#      KLINEO_MAX_POINTS=<n> bounds tv_ohlc / tv_equity to ~n points (coarser timeframes + LTTB).
+#      KLINEO_RESULT_CACHE=0 disables the result cache (identical requests otherwise skip Freqtrade).
+#      KLINEO_RESULT_CACHE_FINGERPRINT=slice|content|mtime picks how data files are fingerprinted (default slice:
+#      only the candles the backtest reads); KLINEO_RESULT_CACHE_CONTENT_HASH=1 is the same as content.
+#      KLINEO_OUTPUT_FORMAT=columnar writes <name>.kcol (column arrays, see columnar_output.py) instead of <name>.json.
+#      KLINEO_OUTPUT_COMPRESS=gzip|zstd compresses the normalized output.
+#      KLINEO_PORTFOLIO=1 adds mark-to-market portfolio equity, exposure and per-pair series (portfolio.py).
+#      KLINEO_EXCURSIONS=1 maps trades to their entry/exit candles: MAE/MFE, bars held and chart markers (excursions.py).
+#      KLINEO_MONTE_CARLO=<n> adds Monte Carlo drawdown/return percentiles over n re-drawn trade sequences (montecarlo.py).
+#      KLINEO_CATALOG=0 skips upserting the result into the SQLite catalog (KLINEO_CATALOG_DB, default output/catalog.sqlite).
+#      KLINEO_PARSE_PROFILE=1 writes cProfile/tracemalloc dumps of the parser next to the output.
+#      KLINEO_EXPORT_DIR=<dir> exports Freqtrade's raw result there (one dir per concurrent run, see job_scheduler.py).
+#      KLINEO_OUTPUT_NAME=<name> names the raw/normalized/stages files (default <strategy>_<tf>_<timerange>), so
+#      concurrent runs that differ only in pairs or options do not write to the same files.
+#      On/off switches (=1 above) are on when set to anything but empty or 0.
+# Per-stage wall/CPU time, peak RSS and byte/row counts are written to <normalized>.stages.json.
 
 set -e
 
@@ -11,6 +29,25 @@ USER_DATA="${FREQTRADE_DIR}/user_data"
 OUTPUT_RAW="${SCRIPT_DIR}/output/raw"
 OUTPUT_NORM="${SCRIPT_DIR}/output/normalized"
 CONFIG="${USER_DATA}/config.json"
+CANDLE_CACHE="${KLINEO_CANDLE_CACHE_DIR:-${SCRIPT_DIR}/output/cache/candles}"
+CATALOG_DB="${KLINEO_CATALOG_DB:-${SCRIPT_DIR}/output/catalog.sqlite}"
+CATALOG_ARGS=()
+if [ "${KLINEO_CATALOG:-1}" != "0" ]; then
+  CATALOG_ARGS=(--catalog "$CATALOG_DB")
+fi
+
+# On/off switch from the environment: unset, empty or 0 is off (like KLINEO_RESULT_CACHE / KLINEO_CATALOG)
+enabled() {
+  [ -n "${1:-}" ] && [ "$1" != "0" ]
+}
+# Parser options that change the normalized output (also part of the result cache key)
+OPTION_ARGS=()
+if enabled "${KLINEO_CANDLE_SIDECARS:-}"; then OPTION_ARGS+=(--candle-sidecars); fi
+if enabled "${KLINEO_PORTFOLIO:-}"; then OPTION_ARGS+=(--portfolio); fi
+if enabled "${KLINEO_EXCURSIONS:-}"; then OPTION_ARGS+=(--excursions); fi
+PARSE_ARGS=()
+if enabled "${KLINEO_PARSE_STREAM:-}"; then PARSE_ARGS+=(--stream); fi
+if enabled "${KLINEO_PARSE_PROFILE:-}"; then PARSE_ARGS+=(--profile); fi
 
 print_help() {
   echo "Usage: $0 <strategy> <timeframe> <pairs_csv> <timerange>"
@@ -38,20 +75,61 @@ TIMERANGE="$4"
 PAIRS_SPACE=$(echo "$PAIRS_CSV" | tr ',' ' ')
 # Sanitize for filename
 SAFE_TIMERANGE=$(echo "$TIMERANGE" | tr '/' '_')
-RAW_FILENAME="${STRATEGY}_${TIMEFRAME}_${SAFE_TIMERANGE}.json"
-RAW_PATH="${OUTPUT_RAW}/${RAW_FILENAME}"
-NORM_PATH="${OUTPUT_NORM}/${RAW_FILENAME}"
+OUTPUT_NAME="${KLINEO_OUTPUT_NAME:-${STRATEGY}_${TIMEFRAME}_${SAFE_TIMERANGE}}"
+RAW_PATH="${OUTPUT_RAW}/${OUTPUT_NAME}.json"
+NORM_BASE="${OUTPUT_NORM}/${OUTPUT_NAME}"
+OUTPUT_FORMAT="${KLINEO_OUTPUT_FORMAT:-json}"
+OUTPUT_COMPRESS="${KLINEO_OUTPUT_COMPRESS:-none}"
+if [ "$OUTPUT_FORMAT" = "columnar" ]; then
+  NORM_PATH="${NORM_BASE}.kcol"
+else
+  NORM_PATH="${NORM_BASE}.json"
+fi
+STAGES_PATH="${NORM_BASE}.stages.json"
 mkdir -p "$OUTPUT_RAW" "$OUTPUT_NORM"
-BACKTEST_RESULTS="${USER_DATA}/backtest_results"
+BACKTEST_RESULTS="${KLINEO_EXPORT_DIR:-${USER_DATA}/backtest_results}"
 mkdir -p "$BACKTEST_RESULTS"
 # Freqtrade writes under userdir; we export to a known name then copy to output/raw
 RAW_IN_USERDATA="${BACKTEST_RESULTS}/klineo_backtest_export.json"
 
 echo "[Klineo Backtest] Strategy=$STRATEGY timeframe=$TIMEFRAME pairs=$PAIRS_CSV timerange=$TIMERANGE"
 
-# 1) Download missing data
+# 0) Result cache: same strategy source, config, pairs, timeframe, timerange and data -> reuse output
+CACHE_ARGS=(
+  --strategy "$STRATEGY"
+  --timeframe "$TIMEFRAME"
+  --pairs "$PAIRS_CSV"
+  --timerange "$TIMERANGE"
+  --out "$NORM_PATH"
+  --data-dir "${USER_DATA}/data"
+  --format "$OUTPUT_FORMAT"
+  --compress "$OUTPUT_COMPRESS"
+  ${KLINEO_MAX_POINTS:+--max-points "$KLINEO_MAX_POINTS"}
+  --fingerprint "${KLINEO_RESULT_CACHE_FINGERPRINT:-slice}"
+  ${KLINEO_MONTE_CARLO:+--monte-carlo "$KLINEO_MONTE_CARLO"}
+  "${OPTION_ARGS[@]}"
+)
+if enabled "${KLINEO_RESULT_CACHE_CONTENT_HASH:-}"; then CACHE_ARGS+=(--content-hash); fi
+if [ "${KLINEO_RESULT_CACHE:-1}" != "0" ] && python3 "${SCRIPT_DIR}/result_cache.py" lookup "${CACHE_ARGS[@]}"; then
+  if [ "${KLINEO_CATALOG:-1}" != "0" ]; then
+    python3 "${SCRIPT_DIR}/catalog.py" --db "$CATALOG_DB" ingest "$NORM_PATH" >/dev/null || echo "[Klineo Backtest] Warning: catalog ingest failed" >&2
+  fi
+  echo "[Klineo Backtest] Result cache hit. Normalized output: $NORM_PATH"
+  exit 0
+fi
+
+# Stage timings of this run (download, backtest, then the parser's own stages)
+rm -f "$STAGES_PATH"
+STAGE=(python3 "${SCRIPT_DIR}/instrumentation.py" run --stages "$STAGES_PATH")
+
+# 1) Download missing data (serialized across concurrent runs, which may share pair files)
+DOWNLOAD_LOCK=()
+if command -v flock >/dev/null 2>&1; then
+  mkdir -p "${USER_DATA}/data"
+  DOWNLOAD_LOCK=(flock "${USER_DATA}/data/.download-data.lock")
+fi
 echo "[Klineo Backtest] Downloading data..."
-freqtrade download-data \
+"${STAGE[@]}" --stage download -- "${DOWNLOAD_LOCK[@]}" freqtrade download-data \
   --config "$CONFIG" \
   --userdir "$FREQTRADE_DIR" \
   --exchange binance \
@@ -60,9 +138,20 @@ freqtrade download-data \
   --timerange "$TIMERANGE" \
   --data-format-ohlcv json
 
+# Informative timeframes (@informative("1h") on a 5m strategy) are resampled from the base data
+# instead of downloaded: one download and one decode per pair, always aligned with the base candles
+if grep -q "^ *@informative(" "${USER_DATA}/strategies/${STRATEGY}.py" 2>/dev/null; then
+  "${STAGE[@]}" --stage resample -- "${DOWNLOAD_LOCK[@]}" python3 "${SCRIPT_DIR}/resample.py" \
+    --strategy "$STRATEGY" \
+    --timeframe "$TIMEFRAME" \
+    --pairs "$PAIRS_CSV" \
+    --data-dir "${USER_DATA}/data" \
+    --cache-dir "$CANDLE_CACHE"
+fi
+
 # 2) Run backtest and export trades (Freqtrade writes under user_data/backtest_results/)
 echo "[Klineo Backtest] Running backtest..."
-freqtrade backtesting \
+"${STAGE[@]}" --stage backtest --output-file "$RAW_IN_USERDATA" -- freqtrade backtesting \
   --config "$CONFIG" \
   --userdir "$FREQTRADE_DIR" \
   --strategy "$STRATEGY" \
@@ -98,6 +187,18 @@ python3 "${SCRIPT_DIR}/parse_backtest.py" \
   --pairs "$PAIRS_CSV" \
   --timerange "$TIMERANGE" \
   --out "$NORM_PATH" \
-  --data-dir "${USER_DATA}/data"
+  --data-dir "${USER_DATA}/data" \
+  --candle-cache "$CANDLE_CACHE" \
+  ${KLINEO_MAX_POINTS:+--max-points "$KLINEO_MAX_POINTS"} \
+  ${KLINEO_MONTE_CARLO:+--monte-carlo "$KLINEO_MONTE_CARLO"} \
+  --format "$OUTPUT_FORMAT" \
+  --compress "$OUTPUT_COMPRESS" \
+  "${OPTION_ARGS[@]}" \
+  "${PARSE_ARGS[@]}" \
+  "${CATALOG_ARGS[@]}"
+
+if [ "${KLINEO_RESULT_CACHE:-1}" != "0" ]; then
+  python3 "${SCRIPT_DIR}/result_cache.py" store "${CACHE_ARGS[@]}" || echo "[Klineo Backtest] Warning: result cache store failed" >&2
+fi
 
 echo "[Klineo Backtest] Done. Normalized output: $NORM_PATH"
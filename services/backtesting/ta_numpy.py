@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+NumPy versions of the TA-Lib indicators the Klineo strategies use (SMA, EMA, RSI, ATR, BBANDS) and
+the pandas rolling max/min/mean, for screening and previews outside Freqtrade.
+Conventions follow TA-Lib: leading values are NaN, EMA is seeded with the SMA of its first period,
+RSI/ATR use Wilder smoothing and BBANDS the population standard deviation. Windowed functions accept
+a 2-D (rows, candles) array and work along the last axis.
+"""
+
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Optional: linear recursive filter for EMA/Wilder smoothing (falls back to blocked NumPy)
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+# Candles per block in the NumPy fallback of _recursive
+RECURSIVE_BLOCK = 256
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan, dtype=np.float64)
+
+
+def _recursive(x: np.ndarray, seed: float, alpha: float) -> np.ndarray:
+    """y[i] = alpha * x[i] + (1 - alpha) * y[i - 1], with y[-1] = seed."""
+    if x.size == 0:
+        return np.empty(0, dtype=np.float64)
+    if lfilter is not None:
+        y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * seed])
+        return y
+    # Blocks of L values: y = x_block @ W + beta^(1..L) * y_before_block, with W[k, i] = alpha * beta^(i - k).
+    # One matrix product gives every block's response from zero; only the block carries are sequential.
+    beta = 1.0 - alpha
+    size = x.size
+    block = min(RECURSIVE_BLOCK, size)
+    rows = -(-size // block)
+    padded = np.zeros(rows * block)
+    padded[:size] = x
+    lag = np.arange(block)[None, :] - np.arange(block)[:, None]
+    weights = np.where(lag >= 0, alpha * beta ** np.maximum(lag, 0), 0.0)
+    local = padded.reshape(rows, block) @ weights
+    decay = beta ** np.arange(1, block + 1)
+    carry = np.empty(rows)
+    prev = seed
+    for r, last in enumerate(local[:, -1].tolist()):
+        carry[r] = prev
+        prev = last + decay[-1] * prev
+    return (local + carry[:, None] * decay[None, :]).ravel()[:size]
+
+
+def sma(x: np.ndarray, period: int) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    out = _nan_like(x)
+    if x.shape[-1] < period:
+        return out
+    c = np.cumsum(x, axis=-1)
+    c = np.concatenate((np.zeros(x.shape[:-1] + (1,)), c), axis=-1)
+    out[..., period - 1:] = (c[..., period:] - c[..., :-period]) / period
+    return out
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """pandas Series.rolling(window).max()"""
+    x = np.asarray(x, dtype=np.float64)
+    out = _nan_like(x)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).max(axis=-1)
+    return out
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """pandas Series.rolling(window).min()"""
+    x = np.asarray(x, dtype=np.float64)
+    out = _nan_like(x)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).min(axis=-1)
+    return out
+
+
+def ema(x: np.ndarray, period: int) -> np.ndarray:
+    """TA-Lib EMA: first value at period - 1 is the SMA, then alpha = 2 / (period + 1)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = _nan_like(x)
+    if x.size < period:
+        return out
+    seed = float(x[:period].mean())
+    out[period - 1] = seed
+    out[period:] = _recursive(x[period:], seed, 2.0 / (period + 1))
+    return out
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """TA-Lib RSI (Wilder): first value at index period."""
+    close = np.asarray(close, dtype=np.float64)
+    out = _nan_like(close)
+    if close.size <= period:
+        return out
+    diff = np.diff(close)
+    gain = np.maximum(diff, 0.0)
+    loss = np.maximum(-diff, 0.0)
+    alpha = 1.0 / period
+    g0 = float(gain[:period].mean())
+    l0 = float(loss[:period].mean())
+    avg_gain = np.concatenate(([g0], _recursive(gain[period:], g0, alpha)))
+    avg_loss = np.concatenate(([l0], _recursive(loss[period:], l0, alpha)))
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[period:] = np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev = np.concatenate(([np.nan], close[:-1]))
+    return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """TA-Lib ATR (Wilder): first value at index period, the mean of true ranges 1..period."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    out = _nan_like(close)
+    if close.size <= period:
+        return out
+    tr = true_range(high, low, close)
+    seed = float(tr[1:period + 1].mean())
+    out[period] = seed
+    out[period + 1:] = _recursive(tr[period + 1:], seed, 1.0 / period)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Population standard deviation over the trailing window (TA-Lib STDDEV / BBANDS)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = _nan_like(x)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).std(axis=-1)
+    return out
+
+
+def bbands(x: np.ndarray, period: int = 20, nbdevup: float = 2.0, nbdevdn: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(upper, middle, lower) with an SMA middle band and population standard deviation."""
+    middle = sma(x, period)
+    std = rolling_std(x, period)
+    return middle + nbdevup * std, middle, middle - nbdevdn * std
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """Cumulative VWAP over the whole frame (KlineoRangeRevert.vwap)."""
+    typical = (high + low + close) / 3.0
+    vc = np.cumsum(volume)
+    vc = np.where(vc > 0, vc, 1.0)
+    return np.cumsum(typical * volume) / vc
@@ -6,11 +6,17 @@
  *   node services/backtesting/triggerBacktestExample.js
  * Or from services/backtesting:
  *   node triggerBacktestExample.js
+ * With a warm worker (python3 backtest_worker.py --socket /tmp/klineo-backtest.sock):
+ *   KLINEO_WORKER_SOCKET=/tmp/klineo-backtest.sock node triggerBacktestExample.js
+ * Through the job scheduler (python3 job_scheduler.py --socket /tmp/klineo-scheduler.sock):
+ *   KLINEO_SCHEDULER_SOCKET=/tmp/klineo-scheduler.sock node triggerBacktestExample.js
  */
 
 const { spawn } = require("child_process");
 const path = require("path");
 const fs = require("fs");
+const net = require("net");
+const readline = require("readline");
 
 const BACKTEST_DIR = path.resolve(__dirname);
 const SCRIPT = path.join(BACKTEST_DIR, "run_backtest.sh");
@@ -19,6 +25,60 @@ const strategy = "KlineoEmaRsiTrend";
 const timeframe = "15m";
 const pairs = "BTC/USDT";
 const timerange = "20240101-20241231";
+const workerSocket = process.env.KLINEO_WORKER_SOCKET;
+const schedulerSocket = process.env.KLINEO_SCHEDULER_SOCKET;
+
+function runOnWorker() {
+  return new Promise((resolve, reject) => {
+    const conn = net.createConnection(workerSocket, () => {
+      conn.write(JSON.stringify({ id: String(Date.now()), strategy, timeframe, pairs, timerange }) + "\n");
+    });
+    let buf = "";
+    conn.on("data", (chunk) => {
+      buf += chunk.toString();
+      const nl = buf.indexOf("\n");
+      if (nl < 0) return;
+      conn.end();
+      const res = JSON.parse(buf.slice(0, nl));
+      if (res.status !== "ok") {
+        reject(new Error(res.error || "worker job failed"));
+      } else {
+        console.log("Worker:", { cached: res.cached, seconds: res.seconds, timings: res.timings });
+        resolve(res);
+      }
+    });
+    conn.on("error", reject);
+  });
+}
+
+function runOnScheduler() {
+  return new Promise((resolve, reject) => {
+    const conn = net.createConnection(schedulerSocket, () => {
+      conn.write(JSON.stringify({ cmd: "submit", strategy, timeframe, pairs, timerange, lane: "interactive", watch: true }) + "\n");
+    });
+    // One JSON object per line: the submit reply, then progress events until "finished"
+    readline.createInterface({ input: conn }).on("line", (line) => {
+      const msg = JSON.parse(line);
+      if (msg.status === "failed") {
+        conn.end();
+        reject(new Error(msg.error || "submit failed"));
+      } else if (msg.status === "ok") {
+        console.log("Scheduler job:", msg.job.id, msg.deduplicated ? "(already queued)" : "");
+      } else if (msg.event === "progress") {
+        console.log(`  ${msg.state} ${msg.stage} ${msg.percent}% eta=${msg.eta_seconds}s`);
+      } else if (msg.event === "finished") {
+        conn.end();
+        if (msg.state !== "ok") {
+          reject(new Error(msg.error || `job ${msg.state}`));
+        } else {
+          console.log("Scheduler:", { cached: msg.cached, seconds: msg.seconds, stages: msg.stage_seconds });
+          resolve(msg);
+        }
+      }
+    });
+    conn.on("error", reject);
+  });
+}
 
 function runBacktest() {
   return new Promise((resolve, reject) => {
@@ -27,16 +87,9 @@ function runBacktest() {
       stdio: ["ignore", "pipe", "pipe"],
     });
 
-    let stdout = "";
-    let stderr = "";
-    child.stdout.on("data", (chunk) => {
-      stdout += chunk.toString();
-      process.stdout.write(chunk);
-    });
-    child.stderr.on("data", (chunk) => {
-      stderr += chunk.toString();
-      process.stderr.write(chunk);
-    });
+    // Log line by line as the script runs; Freqtrade's output is not kept in memory
+    readline.createInterface({ input: child.stdout }).on("line", (line) => console.log(line));
+    readline.createInterface({ input: child.stderr }).on("line", (line) => console.error(line));
 
     child.on("error", (err) => {
       reject(err);
@@ -45,7 +98,7 @@ function runBacktest() {
       if (code !== 0) {
         reject(new Error(`Backtest exited with code ${code}`));
       } else {
-        resolve({ stdout, stderr });
+        resolve();
       }
     });
   });
@@ -63,13 +116,15 @@ function main() {
   console.log("Triggering backtest:", { strategy, timeframe, pairs, timerange });
   console.log("---\n");
 
-  runBacktest()
-    .then(() => {
-      if (!fs.existsSync(normalizedPath)) {
-        console.error("Normalized output not found at", normalizedPath);
+  (schedulerSocket ? runOnScheduler() : workerSocket ? runOnWorker() : runBacktest())
+    .then((res) => {
+      // The worker and the scheduler say where the output went (scheduler jobs are named per job)
+      const outPath = (res && res.normalized_path) || normalizedPath;
+      if (!fs.existsSync(outPath)) {
+        console.error("Normalized output not found at", outPath);
         process.exit(1);
       }
-      const data = JSON.parse(fs.readFileSync(normalizedPath, "utf8"));
+      const data = JSON.parse(fs.readFileSync(outPath, "utf8"));
       const m = data.metrics || {};
       console.log("\n--- Summary ---");
       console.log("Total trades:", m.total_trades);
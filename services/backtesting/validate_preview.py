@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Validate preview_backtest.py against full Freqtrade results. For every normalized result given (by
+default all of output/normalized/), the preview is re-run for the same strategy, pairs and timerange
+and compared trade by trade. Checks and tolerances (TOLERANCES):
+
+  trade_count     |preview trades - Freqtrade trades| <= 5% of the Freqtrade trades (at least 2)
+  matched         >= 90% of Freqtrade trades have a preview trade on the same pair and open time
+  same_exit       >= 90% of matched trades also close at the same time
+  trade_profit    >= 90% of matched trades are within 0.1 percentage points of profit_ratio
+  profit_sum      summed profit_ratio differs by <= 5 percentage points
+  win_rate        win rate differs by <= 3 percentage points
+
+Strategies with protections (KlineoRangeRevert, KlineoRiskManaged) are reported but never fail:
+the preview does not simulate protections, so it opens trades Freqtrade blocks.
+Exits with status 1 when a check fails.
+
+Usage:
+  python3 validate_preview.py
+  python3 validate_preview.py output/normalized/KlineoEmaRsiTrend_15m_20240101-20251231.json --report validation.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+import batch_backtest
+import columnar_output
+import param_screen
+import parse_backtest
+import preview_backtest
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_NORM = os.path.join(SCRIPT_DIR, "output", "normalized")
+
+TOLERANCES = {
+    "trade_count": 0.05,
+    "trade_count_min": 2,
+    "matched": 0.90,
+    "same_exit": 0.90,
+    "trade_profit_ratio": 0.001,
+    "trade_profit": 0.90,
+    "profit_sum": 0.05,
+    "win_rate": 3.0,
+}
+
+_PROTECTIONS_RE = re.compile(r"^\s+def protections\(", re.MULTILINE)
+
+
+def has_protections(strategy: str) -> bool:
+    path = os.path.join(batch_backtest.STRATEGIES_DIR, f"{strategy}.py")
+    return os.path.isfile(path) and bool(_PROTECTIONS_RE.search(open(path, encoding="utf-8").read()))
+
+
+def _win_rate(trades: List[Dict[str, Any]]) -> float:
+    return sum(1 for t in trades if t["is_win"]) / len(trades) * 100.0 if trades else 0.0
+
+
+def compare(full: List[Dict[str, Any]], preview: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Checks of preview trades against Freqtrade trades (both in the normalized trade shape)."""
+    tol = TOLERANCES
+    by_open = {(t["pair"], t["open_time"]): t for t in preview}
+    pairs = [(t, by_open[(t["pair"], t["open_time"])]) for t in full if (t["pair"], t["open_time"]) in by_open]
+    n_full = len(full)
+    matched = len(pairs) / n_full if n_full else 1.0
+    same_exit = sum(1 for f, p in pairs if f["close_time"] == p["close_time"]) / len(pairs) if pairs else 1.0
+    close_profit = sum(1 for f, p in pairs if abs(f["profit_ratio"] - p["profit_ratio"]) <= tol["trade_profit_ratio"])
+    trade_profit = close_profit / len(pairs) if pairs else 1.0
+    count_diff = abs(len(preview) - n_full)
+    profit_sum = abs(sum(t["profit_ratio"] for t in preview) - sum(t["profit_ratio"] for t in full))
+    win_rate = abs(_win_rate(preview) - _win_rate(full))
+
+    def check(name: str, value: float, limit: float, ok: bool) -> Dict[str, Any]:
+        return {"check": name, "value": round(value, 4), "tolerance": limit, "ok": ok}
+
+    count_limit = max(tol["trade_count"] * n_full, tol["trade_count_min"])
+    return [
+        check("trade_count", count_diff, round(count_limit, 2), count_diff <= count_limit),
+        check("matched", matched, tol["matched"], matched >= tol["matched"]),
+        check("same_exit", same_exit, tol["same_exit"], same_exit >= tol["same_exit"]),
+        check("trade_profit", trade_profit, tol["trade_profit"], trade_profit >= tol["trade_profit"]),
+        check("profit_sum", profit_sum, tol["profit_sum"], profit_sum <= tol["profit_sum"]),
+        check("win_rate", win_rate, tol["win_rate"], win_rate <= tol["win_rate"]),
+    ]
+
+
+def validate(path: str, data_dir: str) -> Optional[Dict[str, Any]]:
+    """Report for one normalized result, or None when its strategy has no preview."""
+    payload = columnar_output.load(path)
+    strategy = payload.get("strategy")
+    if strategy not in param_screen.SPECS or payload.get("approximate"):
+        return None
+    pairs = payload.get("pairs") or []
+    raw = preview_backtest.preview_raw(strategy, pairs, payload["timerange"], data_dir)
+    preview = [parse_backtest.TradeRecord(t, pairs[0] if pairs else "").to_dict() for t in raw["trades"]]
+    checks = compare(payload.get("trades") or [], preview)
+    strict = not has_protections(strategy)
+    return {
+        "path": path,
+        "strategy": strategy,
+        "pairs": pairs,
+        "timerange": payload["timerange"],
+        "freqtrade_trades": len(payload.get("trades") or []),
+        "preview_trades": len(preview),
+        "preview_seconds": raw["preview"]["seconds"],
+        "strict": strict,
+        "checks": checks,
+        "ok": all(c["ok"] for c in checks) or not strict,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare preview_backtest.py with full Freqtrade results")
+    p.add_argument("paths", nargs="*", help="Normalized results (default: output/normalized/*.json and *.kcol)")
+    p.add_argument("--data-dir", default=preview_backtest.DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--report", default=None, help="Also write the reports as JSON")
+    args = p.parse_args()
+
+    paths = args.paths or sorted(
+        path for ext in ("json", "kcol") for path in glob.glob(os.path.join(OUTPUT_NORM, f"*.{ext}"))
+        if not path.endswith(".stages.json")
+    )
+    reports = []
+    for path in paths:
+        try:
+            report = validate(path, args.data_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: skipping {path}: {e}", file=sys.stderr)
+            continue
+        if report is None:
+            continue
+        reports.append(report)
+        status = "ok" if all(c["ok"] for c in report["checks"]) else ("FAIL" if report["strict"] else "off (protections)")
+        print(f"{status:<18} {report['strategy']} {','.join(report['pairs'])} {report['timerange']}: "
+              f"{report['preview_trades']} preview / {report['freqtrade_trades']} Freqtrade trades")
+        for c in report["checks"]:
+            if not c["ok"]:
+                print(f"    {c['check']}: {c['value']} (tolerance {c['tolerance']})")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"tolerances": TOLERANCES, "results": reports}, f, indent=2)
+    if not reports:
+        print("No normalized results with a previewable strategy to validate", file=sys.stderr)
+        sys.exit(1)
+    failed = [r for r in reports if not r["ok"]]
+    print(f"[Klineo Preview] {len(reports) - len(failed)}/{len(reports)} results within tolerance")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
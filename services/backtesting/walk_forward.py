@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Walk-forward analysis: one timerange split into rolling train/test windows, so results show how
+stable a strategy is over time instead of one in-sample number.
+
+  train 180d | test 30d
+         step 30d -> train 180d | test 30d
+                          step 30d -> train 180d | test 30d ...
+
+Every window runs in-sample (train) and out-of-sample (test); --anchored keeps the train start fixed.
+Windows run concurrently on a process pool. Decoded candles come from the memory-mapped candle
+cache, filled once up front, so pool workers share them through the page cache instead of decoding
+per window.
+
+Engines:
+  freqtrade  full Freqtrade backtests per window (batch_backtest.run_job; data downloaded once)
+  preview    preview_backtest.py per window (approximate, well under a second each); --optimize
+             picks each window's best signal parameters on train (param_screen.py) and tests them
+
+Output (output/walkforward/): <strategy>_<tf>_<test range>.json is a normalized result (parse_backtest
+shape) of the stitched out-of-sample trades, with a "walk_forward" block holding the windows'
+train/test metrics and the summary.
+
+Usage:
+  python3 walk_forward.py KlineoEmaRsiTrend --pairs BTC/USDT --timerange 20220101-20251231 --train-days 180 --test-days 30
+  python3 walk_forward.py KlineoBollingerRevert --pairs BTC/USDT,ETH/USDT --timerange 20240101-20251231 --engine preview --optimize
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import batch_backtest
+import candle_cache
+import param_screen
+import parse_backtest
+import preview_backtest
+import resample
+from result_cache import timerange_bounds
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_WF = os.path.join(SCRIPT_DIR, "output", "walkforward")
+DATA_DIR = os.path.join(batch_backtest.USER_DATA, "data")
+CANDLE_CACHE = batch_backtest.CANDLE_CACHE
+ENGINES = ("freqtrade", "preview")
+DAY_SECONDS = 86400
+
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d")
+
+
+def make_windows(timerange: str, train_days: int, test_days: int, step_days: Optional[int] = None, anchored: bool = False) -> List[Dict[str, Any]]:
+    """
+    Train/test timeranges of every window whose test period fits in the timerange. step_days below
+    test_days is rejected: test periods would overlap, so stitched trades would be duplicated and
+    returns compounded over the same days.
+    """
+    start, end = timerange_bounds(timerange)
+    if start is None or end is None:
+        raise ValueError(f"walk-forward needs a closed timerange, got {timerange!r}")
+    if step_days is not None and step_days < test_days:
+        raise ValueError(f"--step-days ({step_days}) must be at least --test-days ({test_days}): test windows would overlap")
+    step = (step_days or test_days) * DAY_SECONDS
+    windows = []
+    train_start = start
+    test_start = start + train_days * DAY_SECONDS
+    while test_start + test_days * DAY_SECONDS <= end:
+        test_end = test_start + test_days * DAY_SECONDS
+        windows.append({
+            "index": len(windows),
+            "train": f"{_day(train_start)}-{_day(test_start)}",
+            "test": f"{_day(test_start)}-{_day(test_end)}",
+        })
+        test_start += step
+        if not anchored:
+            train_start += step
+    return windows
+
+
+def window_metrics(trades: List[dict], first_pair: str, wallet: float) -> Dict[str, Any]:
+    """Dashboard metrics of one window's trades (parse_backtest.TradeStats) plus its return on the wallet."""
+    records = [parse_backtest.TradeRecord(t, first_pair) for t in trades]
+    stats = parse_backtest.TradeStats()
+    for rec in records:
+        stats.add(rec)
+    equity = parse_backtest.build_equity_curve(records, wallet)
+    metrics = stats.metrics(parse_backtest.max_drawdown_percent(pt["value"] for pt in equity))
+    metrics["return_percent"] = round(stats.profit_abs_sum / wallet * 100.0, 4)
+    return metrics
+
+
+# --- Engines (run in pool workers) ---
+
+def run_preview_window(
+    strategy: str,
+    pairs: Sequence[str],
+    window: Dict[str, Any],
+    data_dir: str,
+    optimize: bool,
+    rank_by: str,
+    min_trades: int,
+) -> Dict[str, Any]:
+    """Train and test previews of one window; with optimize, test uses the train window's best parameters."""
+    started = time.perf_counter()
+    params = None
+    if optimize:
+        spec = param_screen.SPECS[strategy]
+        defaults = param_screen.strategy_defaults(strategy)
+        config = preview_backtest.load_config()
+        ranked = param_screen.rank(
+            param_screen.screen(
+                strategy, pairs, window["train"], spec["grid"], [defaults["minimal_roi"]], [defaults["stoploss"]],
+                float(config.get("fee", 0.001)), 1.0 / max(int(config.get("max_open_trades", 1)), 1), data_dir,
+            ),
+            rank_by,
+            min_trades,
+        )
+        params = ranked[0]["params"] if ranked else None
+    train = preview_backtest.preview_raw(strategy, pairs, window["train"], data_dir, params)
+    test = preview_backtest.preview_raw(strategy, pairs, window["test"], data_dir, params)
+    return {
+        **window,
+        "params": params,
+        "train_trades": train["trades"],
+        "test_trades": test["trades"],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _freqtrade_job(name: str, strategy: str, timeframe: str, pairs: Sequence[str], timerange: str, out_dir: str) -> Dict[str, Any]:
+    return {
+        "id": name,
+        "strategy": strategy,
+        "timeframe": timeframe,
+        "pairs": ",".join(pairs),
+        "timerange": timerange,
+        "raw_path": os.path.join(out_dir, "raw", name + ".json"),
+        "normalized_path": os.path.join(out_dir, "normalized", name + ".json"),
+    }
+
+
+def _job_trades(job: Dict[str, Any]) -> List[dict]:
+    return parse_backtest.ensure_list_trades(parse_backtest.load_json(job["raw_path"]))
+
+
+# --- Driver ---
+
+def walk_forward(
+    strategy: str,
+    pairs: Sequence[str],
+    windows: List[Dict[str, Any]],
+    engine: str = "freqtrade",
+    workers: int = 1,
+    data_dir: str = DATA_DIR,
+    optimize: bool = False,
+    rank_by: str = "ratio",
+    min_trades: int = 10,
+    download: bool = True,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """Run every window; returns {"windows": [...with train/test trades and metrics], "timeframe", "seconds"}."""
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r} (use {' or '.join(ENGINES)})")
+    if optimize and engine != "preview":
+        raise ValueError("--optimize needs --engine preview (Freqtrade strategies have fixed parameters)")
+    if engine == "preview" and strategy not in param_screen.SPECS:
+        raise ValueError(f"{strategy} is not supported by the preview engine")
+    started = time.perf_counter()
+    timeframe = batch_backtest.strategy_timeframes().get(strategy, "15m")
+    first = windows[0]["train"].partition("-")[0]
+    last = windows[-1]["test"].partition("-")[2]
+    out_dir = os.path.join(OUTPUT_WF, f"{strategy}_{timeframe}_{first}-{last}")
+
+    if engine == "freqtrade" and download:
+        step = {"timeframe": timeframe, "pairs": list(pairs), "timerange": f"{first}-{last}"}
+        print(f"[Klineo Walk-forward] Downloading {timeframe} {','.join(pairs)} {step['timerange']}...")
+        result = batch_backtest.run_download(step)
+        if result["status"] != "ok":
+            raise RuntimeError(f"download-data failed: {result['error']}")
+    if engine == "freqtrade":
+        informative = resample.informative_timeframes(strategy, timeframe)
+        if informative:
+            resample.prepare(pairs, timeframe, informative, data_dir, CANDLE_CACHE)
+    # Decode each pair once into the memory-mapped cache; pool workers then only map it
+    for pair in pairs:
+        candle_cache.load_columns(data_dir, pair, timeframe, CANDLE_CACHE)
+
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        if engine == "preview":
+            futures = [
+                pool.submit(run_preview_window, strategy, list(pairs), w, data_dir, optimize, rank_by, min_trades)
+                for w in windows
+            ]
+            for w, fut in zip(windows, futures):
+                res = fut.result()
+                results.append(res)
+                print(f"[Klineo Walk-forward] window {w['index']} {w['test']} ({res['seconds']}s)")
+        else:
+            jobs = []
+            for w in windows:
+                for part in ("train", "test"):
+                    job = _freqtrade_job(f"{w['index']:03d}_{part}", strategy, timeframe, pairs, w[part], out_dir)
+                    os.makedirs(os.path.dirname(job["raw_path"]), exist_ok=True)
+                    jobs.append(job)
+            # Train/test windows are parts of one analysis, not marketplace results: keep them out of the catalog
+            done = [pool.submit(batch_backtest.run_job, job, use_cache, False) for job in jobs]
+            by_id = {}
+            for fut in done:
+                res = fut.result()
+                by_id[res["id"]] = res
+                print(f"[Klineo Walk-forward] {res['status']:>7} {res['id']} ({res['timings'].get('total', 0)}s)")
+            for w in windows:
+                train, test = by_id[f"{w['index']:03d}_train"], by_id[f"{w['index']:03d}_test"]
+                failed = [r for r in (train, test) if r["status"] != "ok"]
+                if failed:
+                    raise RuntimeError(f"window {w['index']} failed: {failed[0]['error']}")
+                results.append({
+                    **w,
+                    "params": None,
+                    "train_trades": _job_trades(train),
+                    "test_trades": _job_trades(test),
+                    "seconds": round(train["timings"].get("total", 0) + test["timings"].get("total", 0), 3),
+                })
+    return {"windows": results, "timeframe": timeframe, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def summarize(windows: List[Dict[str, Any]], first_pair: str, wallet: float) -> Dict[str, Any]:
+    """Per-window train/test metrics and the stability summary (windows keep their trades)."""
+    test_returns = []
+    train_rate = test_rate = 0.0
+    for w in windows:
+        w["train_metrics"] = window_metrics(w["train_trades"], first_pair, wallet)
+        w["test_metrics"] = window_metrics(w["test_trades"], first_pair, wallet)
+        train_days = _range_days(w["train"])
+        test_days = _range_days(w["test"])
+        train_rate += w["train_metrics"]["return_percent"] / train_days
+        test_rate += w["test_metrics"]["return_percent"] / test_days
+        test_returns.append(w["test_metrics"]["return_percent"])
+    n = len(test_returns)
+    mean = sum(test_returns) / n if n else 0.0
+    compounded = math.prod(1.0 + r / 100.0 for r in test_returns) - 1.0
+    return {
+        "windows": n,
+        "oos_return_percent": round(compounded * 100.0, 4),
+        "oos_trades": sum(w["test_metrics"]["total_trades"] for w in windows),
+        "profitable_windows": sum(1 for r in test_returns if r > 0),
+        "test_return_mean_percent": round(mean, 4),
+        "test_return_std_percent": round(math.sqrt(sum((r - mean) ** 2 for r in test_returns) / n), 4) if n else 0.0,
+        "worst_test_return_percent": round(min(test_returns), 4) if n else 0.0,
+        # Walk-forward efficiency: out-of-sample return per day relative to in-sample return per day
+        "efficiency": round(test_rate / train_rate, 4) if train_rate > 0 else None,
+    }
+
+
+def _range_days(timerange: str) -> float:
+    start, end = timerange_bounds(timerange)
+    return max((end - start) / DAY_SECONDS, 1.0)
+
+
+def write_stitched(
+    strategy: str,
+    timeframe: str,
+    pairs: Sequence[str],
+    windows: List[Dict[str, Any]],
+    summary: Dict[str, Any],
+    engine: str,
+    wallet: float,
+    out: Optional[str] = None,
+    data_dir: str = DATA_DIR,
+    max_points: Optional[int] = None,
+    fmt: str = "json",
+) -> str:
+    """Normalized result of all test windows' trades over the out-of-sample range; returns its path."""
+    timerange = f"{windows[0]['test'].partition('-')[0]}-{windows[-1]['test'].partition('-')[2]}"
+    out = out or os.path.join(OUTPUT_WF, f"{strategy}_{timeframe}_{timerange}" + (".kcol" if fmt == "columnar" else ".json"))
+    trades = [t for w in windows for t in w["test_trades"]]
+    raw: Dict[str, Any] = {
+        "trades": trades,
+        "backtest_stats": {
+            "profit_total": summary["oos_return_percent"] / 100.0,
+            "starting_balance": wallet,
+            "final_balance": wallet * (1.0 + summary["oos_return_percent"] / 100.0),
+        },
+        "walk_forward": {
+            "engine": engine,
+            "summary": summary,
+            "windows": [
+                {k: w[k] for k in ("index", "train", "test", "params", "train_metrics", "test_metrics", "seconds")}
+                for w in windows
+            ],
+        },
+    }
+    if engine == "preview":
+        raw["preview"] = {"engine": "numpy", "walk_forward": True}
+    argv = [
+        "--raw", "(walk-forward)",
+        "--strategy", strategy,
+        "--timeframe", timeframe,
+        "--pairs", ",".join(pairs),
+        "--timerange", timerange,
+        "--out", out,
+        "--data-dir", data_dir,
+        "--candle-cache", CANDLE_CACHE,
+        "--format", fmt,
+    ]
+    if max_points:
+        argv += ["--max-points", str(max_points)]
+    parse_backtest.run(parse_backtest.parse_args(argv), raw=raw)
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Walk-forward (rolling train/test windows) analysis of a Klineo strategy")
+    p.add_argument("strategy")
+    p.add_argument("--pairs", required=True, help="Comma-separated pairs")
+    p.add_argument("--timerange", required=True, help="Whole range (YYYYMMDD-YYYYMMDD)")
+    p.add_argument("--train-days", type=int, default=180, help="In-sample days per window (default 180)")
+    p.add_argument("--test-days", type=int, default=30, help="Out-of-sample days per window (default 30)")
+    p.add_argument("--step-days", type=int, default=None, help="Days between windows, at least --test-days (default: --test-days)")
+    p.add_argument("--anchored", action="store_true", help="Keep the train start fixed (expanding train windows)")
+    p.add_argument("--engine", choices=ENGINES, default="freqtrade", help="Backtest engine (default: freqtrade)")
+    p.add_argument("--optimize", action="store_true", help="Preview engine: pick each window's best grid parameters on train")
+    p.add_argument("--rank", choices=param_screen.RANKINGS, default="ratio", help="Ranking for --optimize")
+    p.add_argument("--min-trades", type=int, default=10, help="--optimize ranks combos with fewer train trades last")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size (default: CPU count)")
+    p.add_argument("--data-dir", default=DATA_DIR, help="Freqtrade data dir")
+    p.add_argument("--skip-download", action="store_true", help="Freqtrade engine: assume data is already downloaded")
+    p.add_argument("--no-cache", action="store_true", help="Freqtrade engine: ignore the result cache")
+    p.add_argument("--out", default=None, help="Output path (default: output/walkforward/<strategy>_<tf>_<oos range>.json)")
+    p.add_argument("--max-points", type=int, default=None, help="Point budget per chart series (see parse_backtest.py)")
+    p.add_argument("--format", choices=("json", "columnar"), default="json", help="Output format")
+    args = p.parse_args()
+
+    pairs = [x.strip() for x in args.pairs.split(",") if x.strip()]
+    try:
+        windows = make_windows(args.timerange, args.train_days, args.test_days, args.step_days, args.anchored)
+    except ValueError as e:
+        p.error(str(e))
+    if not windows:
+        p.error(f"{args.timerange} is shorter than one window ({args.train_days} + {args.test_days} days)")
+    print(f"[Klineo Walk-forward] {args.strategy} {len(windows)} windows ({args.engine}, {args.workers} workers)")
+    try:
+        run = walk_forward(
+            args.strategy, pairs, windows, args.engine, args.workers, args.data_dir,
+            args.optimize, args.rank, args.min_trades, not args.skip_download, not args.no_cache,
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    wallet = float(preview_backtest.load_config().get("dry_run_wallet", preview_backtest.DEFAULT_WALLET))
+    first_pair = "BTC/USDT" if "BTC/USDT" in pairs else pairs[0]
+    summary = summarize(run["windows"], first_pair, wallet)
+    out = write_stitched(
+        args.strategy, run["timeframe"], pairs, run["windows"], summary, args.engine, wallet,
+        args.out, args.data_dir, args.max_points, args.format,
+    )
+
+    print(f"{'#':>3} {'train':>17} {'IS %':>8} {'test':>17} {'OOS %':>8} {'trades':>6} {'max dd %':>8}  params")
+    for w in run["windows"]:
+        tm, om = w["train_metrics"], w["test_metrics"]
+        desc = " ".join(f"{k}={v}" for k, v in (w["params"] or {}).items())
+        print(f"{w['index']:>3} {w['train']:>17} {tm['return_percent']:>8.2f} {w['test']:>17} {om['return_percent']:>8.2f} "
+              f"{om['total_trades']:>6} {om['max_drawdown_percent']:>8.2f}  {desc}")
+    print(f"[Klineo Walk-forward] OOS return {summary['oos_return_percent']:.2f}% over {summary['windows']} windows "
+          f"({summary['profitable_windows']} profitable, efficiency {summary['efficiency']}) in {run['seconds']}s -> {out}")
+
+
+if __name__ == "__main__":
+    main()